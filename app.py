@@ -10,12 +10,33 @@ import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 from tkinter.scrolledtext import ScrolledText
 
+import pipeline
+import resources
+from batch import BatchRunner, job_stages
+from jobtable import JobTable
+from journal import JobJournal
+
 try:
     from tkinterdnd2 import DND_FILES, DND_TEXT
     HAS_DND = True
 except ImportError:
     HAS_DND = False
 
+try:
+    import thumbnail
+    HAS_NUMPY = True
+except ImportError:
+    # NumPy missing; in-process GLB post-processing is disabled
+    HAS_NUMPY = False
+
+
+# Separates several input files in the input field (batch mode)
+BATCH_SEPARATOR = "; "
+# Seconds of event handling per queue poll, so the UI keeps redrawing under heavy output
+POLL_BUDGET = 0.012
+# Mesh quality choice that leaves mayo-conv's own meshing settings untouched
+MAYO_DEFAULT_QUALITY = "Mayo default"
+
 
 class MayoConverterApp(tk.Tk):
     def __init__(self):
@@ -34,6 +55,30 @@ class MayoConverterApp(tk.Tk):
         self.advanced_simplify_var = tk.BooleanVar(value=True)
         self.delete_loose_var = tk.BooleanVar(value=True)
         self.smooth_normals_var = tk.BooleanVar(value=False)
+        self.tolerance_var = tk.BooleanVar(value=False)
+        self.tolerance_mm_var = tk.StringVar(value="0.1")
+        self.cull_hidden_var = tk.BooleanVar(value=False)
+        self.cull_decimate_var = tk.BooleanVar(value=False)
+        self.cull_small_px_var = tk.StringVar(value="0")
+        self.merge_var = tk.BooleanVar(value=True)
+        self.merge_target_var = tk.StringVar(value="0")
+        self.thumbnail_var = tk.BooleanVar(value=False)
+        # Extra export formats written by the same mayo-conv run as the main output
+        self.extra_format_vars = {name: tk.BooleanVar(value=False) for name in pipeline.EXPORT_FORMATS}
+        self.optimize_var = tk.BooleanVar(value=False)
+        self.vertex_cache_var = tk.BooleanVar(value=False)
+        self.overdraw_var = tk.BooleanVar(value=False)
+        # Tessellation quality passed to mayo-conv, and the triangle budget it aims for
+        self.mesh_quality_var = tk.StringVar(value=MAYO_DEFAULT_QUALITY)
+        self.triangle_budget_var = tk.StringVar(value="0")
+        # Parallel batch jobs; 0 = one per four cores
+        self.batch_jobs_var = tk.StringVar(value="0")
+
+        # Rendered results shown in the gallery: list of (model_path, thumbnail_path)
+        self.gallery_items = []
+        self.gallery_win = None
+        # model_path -> {"button", "image"} for the cells of the open gallery window
+        self.gallery_cells = {}
 
         self.create_widgets()
 
@@ -45,13 +90,34 @@ class MayoConverterApp(tk.Tk):
         self._after_id = None
         # Track simplification progress separately from conversion
         self.simplify_running = False
+        # Outputs of the current job and their status (converted, simplified, missing, ...)
+        self.job_outputs = []
+        self.output_status = {}
+        self.job_started = 0.0
+        # Number of outputs still in GLB post-processing (optimise/thumbnail)
+        self.postprocess_running = 0
+        # Journaled batch runs (several inputs); the journal survives restarts
+        try:
+            self.journal = JobJournal()
+        except Exception as e:
+            self.journal = None
+            self.log.insert(tk.END, f"Batch journal unavailable: {e}\n")
+        self.batch_runner = None
+        self.batch_running = False
+        # Core and memory budget shared by every mayo/Blender child process
+        self.governor = resources.ResourceGovernor(self.output_queue.put)
         # Handle window close to set the closing flag
         self.protocol("WM_DELETE_WINDOW", self.on_close)
+        # Offer to resume batches interrupted by a crash or by closing the app
+        self.after(500, self.check_interrupted_batches)
 
     def on_close(self):
         # Mark closing and destroy the window. This prevents later polls from recreating dialogs.
         self._closing = True
         try:
+            # Stop a batch between stages; its journal lets it resume on next start
+            if self.batch_runner:
+                self.batch_runner.stop()
             # Optionally, terminate running process
             if self.proc and self.proc.poll() is None:
                 try:
@@ -128,6 +194,24 @@ class MayoConverterApp(tk.Tk):
         ttk.Entry(row, textvariable=self.output_path_var).pack(side=tk.LEFT, fill=tk.X, expand=True, padx=6)
         ttk.Button(row, text="Browse", command=self.browse_output).pack(side=tk.LEFT)
 
+        # Extra formats from the same conversion (the STEP file is parsed once)
+        row = ttk.Frame(frm)
+        row.pack(fill=tk.X, pady=4)
+        ttk.Label(row, text="Also export:").pack(side=tk.LEFT)
+        for name, var in self.extra_format_vars.items():
+            ttk.Checkbutton(row, text=name, variable=var).pack(side=tk.LEFT, padx=4)
+        ttk.Label(row, text=f"Parallel jobs for batches (0 = auto, {resources.default_workers()}):").pack(side=tk.LEFT, padx=(16, 0))
+        ttk.Entry(row, width=4, textvariable=self.batch_jobs_var).pack(side=tk.LEFT, padx=4)
+
+        # Tessellation quality at the source, so less needs decimating afterwards
+        row = ttk.Frame(frm)
+        row.pack(fill=tk.X, pady=4)
+        ttk.Label(row, text="Mesh quality:").pack(side=tk.LEFT)
+        ttk.Combobox(row, textvariable=self.mesh_quality_var, state="readonly", width=14,
+                     values=[MAYO_DEFAULT_QUALITY] + list(pipeline.MESH_PRESETS) + [pipeline.MESH_AUTO]).pack(side=tk.LEFT, padx=6)
+        ttk.Label(row, text="Triangle budget (0 = none; Auto aims for it, simplification only trims the excess):").pack(side=tk.LEFT, padx=(8, 0))
+        ttk.Entry(row, width=10, textvariable=self.triangle_budget_var).pack(side=tk.LEFT, padx=4)
+
         # Blender simplification options
         simplify_frm = ttk.LabelFrame(frm, text="Model Simplification (optional)", padding=8)
         simplify_frm.pack(fill=tk.X, pady=8)
@@ -158,6 +242,13 @@ class MayoConverterApp(tk.Tk):
         self.ratio_label.pack(side=tk.LEFT)
         self.simplify_ratio_var.trace('w', self.update_ratio_label)
 
+        # Error-bounded mode replaces the fixed ratio with a per-mesh search
+        tolerance_row = ttk.Frame(simplify_frm)
+        tolerance_row.pack(fill=tk.X, pady=4)
+        ttk.Checkbutton(tolerance_row, text="Error-bounded: lowest ratio per mesh within max deviation (mm):",
+                        variable=self.tolerance_var).pack(side=tk.LEFT)
+        ttk.Entry(tolerance_row, width=8, textvariable=self.tolerance_mm_var).pack(side=tk.LEFT, padx=4)
+
         # Simplification options
         options_row = ttk.Frame(simplify_frm)
         options_row.pack(fill=tk.X, pady=4)
@@ -166,6 +257,21 @@ class MayoConverterApp(tk.Tk):
         ttk.Checkbutton(options_row, text="Remove loose geometry", variable=self.delete_loose_var).pack(side=tk.LEFT, padx=8)
         ttk.Checkbutton(options_row, text="Smooth normals", variable=self.smooth_normals_var).pack(side=tk.LEFT, padx=8)
 
+        # Visibility culling of internal and tiny parts, before decimation
+        cull_row = ttk.Frame(simplify_frm)
+        cull_row.pack(fill=tk.X, pady=4)
+        ttk.Checkbutton(cull_row, text="Remove hidden internal parts", variable=self.cull_hidden_var).pack(side=tk.LEFT)
+        ttk.Checkbutton(cull_row, text="Keep them decimated to 5%", variable=self.cull_decimate_var).pack(side=tk.LEFT, padx=8)
+        ttk.Label(cull_row, text="Remove parts smaller than (px of 1024, 0 = off):").pack(side=tk.LEFT, padx=(8, 0))
+        ttk.Entry(cull_row, width=6, textvariable=self.cull_small_px_var).pack(side=tk.LEFT, padx=4)
+
+        # Draw-call reduction
+        merge_row = ttk.Frame(simplify_frm)
+        merge_row.pack(fill=tk.X, pady=4)
+        ttk.Checkbutton(merge_row, text="Merge meshes by material and proximity", variable=self.merge_var).pack(side=tk.LEFT)
+        ttk.Label(merge_row, text="Target draw calls (0 = auto):").pack(side=tk.LEFT, padx=(8, 0))
+        ttk.Entry(merge_row, width=8, textvariable=self.merge_target_var).pack(side=tk.LEFT, padx=4)
+
         # Controls (top)
         row = ttk.Frame(frm)
         row.pack(fill=tk.X, pady=8)
@@ -174,11 +280,25 @@ class MayoConverterApp(tk.Tk):
         self.preview_btn = ttk.Button(row, text="Preview", command=self.preview_output, state=tk.DISABLED)
         self.preview_btn.pack(side=tk.LEFT, padx=4)
         ttk.Button(row, text="Open output folder", command=self.open_output_folder).pack(side=tk.LEFT, padx=6)
+        ttk.Checkbutton(row, text="Optimise GLB (dedupe materials)", variable=self.optimize_var,
+                        state=tk.NORMAL if HAS_NUMPY else tk.DISABLED).pack(side=tk.LEFT, padx=6)
+        ttk.Checkbutton(row, text="Optimise vertex cache", variable=self.vertex_cache_var,
+                        state=tk.NORMAL if HAS_NUMPY else tk.DISABLED).pack(side=tk.LEFT, padx=6)
+        ttk.Checkbutton(row, text="Reduce overdraw", variable=self.overdraw_var,
+                        state=tk.NORMAL if HAS_NUMPY else tk.DISABLED).pack(side=tk.LEFT, padx=6)
+        ttk.Checkbutton(row, text="Generate thumbnail", variable=self.thumbnail_var,
+                        state=tk.NORMAL if HAS_NUMPY else tk.DISABLED).pack(side=tk.LEFT, padx=6)
+        ttk.Button(row, text="Gallery", command=self.show_gallery).pack(side=tk.LEFT, padx=4)
 
         # Log area
         ttk.Label(frm, text="Console:").pack(anchor=tk.W)
-        self.log = ScrolledText(frm, height=12)
-        self.log.pack(fill=tk.BOTH, expand=True)
+        # Console and per-job table share the bottom of the window
+        self.notebook = ttk.Notebook(frm)
+        self.notebook.pack(fill=tk.BOTH, expand=True)
+        self.log = ScrolledText(self.notebook, height=12)
+        self.notebook.add(self.log, text="Console")
+        self.job_table = JobTable(self.notebook)
+        self.notebook.add(self.job_table, text="Jobs")
 
         # Bottom bar with About button
         bottom = ttk.Frame(self)
@@ -196,8 +316,12 @@ class MayoConverterApp(tk.Tk):
             self.blender_path_var.set(p)
 
     def browse_input(self):
-        # Only accept STEP files (.step, .stp)
-        p = filedialog.askopenfilename(title="Select input STEP file", filetypes=[("STEP files", "*.step;*.stp")])
+        # Only accept STEP files (.step, .stp); several files make a batch
+        files = filedialog.askopenfilenames(title="Select input STEP file(s)", filetypes=[("STEP files", "*.step;*.stp")])
+        if len(files) > 1:
+            self.set_batch_inputs(list(files))
+            return
+        p = files[0] if files else ""
         if p:
             self.input_path_var.set(p)
             # Default output path: same folder, same basename, with .glb extension
@@ -241,11 +365,15 @@ class MayoConverterApp(tk.Tk):
         if not files:
             return
         
-        # Use the first file dropped
-        dropped_file = files[0]
+        # Several STEP files dropped at once make a batch
+        valid_extensions = ('.step', '.stp')
+        step_files = [f for f in files if f.lower().endswith(valid_extensions)]
+        if len(step_files) > 1:
+            self.set_batch_inputs(step_files)
+            return
+        dropped_file = step_files[0] if step_files else files[0]
         
         # Check if it's a valid STEP file
-        valid_extensions = ('.step', '.stp')
         if not dropped_file.lower().endswith(valid_extensions):
             messagebox.showwarning("Invalid file", f"Please drop a STEP file (.step or .stp)\nReceived: {os.path.basename(dropped_file)}")
             return
@@ -264,6 +392,13 @@ class MayoConverterApp(tk.Tk):
         self.log.insert(tk.END, f"Loaded input file: {dropped_file}\n")
         self.log.see(tk.END)
 
+    def set_batch_inputs(self, files):
+        """Fill the input field with several files; outputs go to the output folder."""
+        self.input_path_var.set(BATCH_SEPARATOR.join(files))
+        self.output_path_var.set(os.path.dirname(files[0]))
+        self.log.insert(tk.END, f"Loaded {len(files)} input files (batch). Output folder: {os.path.dirname(files[0])}\n")
+        self.log.see(tk.END)
+
     @staticmethod
     def parse_dnd_data(data):
         """Parse drag-and-drop data which may contain file paths wrapped in braces."""
@@ -302,6 +437,10 @@ class MayoConverterApp(tk.Tk):
         mayo = self.mayo_path_var.get().strip()
         inp = self.input_path_var.get().strip()
         out = self.output_path_var.get().strip()
+        inputs = [p.strip() for p in inp.split(BATCH_SEPARATOR.strip()) if p.strip()]
+        if len(inputs) > 1:
+            self.start_batch(mayo, inputs, out)
+            return
         if not inp or not os.path.exists(inp):
             messagebox.showerror("Error", "Input file is missing or does not exist")
             return
@@ -316,53 +455,174 @@ class MayoConverterApp(tk.Tk):
                 messagebox.showerror("Error", "Simplification enabled but Blender executable not found. Please locate Blender or disable simplification.")
                 return
 
-        cmd = [mayo, inp, "--export", out]
-
+        # Snapshot settings so worker threads never touch Tk variables
+        self.current_options = self.job_options()
+        self.current_blender = self.blender_path_var.get().strip()
+        self.job_outputs = pipeline.collect_outputs(out, self.current_options["extra_formats"])
+        self.output_status = {}
+        self.job_started = time.time()
         # Disable UI
         self.convert_btn.config(state=tk.DISABLED)
-        self.log.insert(tk.END, f"> Running: {' '.join(cmd)}\n")
-        self.log.see(tk.END)
 
         # Run in thread
-        t = threading.Thread(target=self.run_command, args=(cmd,))
+        t = threading.Thread(target=self.run_conversion, args=(mayo, inp))
         t.daemon = True
         t.start()
 
         # Poll queue
-        # Store after id so it can be cancelled if the window is closed
-        self._after_id = self.after(200, self.poll_queue)
+        self.ensure_polling()
 
-    def run_command(self, cmd):
+    def start_batch(self, mayo, inputs, out_dir):
+        """Record a batch in the journal and run it in a background thread."""
+        missing = [p for p in inputs if not os.path.exists(p)]
+        if missing:
+            messagebox.showerror("Error", "Input files missing:\n" + "\n".join(missing))
+            return
+        if not out_dir or not os.path.isdir(out_dir):
+            messagebox.showerror("Error", "For several inputs, the output must be an existing folder")
+            return
+        if self.journal is None:
+            messagebox.showerror("Error", "Batch journal unavailable; convert files one at a time")
+            return
+        options = self.job_options()
+        blender = self.blender_path_var.get().strip()
+        if options["simplify"] and (not blender or not os.path.exists(blender)):
+            messagebox.showerror("Error", "Simplification enabled but Blender executable not found. Please locate Blender or disable simplification.")
+            return
+
+        jobs = []
+        for p in inputs:
+            primary = os.path.join(out_dir, os.path.splitext(os.path.basename(p))[0] + ".glb")
+            jobs.append((p, pipeline.collect_outputs(primary, options["extra_formats"]), options))
+        batch_id = self.journal.create_batch(mayo, blender, jobs)
+        self.log.insert(tk.END, f"\nStarting batch {batch_id} ({len(jobs)} files)\n")
+        self.run_batch(batch_id, mayo, blender)
+
+    def show_batch_jobs(self, batch_id):
+        """Load a batch's jobs into the job table."""
+        self.job_table.clear()
+        for job in self.journal.jobs(batch_id):
+            stages = job_stages(job["options"])
+            # Resumed jobs start with the stages they already finished
+            records = self.journal.stage_records(job["id"])
+            completed = sum(1 for s in stages if records.get(s, {}).get("status") == "done")
+            status = job["status"] if job["status"] in ("done", "failed") else "pending"
+            self.job_table.add_job(job["id"], job["input"], len(stages), completed, status)
+        self.notebook.select(self.job_table)
+
+    def run_batch(self, batch_id, mayo, blender):
+        self.show_batch_jobs(batch_id)
         try:
-            # Start process
-            self.proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
-        except Exception as e:
-            self.output_queue.put(("err", f"Failed to start process: {e}\n"))
-            self.output_queue.put(("done", False))
+            workers = max(0, int(self.batch_jobs_var.get()))
+        except (TypeError, ValueError):
+            workers = 0
+        self.batch_runner = BatchRunner(self.journal, mayo, blender, self.output_queue.put,
+                                        workers=workers, governor=self.governor)
+        self.batch_running = True
+        self.convert_btn.config(state=tk.DISABLED)
+        t = threading.Thread(target=self.batch_runner.run, args=(batch_id,))
+        t.daemon = True
+        t.start()
+        self.ensure_polling()
+
+    def check_interrupted_batches(self):
+        """Offer to resume the oldest batch that was interrupted."""
+        if self._closing or self.journal is None or self.batch_running:
             return
+        batches = self.journal.incomplete_batches()
+        if not batches:
+            return
+        batch_id = batches[0]
+        jobs = self.journal.jobs(batch_id)
+        left = sum(1 for j in jobs if j["status"] in ("pending", "running"))
+        if messagebox.askyesno("Resume batch",
+                               f"Batch {batch_id} was interrupted with {left} of {len(jobs)} file(s) unfinished.\n"
+                               "Resume it now? Completed stages are not repeated."):
+            info = self.journal.batch(batch_id)
+            self.log.insert(tk.END, f"\nResuming batch {batch_id}\n")
+            self.run_batch(batch_id, info["mayo"], info["blender"])
+        else:
+            # Do not ask again for this batch
+            self.journal.finish_batch(batch_id)
 
-        # Read stdout and stderr lines
-        def reader(pipe, tag):
+    def job_options(self):
+        """Snapshot of the job settings from the UI, as a JSON-serialisable dict."""
+        def number(var, cast, default):
             try:
-                for line in iter(pipe.readline, ''):
-                    if line:
-                        self.output_queue.put((tag, line))
-            finally:
-                pipe.close()
-
-        out_thread = threading.Thread(target=reader, args=(self.proc.stdout, "out"))
-        err_thread = threading.Thread(target=reader, args=(self.proc.stderr, "err"))
-        out_thread.daemon = True
-        err_thread.daemon = True
-        out_thread.start()
-        err_thread.start()
-
-        rc = self.proc.wait()
-        out_thread.join()
-        err_thread.join()
-
-        success = rc == 0
-        self.output_queue.put(("done", success))
+                return cast(var.get())
+            except (TypeError, ValueError, tk.TclError):
+                return default
+
+        optimize = {
+            "dedupe": self.optimize_var.get(),
+            "vertex_cache": self.vertex_cache_var.get(),
+            "overdraw": self.overdraw_var.get(),
+        }
+        return {
+            "extra_formats": [pipeline.EXPORT_FORMATS[name]
+                              for name, var in self.extra_format_vars.items() if var.get()],
+            "simplify": self.simplify_var.get(),
+            "ratio": self.simplify_ratio_var.get(),
+            "preprocess": self.preprocess_var.get(),
+            "advanced_simplify": self.advanced_simplify_var.get(),
+            "delete_loose": self.delete_loose_var.get(),
+            "smooth_normals": self.smooth_normals_var.get(),
+            "cull_hidden": self.cull_hidden_var.get(),
+            "cull_mode": "decimate" if self.cull_decimate_var.get() else "delete",
+            "cull_small_px": max(0.0, number(self.cull_small_px_var, float, 0.0)),
+            "merge": self.merge_var.get(),
+            "merge_target": max(0, number(self.merge_target_var, int, 0)),
+            "tolerance_mm": max(0.0, number(self.tolerance_mm_var, float, 0.0)) if self.tolerance_var.get() else 0.0,
+            "dedupe_materials": self.optimize_var.get(),
+            "optimize": optimize if any(optimize.values()) else False,
+            "thumbnails": self.thumbnail_var.get(),
+            "mesh_quality": "" if self.mesh_quality_var.get() == MAYO_DEFAULT_QUALITY else self.mesh_quality_var.get(),
+            "triangle_budget": max(0, number(self.triangle_budget_var, int, 0)),
+        }
+
+    def log_output_status(self):
+        """Write one status line per output of the current job."""
+        if len(self.job_outputs) < 2 and all(v in ("converted", "simplified") for v in self.output_status.values()):
+            return
+        self.log.insert(tk.END, "\nOutputs:\n")
+        for out in self.job_outputs:
+            self.log.insert(tk.END, f"  {out}: {self.output_status.get(out, 'pending')}\n")
+
+    def ensure_polling(self):
+        """Schedule the queue poll unless one is already pending."""
+        # Store after id so it can be cancelled if the window is closed
+        if self._after_id is None and not self._closing:
+            self._after_id = self.after(200, self.poll_queue)
+
+    def run_conversion(self, mayo, inp):
+        """Write the mesh settings (Auto reads the whole STEP file) and run mayo-conv."""
+        try:
+            settings = pipeline.mesh_settings_file(inp, self.current_options, self.output_queue.put)
+        except Exception as e:
+            self.output_queue.put(("err", f"Mesh settings error: {e}; using mayo defaults\n"))
+            settings = None
+        # Export to temporary names; they are renamed into place only on success
+        cmd = pipeline.build_convert_command(mayo, inp, [pipeline.partial_path(o) for o in self.job_outputs], settings)
+        self.output_queue.put(("out", f"> Running: {' '.join(cmd)}\n"))
+        try:
+            self.run_command(cmd)
+        finally:
+            if settings:
+                os.remove(settings)
+
+    def run_command(self, cmd):
+        # A single job gets every core, but runs at lower priority with its memory tracked
+        lease = self.governor.acquire("convert", os.path.getsize(cmd[1]), self.governor.total_cores)
+
+        def on_start(proc):
+            self.proc = proc
+            lease.attach(proc)
+
+        try:
+            rc = pipeline.run_process(cmd, self.output_queue.put, on_start=on_start)
+        finally:
+            lease.release()
+        self.output_queue.put(("done", rc == 0))
 
     def poll_queue(self):
         # If we're closing, don't process or show dialogs
@@ -372,8 +632,14 @@ class MayoConverterApp(tk.Tk):
         # This poll corresponds to a scheduled after; clear stored id
         self._after_id = None
 
+        # Handle events for at most one frame's worth of time; the rest waits for the next poll
+        deadline = time.perf_counter() + POLL_BUDGET
+        backlog = False
         try:
             while True:
+                if time.perf_counter() > deadline:
+                    backlog = True
+                    break
                 tag, msg = self.output_queue.get_nowait()
                 if tag == "out":
                     self.log.insert(tk.END, msg)
@@ -381,25 +647,32 @@ class MayoConverterApp(tk.Tk):
                     self.log.insert(tk.END, msg)
                 elif tag == "done":
                     ok = msg
+                    pipeline.finalize_outputs(self.job_outputs, ok)
                     if ok:
                         self.log.insert(tk.END, "\nConversion finished successfully.\n")
+                        for out in self.job_outputs:
+                            status = pipeline.output_status(out, self.job_started)
+                            self.output_status[out] = "converted" if status == "ok" else status
+                        gltf_outputs = [o for o in self.job_outputs
+                                        if self.output_status[o] == "converted" and pipeline.needs_simplification(o)]
                         
-                        # Proceed with simplification if enabled
-                        if self.simplify_var.get():
-                            out = self.output_path_var.get().strip()
+                        # Proceed with simplification if enabled (glTF outputs only)
+                        if self.simplify_var.get() and gltf_outputs:
                             self.log.insert(tk.END, f"\nStarting model simplification...\n")
                             self.log.see(tk.END)
                             
                             # Run simplification in thread
                             self.simplify_running = True
                             simplify_thread = threading.Thread(
-                                target=self.run_simplification,
-                                args=(out, self.simplify_ratio_var.get())
+                                target=self.run_simplifications,
+                                args=(gltf_outputs,)
                             )
                             simplify_thread.daemon = True
                             simplify_thread.start()
                             self._after_id = self.after(100, self.poll_queue)  # Poll more frequently
                         else:
+                            self.log_output_status()
+                            self.start_postprocess(gltf_outputs)
                             # Enable preview button on successful conversion (no simplification)
                             if not getattr(self, '_closing', False):
                                 self.preview_btn.config(state=tk.NORMAL)
@@ -413,6 +686,9 @@ class MayoConverterApp(tk.Tk):
                 elif tag == "simplify_done":
                     ok = msg
                     self.simplify_running = False
+                    self.log_output_status()
+                    self.start_postprocess([o for o in self.job_outputs if pipeline.needs_simplification(o)
+                                            and self.output_status.get(o) in ("converted", "simplified", "simplify failed")])
                     if ok:
                         self.log.insert(tk.END, "\nSimplification finished successfully.\n")
                         if not getattr(self, '_closing', False):
@@ -425,133 +701,202 @@ class MayoConverterApp(tk.Tk):
                             messagebox.showwarning("Simplification Failed", "Simplification failed, but conversion was successful. See log.")
                             self.preview_btn.config(state=tk.NORMAL)
                             self.convert_btn.config(state=tk.NORMAL)
-                self.log.see(tk.END)
+                elif tag == "output_status":
+                    path, status = msg
+                    self.output_status[path] = status
+                elif tag == "post_done":
+                    self.postprocess_running -= 1
+                    if msg:
+                        self.add_gallery_item(*msg)
+                elif tag == "job_status":
+                    job_id, job_input, stage, status = msg
+                    self.job_table.stage_event(job_id, stage, status)
+                    if status == "running":
+                        self.log.insert(tk.END, f"\n[{os.path.basename(job_input)}] {stage}...\n")
+                elif tag == "job_done":
+                    self.job_table.finish_job(*msg)
+                elif tag == "job_metrics":
+                    job_id, fields = msg
+                    self.job_table.update_job(job_id, **fields)
+                elif tag == "thumbnail":
+                    self.add_gallery_item(*msg)
+                elif tag == "batch_done":
+                    self.batch_running = False
+                    self.batch_runner = None
+                    self.log.insert(tk.END, f"\nBatch finished: {msg['done']} done, {msg['failed']} failed, "
+                                            f"{msg['skipped']} skipped.\n")
+                    if not getattr(self, '_closing', False):
+                        self.convert_btn.config(state=tk.NORMAL)
+                        messagebox.showinfo("Batch done", f"{msg['done']} file(s) converted, {msg['failed']} failed")
         except queue.Empty:
             # Nothing left
             pass
         if getattr(self, '_closing', False):
             return
-        if (self.proc and self.proc.poll() is None) or self.simplify_running:
+        self.log.see(tk.END)
+        if backlog:
+            if self._after_id is None:
+                self._after_id = self.after(1, self.poll_queue)
+            return
+        if (self.proc and self.proc.poll() is None) or self.simplify_running or self.postprocess_running or self.batch_running:
             # Still running; poll again
-            self._after_id = self.after(200, self.poll_queue)
+            self.ensure_polling()
         else:
             # Process ended or failed to start; ensure button enabled
             if not getattr(self, '_closing', False):
                 self.convert_btn.config(state=tk.NORMAL)
 
-    def run_simplification(self, model_path, ratio):
-        """Run Blender simplification on the converted model using a log file for output."""
+    def run_simplifications(self, model_paths):
+        """Simplify each glTF output in turn and report per-output status."""
+        all_ok = True
+        for model_path in model_paths:
+            ok = self.run_simplification(model_path)
+            self.output_queue.put(("output_status", (model_path, "simplified" if ok else "simplify failed")))
+            all_ok = all_ok and ok
+        self.output_queue.put(("simplify_done", all_ok))
+
+    def run_simplification(self, model_path):
+        """Run Blender simplification on one model using a log file for output. Returns success."""
+        lease = self.governor.acquire("simplify", os.path.getsize(model_path), self.governor.total_cores)
         try:
-            blender = self.blender_path_var.get().strip()
-            
-            # Get the path to the blender_simplify.py script
-            if getattr(sys, 'frozen', False) and hasattr(sys, '_MEIPASS'):
-                script_dir = sys._MEIPASS
-            else:
-                script_dir = os.path.dirname(os.path.abspath(__file__))
-            script_path = os.path.join(script_dir, "blender_simplify.py")
-            
-            if not os.path.exists(script_path):
-                self.output_queue.put(("err", f"ERROR: Blender script not found at {script_path}\n"))
-                self.output_queue.put(("simplify_done", False))
-                return
-            
-            # Log file to track progress
-            log_file = model_path + ".simplify.log"
-            
-            # Run Blender with the script and arguments
-            cmd = [blender, "-b", "-P", script_path, "--", model_path, str(ratio)]
-            if not self.preprocess_var.get():
-                cmd.append("--no-preprocess")
-            if not self.advanced_simplify_var.get():
-                cmd.append("--no-advanced")
-            if not self.delete_loose_var.get():
-                cmd.append("--no-delete-loose")
-            if self.smooth_normals_var.get():
-                cmd.append("--smooth")
-            
-            self.output_queue.put(("out", f"> Running: {' '.join(cmd)}\n"))
-            
-            try:
-                proc = subprocess.Popen(
-                    cmd,
-                    stdout=subprocess.DEVNULL,
-                    stderr=subprocess.DEVNULL,
-                    creationflags=subprocess.CREATE_NEW_PROCESS_GROUP if sys.platform == 'win32' else 0
-                )
-            except Exception as e:
-                self.output_queue.put(("err", f"ERROR: Failed to start Blender: {e}\n"))
-                self.output_queue.put(("simplify_done", False))
-                return
-            
-            # Monitor process and read log file
-            timeout_seconds = 300
-            start_time = time.time()
-            last_log_pos = 0
-            process_completed = False
-            export_logged = False
-            
-            while True:
-                elapsed = time.time() - start_time
-                
-                # Check for timeout
-                if elapsed > timeout_seconds:
-                    self.output_queue.put(("err", f"ERROR: Blender process timed out after {timeout_seconds} seconds\n"))
-                    try:
-                        proc.terminate()
-                        proc.wait(timeout=5)
-                    except:
-                        try:
-                            proc.kill()
-                        except:
-                            pass
-                    self.output_queue.put(("simplify_done", False))
-                    return
-                
-                # Check if process has completed
-                if proc.poll() is not None:
-                    process_completed = True
-                
-                # Read new lines from log file
-                if os.path.exists(log_file):
-                    try:
-                        with open(log_file, 'r', encoding='utf-8') as f:
-                            f.seek(last_log_pos)
-                            new_lines = f.read()
-                            if new_lines:
-                                self.output_queue.put(("out", new_lines))
-                                if (not export_logged) and ("Export successful" in new_lines):
-                                    export_logged = True
-                                    self.output_queue.put(("out", "Export done. Waiting for Blender to exit...\n"))
-                            last_log_pos = f.tell()
-                    except:
-                        pass
-                
-                # If process completed and we've read the log, we're done
-                if process_completed:
-                    # Final read to catch any last lines
-                    if os.path.exists(log_file):
-                        try:
-                            with open(log_file, 'r', encoding='utf-8') as f:
-                                f.seek(last_log_pos)
-                                remaining = f.read()
-                                if remaining:
-                                    self.output_queue.put(("out", remaining))
-                        except:
-                            pass
-                    
-                    rc = proc.returncode
-                    success = rc == 0
-                    self.output_queue.put(("simplify_done", success))
-                    return
-                
-                time.sleep(0.1)  # Poll more frequently
-            
-        except Exception as e:
-            self.output_queue.put(("err", f"Simplification error: {e}\n"))
-            import traceback
-            self.output_queue.put(("err", traceback.format_exc() + "\n"))
-            self.output_queue.put(("simplify_done", False))
+            return pipeline.run_simplify(self.current_blender, model_path, self.current_options, self.output_queue.put,
+                                         on_start=lease.attach, threads=lease.threads)
+        finally:
+            lease.release()
+
+    def start_postprocess(self, model_paths, optimize=None, thumbnails=None):
+        """
+        Run the in-process GLB stages (optimise, thumbnail) in a background thread.
+        `optimize` is a dict of glb_optimize passes, or False to skip optimisation.
+        Unset stages follow the current job's settings snapshot, not the live UI.
+        """
+        if optimize is None or thumbnails is None:
+            options = self.current_options
+            optimize = options["optimize"] if optimize is None else optimize
+            thumbnails = options["thumbnails"] if thumbnails is None else thumbnails
+        if not (optimize or thumbnails):
+            return
+        if not HAS_NUMPY:
+            self.log.insert(tk.END, "GLB post-processing unavailable: NumPy is not installed\n")
+            return
+        model_paths = [p for p in model_paths if p.lower().endswith(('.glb', '.gltf')) and os.path.exists(p)]
+        if not model_paths:
+            return
+        self.postprocess_running += len(model_paths)
+        t = threading.Thread(target=self.run_postprocess, args=(model_paths, optimize, thumbnails))
+        t.daemon = True
+        t.start()
+        self.ensure_polling()
+
+    def run_postprocess(self, model_paths, optimize, thumbnails):
+        """Process each model and report results through the output queue."""
+        emit = self.output_queue.put
+        for model in model_paths:
+            if optimize and model.lower().endswith('.glb'):
+                pipeline.optimize_output(model, optimize, emit)
+            png = pipeline.thumbnail_output(model, emit) if thumbnails else None
+            self.output_queue.put(("post_done", (model, png) if png else None))
+
+    def add_gallery_item(self, model_path, thumb_path):
+        """Add or refresh a rendered result in the gallery."""
+        known = any(item[0] == model_path for item in self.gallery_items)
+        if known:
+            self.gallery_items = [(m, thumb_path if m == model_path else t) for m, t in self.gallery_items]
+        else:
+            self.gallery_items.append((model_path, thumb_path))
+        if self.gallery_win is None or not self.gallery_win.winfo_exists():
+            return
+        # Only the new or changed cell is built, so adding hundreds of results stays linear
+        if model_path in self.gallery_cells:
+            self.update_gallery_cell(model_path, thumb_path)
+        else:
+            self.add_gallery_cell(len(self.gallery_cells), model_path, thumb_path)
+
+    def show_gallery(self):
+        """Show a scrolling gallery of rendered result thumbnails."""
+        if self.gallery_win is not None and self.gallery_win.winfo_exists():
+            self.gallery_win.lift()
+            return
+
+        win = tk.Toplevel(self)
+        win.title("Results gallery")
+        win.geometry("1100x650")
+        self.gallery_win = win
+
+        top = ttk.Frame(win)
+        top.pack(fill=tk.X, padx=8, pady=6)
+        ttk.Button(top, text="Add folder...", command=self.add_gallery_folder,
+                   state=tk.NORMAL if HAS_NUMPY else tk.DISABLED).pack(side=tk.LEFT)
+        ttk.Button(top, text="Clear", command=self.clear_gallery).pack(side=tk.LEFT, padx=6)
+        ttk.Button(top, text="Close", command=win.destroy).pack(side=tk.RIGHT)
+
+        body = ttk.Frame(win)
+        body.pack(fill=tk.BOTH, expand=True, padx=8, pady=(0, 8))
+        self.gallery_canvas = tk.Canvas(body, highlightthickness=0)
+        scrollbar = ttk.Scrollbar(body, orient=tk.VERTICAL, command=self.gallery_canvas.yview)
+        self.gallery_canvas.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.gallery_canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        self.gallery_inner = ttk.Frame(self.gallery_canvas)
+        self.gallery_canvas.create_window((0, 0), window=self.gallery_inner, anchor=tk.NW)
+        self.gallery_inner.bind(
+            "<Configure>",
+            lambda e: self.gallery_canvas.configure(scrollregion=self.gallery_canvas.bbox("all")))
+        self.gallery_canvas.bind(
+            "<MouseWheel>", lambda e: self.gallery_canvas.yview_scroll(int(-e.delta / 120), "units"))
+
+        self.refresh_gallery()
+
+    def refresh_gallery(self):
+        """Rebuild the gallery grid from gallery_items."""
+        for child in self.gallery_inner.winfo_children():
+            child.destroy()
+        self.gallery_cells = {}
+        for i, (model, thumb) in enumerate(self.gallery_items):
+            self.add_gallery_cell(i, model, thumb)
+
+    def add_gallery_cell(self, index, model, thumb):
+        """Create the grid cell for one gallery entry at position `index`."""
+        columns = 2
+        cell = ttk.Frame(self.gallery_inner, padding=4)
+        cell.grid(row=index // columns, column=index % columns, sticky=tk.NW)
+        btn = ttk.Button(cell, command=lambda m=model: self.open_gallery_model(m))
+        btn.pack()
+        ttk.Label(cell, text=os.path.basename(model)).pack(anchor=tk.W)
+        self.gallery_cells[model] = {"button": btn, "image": None}
+        self.update_gallery_cell(model, thumb)
+
+    def update_gallery_cell(self, model, thumb):
+        """Load (or reload) the thumbnail of one gallery cell."""
+        entry = self.gallery_cells[model]
+        try:
+            img = tk.PhotoImage(file=thumb)
+        except tk.TclError:
+            return
+        # Keep a reference so Tk does not discard the image
+        entry["image"] = img
+        entry["button"].configure(image=img)
+
+    def open_gallery_model(self, model_path):
+        """Open a gallery entry in the external viewer."""
+        preview_thread = threading.Thread(target=self.show_3d_preview, args=(model_path,))
+        preview_thread.daemon = True
+        preview_thread.start()
+
+    def add_gallery_folder(self):
+        """Add every GLB/GLTF in a folder to the gallery, rendering missing thumbnails."""
+        folder = filedialog.askdirectory(title="Select results folder")
+        if not folder:
+            return
+        models = thumbnail.find_models([folder])
+        self.log.insert(tk.END, f"Gallery: {len(models)} model(s) found in {folder}\n")
+        self.log.see(tk.END)
+        self.start_postprocess(models, optimize=False, thumbnails=True)
+
+    def clear_gallery(self):
+        self.gallery_items = []
+        self.refresh_gallery()
 
     def open_output_folder(self):
         out = self.output_path_var.get().strip()
@@ -0,0 +1,328 @@
+"""
+Journaled batch runner: converts a list of STEP files through the
+convert / simplify / optimise / thumbnail stages, recording each stage in
+the JobJournal so an interrupted batch resumes where it stopped.
+
+Jobs run in parallel under a ResourceGovernor, which hands each stage a
+core budget and admits it only when its memory estimate fits.
+
+Usage: python batch.py --resume [--journal PATH] [--jobs N]
+       python batch.py <input.step> [...] [--mayo PATH] [--jobs N]
+"""
+
+import os
+import queue
+import sys
+import threading
+import time
+
+import pipeline
+import resources
+from journal import DEFAULT_PATH, STAGES, JobJournal
+
+
+def default_options():
+    """Job options used by the command line (convert to GLB only)."""
+    return {"extra_formats": [], "simplify": False, "optimize": False, "thumbnails": False}
+
+
+def job_stages(options):
+    """Stages a job needs, in order."""
+    stages = ["convert"]
+    if options.get("simplify"):
+        stages.append("simplify")
+    if options.get("optimize"):
+        stages.append("optimize")
+    if options.get("thumbnails"):
+        stages.append("thumbnail")
+    return [s for s in STAGES if s in stages]
+
+
+def output_hashes(paths):
+    return {p: pipeline.file_hash(p) for p in paths}
+
+
+class BatchRunner:
+    """
+    Runs the jobs of a journaled batch on `workers` threads (0 = auto).
+
+    Events go to `emit` as (tag, message) tuples: "out"/"err" log lines,
+    ("job_status", (job_id, input, stage, status)), ("job_metrics", (job_id, fields))
+    with triangle counts and output size, ("thumbnail", (model, png)),
+    ("job_done", (job_id, ok)) when a job has no stages left, and finally
+    ("batch_done", summary) unless the runner was stopped.
+    """
+
+    def __init__(self, journal, mayo, blender, emit, workers=0, governor=None):
+        self.journal = journal
+        self.mayo = mayo
+        self.blender = blender
+        self.emit = emit
+        self.workers = workers or resources.default_workers()
+        self.governor = governor or resources.ResourceGovernor(emit)
+        # Cores per stage, so parallel jobs split the machine instead of each taking all of it
+        self.cores = self.governor.cores_per_job(self.workers)
+        self._procs = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def stop(self):
+        """Stop after the current stage; running processes are terminated and their jobs stay resumable."""
+        self._stop.set()
+        with self._lock:
+            procs = list(self._procs)
+        for proc in procs:
+            if proc.poll() is None:
+                try:
+                    proc.terminate()
+                except Exception:
+                    pass
+
+    @property
+    def stopped(self):
+        return self._stop.is_set()
+
+    def _on_start(self, lease):
+        def on_start(proc):
+            with self._lock:
+                self._procs = [p for p in self._procs if p.poll() is None] + [proc]
+            lease.attach(proc)
+        return on_start
+
+    def _leased(self, stage, size, run):
+        """
+        Run `run(lease)` under a governor lease. A process the OOM killer ended
+        while sharing the machine is retried once with the machine to itself.
+        Returns run's result, or None if the batch was stopped while queued.
+        """
+        for exclusive in (False, True):
+            lease = self.governor.acquire(stage, size, self.cores, stop=self._stop, exclusive=exclusive)
+            if lease is None:
+                return None
+            try:
+                result = run(lease)
+            finally:
+                lease.release()
+            if not lease.killed or self.stopped or exclusive:
+                return result
+            self.emit(("err", f"{stage} was killed (out of memory?); retrying when no other job is running\n"))
+        return result
+
+    def run(self, batch_id):
+        """Run every unfinished job of a batch. Returns a summary dict."""
+        summary = {"batch": batch_id, "done": 0, "failed": 0, "skipped": 0}
+        pending = queue.Queue()
+        for job in self.journal.jobs(batch_id):
+            if job["status"] in ("done", "failed"):
+                summary["skipped"] += 1
+            else:
+                pending.put(job)
+
+        def worker():
+            while not self.stopped:
+                try:
+                    job = pending.get_nowait()
+                except queue.Empty:
+                    return
+                ok = self.run_job(job)
+                if self.stopped:
+                    return
+                self.emit(("job_done", (job["id"], ok)))
+                with self._lock:
+                    summary["done" if ok else "failed"] += 1
+
+        threads = [threading.Thread(target=worker) for _ in range(max(1, min(self.workers, pending.qsize())))]
+        for t in threads:
+            t.daemon = True
+            t.start()
+        for t in threads:
+            t.join()
+        if not self.stopped:
+            self.journal.finish_batch(batch_id)
+            self.emit(("batch_done", summary))
+        return summary
+
+    def resume_index(self, job, stages):
+        """
+        Index of the first stage to run. Completed stages are skipped only if the
+        outputs still hash to what the journal recorded after the last of them.
+        """
+        records = self.journal.stage_records(job["id"])
+        done = 0
+        while done < len(stages) and records.get(stages[done], {}).get("status") == "done":
+            done += 1
+        if done == 0:
+            return 0
+        recorded = records[stages[done - 1]]["hashes"]
+        if recorded and all(pipeline.file_hash(p) == h for p, h in recorded.items()):
+            return done
+        self.emit(("out", f"Outputs of {job['input']} changed since the last run; starting over\n"))
+        return 0
+
+    def run_job(self, job):
+        """Run the remaining stages of one job. Returns success."""
+        options = job["options"]
+        stages = job_stages(options)
+        start = self.resume_index(job, stages)
+        if start:
+            self.emit(("out", f"Resuming {job['input']} at stage '{stages[start]}'\n"
+                              if start < len(stages) else f"{job['input']} already complete\n"))
+
+        for stage in stages[start:]:
+            if self.stopped:
+                return False
+            self.journal.start_stage(job["id"], stage)
+            self.emit(("job_status", (job["id"], job["input"], stage, "running")))
+            started = time.time()
+            try:
+                ok, tracked = getattr(self, "stage_" + stage)(job, started)
+            except Exception as e:
+                self.emit(("err", f"{stage} error for {job['input']}: {e}\n"))
+                ok, tracked = False, []
+            if self.stopped:
+                # Leave the stage 'running' so it is retried on resume
+                return False
+            self.journal.finish_stage(job["id"], stage, ok, output_hashes(tracked))
+            self.emit(("job_status", (job["id"], job["input"], stage, "done" if ok else "failed")))
+            self.emit(("out", f"{os.path.basename(job['input'])}: {stage} "
+                              f"{'done' if ok else 'failed'} ({time.time() - started:.1f}s)\n"))
+            if not ok:
+                return False
+
+        self.journal.finish_job(job["id"])
+        self.emit_metrics(job, "tris_after")
+        return True
+
+    def emit_metrics(self, job, triangles_field):
+        """Report the primary output's size and triangle count (as tris_before or tris_after)."""
+        primary = job["outputs"][0]
+        if not os.path.exists(primary):
+            return
+        fields = {"size": os.path.getsize(primary)}
+        if pipeline.needs_simplification(primary):
+            try:
+                fields[triangles_field] = pipeline.glb_triangle_count(primary)
+            except (OSError, ValueError, KeyError, IndexError):
+                pass
+        self.emit(("job_metrics", (job["id"], fields)))
+
+    def _models(self, job):
+        return [o for o in job["outputs"] if pipeline.needs_simplification(o) and os.path.exists(o)]
+
+    def stage_convert(self, job, started):
+        outputs = job["outputs"]
+        settings = pipeline.mesh_settings_file(job["input"], job["options"], self.emit)
+        cmd = pipeline.build_convert_command(self.mayo, job["input"], [pipeline.partial_path(o) for o in outputs], settings)
+        self.emit(("out", f"> Running: {' '.join(cmd)}\n"))
+        try:
+            rc = self._leased("convert", os.path.getsize(job["input"]),
+                              lambda lease: pipeline.run_process(cmd, self.emit, on_start=self._on_start(lease)))
+        finally:
+            if settings:
+                os.remove(settings)
+        pipeline.finalize_outputs(outputs, rc == 0 and not self.stopped)
+        statuses = {o: pipeline.output_status(o, started) for o in outputs}
+        for out, status in statuses.items():
+            if status != "ok":
+                self.emit(("err", f"{out}: {status}\n"))
+        self.emit_metrics(job, "tris_before")
+        return rc == 0 and statuses[outputs[0]] == "ok", outputs
+
+    def stage_simplify(self, job, started):
+        if not self.blender or not os.path.exists(self.blender):
+            self.emit(("err", "ERROR: Blender executable not found\n"))
+            return False, job["outputs"]
+        ok = True
+        for model in self._models(job):
+            ok = self._leased("simplify", os.path.getsize(model), lambda lease: pipeline.run_simplify(
+                self.blender, model, job["options"], self.emit,
+                on_start=self._on_start(lease), threads=lease.threads)) and ok
+            if self.stopped:
+                break
+        return ok, job["outputs"]
+
+    def stage_optimize(self, job, started):
+        # In-process stages take a lease for memory admission only
+        ok = True
+        for model in self._models(job):
+            if model.lower().endswith('.glb'):
+                ok = self._leased("optimize", os.path.getsize(model), lambda lease: pipeline.optimize_output(
+                    model, job["options"]["optimize"], self.emit)) and ok
+        return ok, job["outputs"]
+
+    def stage_thumbnail(self, job, started):
+        tracked = list(job["outputs"])
+        ok = True
+        for model in self._models(job):
+            png = self._leased("thumbnail", os.path.getsize(model),
+                               lambda lease: pipeline.thumbnail_output(model, self.emit))
+            if png:
+                tracked.append(png)
+                self.emit(("thumbnail", (model, png)))
+            else:
+                ok = False
+        return ok, tracked
+
+
+def main():
+    """Main entry point for the script."""
+    args = sys.argv[1:]
+    journal_path = DEFAULT_PATH
+    mayo = "mayo-conv"
+    resume = False
+    workers = 0
+    inputs = []
+    i = 0
+    while i < len(args):
+        if args[i] == "--journal" and i + 1 < len(args):
+            journal_path = args[i + 1]
+            i += 1
+        elif args[i] == "--mayo" and i + 1 < len(args):
+            mayo = args[i + 1]
+            i += 1
+        elif args[i] == "--jobs" and i + 1 < len(args):
+            try:
+                workers = int(args[i + 1])
+            except ValueError:
+                print(f"ERROR: Invalid job count: {args[i + 1]}")
+                return False
+            i += 1
+        elif args[i] == "--resume":
+            resume = True
+        else:
+            inputs.append(args[i])
+        i += 1
+
+    def emit(event):
+        tag, msg = event
+        if tag in ("out", "err"):
+            sys.stdout.write(msg)
+        elif tag == "batch_done":
+            print(f"Batch {msg['batch']}: {msg['done']} done, {msg['failed']} failed, {msg['skipped']} skipped")
+
+    journal = JobJournal(journal_path)
+    try:
+        if resume:
+            batches = journal.incomplete_batches()
+            if not batches:
+                print("Nothing to resume")
+                return True
+            ok = True
+            for batch_id in batches:
+                info = journal.batch(batch_id)
+                summary = BatchRunner(journal, info["mayo"], info["blender"], emit, workers).run(batch_id)
+                ok = ok and summary["failed"] == 0
+            return ok
+        if not inputs:
+            print("ERROR: No input. Usage: python batch.py <input.step> [...] | --resume")
+            return False
+        jobs = [(inp, [os.path.splitext(inp)[0] + ".glb"], default_options()) for inp in inputs]
+        batch_id = journal.create_batch(mayo, "", jobs)
+        return BatchRunner(journal, mayo, "", emit, workers).run(batch_id)["failed"] == 0
+    finally:
+        journal.close()
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -1,18 +1,340 @@
 """
 Blender script for model simplification using decimation.
-Usage: blender -b -P blender_simplify.py -- <model_path> <reduction_ratio>
+Usage: blender -b -P blender_simplify.py -- <model_path> <reduction_ratio> [options]
+Options: --no-preprocess --no-advanced --no-delete-loose --smooth
+         --no-merge --merge-target=N --merge-max-verts=N
+         --tolerance-mm=X  (pick the lowest ratio per mesh within X mm deviation)
+         --dedupe-materials  (merge equivalent materials before planning merges)
+         --optimize  (run glb_optimize on the exported file)
+         --triangle-budget=N  (derive the ratio from N triangles; no decimation if within budget)
+         --cull-hidden  (remove meshes no exterior view can see)
+         --cull-mode=delete|decimate  (what to do with hidden meshes)
+         --cull-small-px=N  (remove meshes under N px when the model fills 1024 px)
 Based on working Blender script console approach.
 Writes progress to a log file for real-time monitoring.
 """
 
+import heapq
 import sys
 import os
 
 
+# Cluster cap on Blender mesh vertices. The glTF exporter splits vertices at
+# UV and normal seams, so exported clusters can exceed it (and uint16 indices)
+MERGE_MAX_VERTICES = 65535
+# Without a draw-call target, clusters are split until smaller than this
+# fraction of the scene diagonal so they stay useful for frustum culling
+MERGE_MAX_EXTENT = 0.25
+# Materials whose values agree within this are merged (about half an 8-bit step)
+MATERIAL_TOLERANCE = 0.002
+# Error-bounded decimation searches ratios in [TOLERANCE_MIN_RATIO, 1.0]
+TOLERANCE_MIN_RATIO = 0.01
+TOLERANCE_SEARCH_STEPS = 7
+# Hidden meshes kept with --cull-mode=decimate are reduced to this ratio
+CULL_DECIMATE_RATIO = 0.05
+# Above this the hidden-part pass is skipped so simplification fits within pipeline.SIMPLIFY_TIMEOUT
+MAX_CULL_TRIANGLES = 4_000_000
+
+# Sibling modules (mesh_metrics, visibility) live next to this script
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def plan_merge_clusters(items, max_vertices=MERGE_MAX_VERTICES, target_draw_calls=None,
+                        max_extent=MERGE_MAX_EXTENT):
+    """
+    Group meshes into merge clusters by material and spatial proximity.
+    
+    Each item is a dict with 'key', 'material' (tuple of material names),
+    'bbox_min', 'bbox_max' and 'vertices'. Every material group starts as one
+    cluster and is split BVH-style at the median of its longest axis. Clusters
+    over max_vertices are always split. After that the largest cluster is split
+    until the draw-call count reaches target_draw_calls, or, without a target,
+    until no cluster is wider than max_extent of the scene diagonal.
+    Returns a list of clusters, each a list of item keys.
+    """
+    if not items:
+        return []
+    
+    lo = [min(it["bbox_min"][k] for it in items) for k in range(3)]
+    hi = [max(it["bbox_max"][k] for it in items) for k in range(3)]
+    scene_size = _diagonal(lo, hi) or 1.0
+    
+    def draw_calls(cluster):
+        return max(1, len(cluster[0]["material"]))
+    
+    def split(cluster):
+        centers = [_center(it) for it in cluster]
+        spread = [max(c[k] for c in centers) - min(c[k] for c in centers) for k in range(3)]
+        axis = spread.index(max(spread))
+        order = sorted(range(len(cluster)), key=lambda i: centers[i][axis])
+        half = len(cluster) // 2
+        return [cluster[i] for i in order[:half]], [cluster[i] for i in order[half:]]
+    
+    groups = {}
+    for it in items:
+        groups.setdefault(it["material"], []).append(it)
+    
+    # Enforce the vertex cap first
+    pending = list(groups.values())
+    clusters = []
+    while pending:
+        cluster = pending.pop()
+        if len(cluster) > 1 and sum(it["vertices"] for it in cluster) > max_vertices:
+            pending.extend(split(cluster))
+        else:
+            clusters.append(cluster)
+    
+    # Then split the widest clusters first for better culling
+    total = sum(draw_calls(c) for c in clusters)
+    heap = [(-_cluster_extent(c), n, c) for n, c in enumerate(clusters)]
+    heapq.heapify(heap)
+    counter = len(heap)
+    final = []
+    while heap:
+        neg_extent, _n, cluster = heapq.heappop(heap)
+        if target_draw_calls:
+            wanted = total + draw_calls(cluster) <= target_draw_calls
+        else:
+            wanted = -neg_extent > max_extent * scene_size
+        if len(cluster) < 2 or not wanted:
+            final.append(cluster)
+            if len(cluster) >= 2 and not target_draw_calls:
+                # Heap is ordered by extent, so nothing else needs splitting
+                final.extend(c for _e, _n, c in heap)
+                break
+            # With a target, a cluster with fewer draw calls may still fit
+            continue
+        total += draw_calls(cluster)
+        for part in split(cluster):
+            heapq.heappush(heap, (-_cluster_extent(part), counter, part))
+            counter += 1
+    
+    return [[it["key"] for it in cluster] for cluster in final]
+
+
+def _center(item):
+    return [(item["bbox_min"][k] + item["bbox_max"][k]) / 2.0 for k in range(3)]
+
+
+def _diagonal(lo, hi):
+    return sum((hi[k] - lo[k]) ** 2 for k in range(3)) ** 0.5
+
+
+def _cluster_extent(cluster):
+    lo = [min(it["bbox_min"][k] for it in cluster) for k in range(3)]
+    hi = [max(it["bbox_max"][k] for it in cluster) for k in range(3)]
+    return _diagonal(lo, hi)
+
+
+def count_draw_calls(obj):
+    """The glTF exporter writes one primitive (draw call) per used material slot."""
+    return max(1, len(obj.material_slots))
+
+
+def remove_childless_empties():
+    """Delete empty objects with no children, repeating up the hierarchy. Returns the count removed."""
+    import bpy
+    
+    removed = 0
+    while True:
+        empties = [obj for obj in bpy.context.scene.objects if obj.type == 'EMPTY' and not obj.children]
+        if not empties:
+            return removed
+        for obj in empties:
+            bpy.data.objects.remove(obj, do_unlink=True)
+        removed += len(empties)
+
+
+def blender_material_key(mat, tolerance):
+    """Hashable description of a material's node values, quantised to `tolerance`."""
+    def quantize(value):
+        if isinstance(value, (str, bytes)):
+            # Iterating a string yields strings, forever
+            return value
+        try:
+            return tuple(quantize(v) for v in value)
+        except TypeError:
+            pass
+        if isinstance(value, float):
+            return round(value / tolerance)
+        return value
+    
+    if not mat.use_nodes or not mat.node_tree:
+        return ("flat", quantize(tuple(mat.diffuse_color)), quantize(mat.metallic), quantize(mat.roughness))
+    
+    nodes = {}
+    for node in mat.node_tree.nodes:
+        entry = [node.bl_idname]
+        if node.bl_idname == 'ShaderNodeTexImage':
+            entry.append(node.image.name if node.image else None)
+        for inp in node.inputs:
+            if inp.is_linked:
+                entry.append((inp.identifier, "linked"))
+            elif hasattr(inp, "default_value"):
+                entry.append((inp.identifier, quantize(inp.default_value)))
+        nodes[node.name] = tuple(entry)
+    # Wiring by node description rather than name, so renamed copies still match
+    links = [(nodes.get(link.from_node.name), link.from_socket.identifier,
+              nodes.get(link.to_node.name), link.to_socket.identifier)
+             for link in mat.node_tree.links]
+    return ("nodes", mat.blend_method, mat.use_backface_culling,
+            tuple(sorted(nodes.values(), key=repr)), tuple(sorted(links, key=repr)))
+
+
+def dedupe_blender_materials(objects, tolerance):
+    """Point material slots at one representative per group of equivalent materials. Returns (before, after)."""
+    representative = {}
+    used = set()
+    for obj in objects:
+        for slot in obj.material_slots:
+            if slot.material:
+                used.add(slot.material.name)
+                key = blender_material_key(slot.material, tolerance)
+                rep = representative.setdefault(key, slot.material)
+                if rep is not slot.material:
+                    slot.material = rep
+    return len(used), len(representative)
+
+
+def mesh_world_arrays(mesh, matrix):
+    """Return world-space vertices (N, 3) and triangle indices (M, 3) of a Blender mesh."""
+    import numpy as np
+    
+    mesh.calc_loop_triangles()
+    co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", co)
+    tris = np.empty(len(mesh.loop_triangles) * 3, dtype=np.int32)
+    mesh.loop_triangles.foreach_get("vertices", tris)
+    m = np.array(matrix, dtype=np.float64)
+    verts = co.reshape(-1, 3).astype(np.float64) @ m[:3, :3].T + m[:3, 3]
+    return verts, tris.reshape(-1, 3).astype(np.int64)
+
+
+def find_tolerance_ratio(obj, dec, tolerance):
+    """
+    Binary-search the lowest decimate ratio whose result stays within `tolerance`
+    (sampled Hausdorff distance in scene units) of the original mesh.
+    Leaves `dec.ratio` set to the chosen value and returns
+    (ratio, error, triangles_before, triangles_after).
+    """
+    import bpy
+    from mesh_metrics import TriangleGrid, hausdorff_distance
+    
+    verts, tris = mesh_world_arrays(obj.data, obj.matrix_world)
+    # The original mesh is measured against at every step, so index it once
+    grid = TriangleGrid(verts, tris, tolerance)
+    
+    def evaluate(ratio):
+        dec.ratio = ratio
+        depsgraph = bpy.context.evaluated_depsgraph_get()
+        eval_obj = obj.evaluated_get(depsgraph)
+        mesh = eval_obj.to_mesh()
+        try:
+            new_verts, new_tris = mesh_world_arrays(mesh, obj.matrix_world)
+        finally:
+            eval_obj.to_mesh_clear()
+        error = hausdorff_distance(verts, tris, new_verts, new_tris, tolerance, grid_a=grid)
+        return error, len(new_tris)
+    
+    best = (1.0, 0.0, len(tris))
+    lo, hi = TOLERANCE_MIN_RATIO, 1.0
+    error, count = evaluate(lo)
+    if error <= tolerance:
+        best = (lo, error, count)
+    else:
+        for _ in range(TOLERANCE_SEARCH_STEPS):
+            mid = (lo + hi) / 2.0
+            error, count = evaluate(mid)
+            if error <= tolerance:
+                hi = mid
+                best = (mid, error, count)
+            else:
+                lo = mid
+    
+    dec.ratio = best[0]
+    return best[0], best[1], len(tris), best[2]
+
+
+def cull_parts(meshes, options, log):
+    """
+    Visibility pass run before decimation. With cull_hidden, meshes that no
+    ray from outside the bounding sphere reaches are deleted (or decimated to
+    CULL_DECIMATE_RATIO with cull_mode "decimate"); models over
+    MAX_CULL_TRIANGLES skip this with a warning. With cull_small_px, meshes
+    smaller than that many pixels on a 1024 px view of the model are deleted.
+    Returns (kept, reduced): the meshes left for merging and decimation, and
+    the hidden meshes already decimated, which must not be reduced again.
+    """
+    import bpy
+    from visibility import part_visibility, scaled_resolution, screen_size
+    
+    arrays = [mesh_world_arrays(obj.data, obj.matrix_world) for obj in meshes]
+    triangles = [len(tris) for _verts, tris in arrays]
+    diagonals = [_diagonal(verts.min(axis=0), verts.max(axis=0)) if len(verts) else 0.0
+                 for verts, _tris in arrays]
+    points = [verts for verts, _tris in arrays if len(verts)]
+    if not points:
+        return meshes, []
+    scene_lo = [min(v[:, k].min() for v in points) for k in range(3)]
+    scene_hi = [max(v[:, k].max() for v in points) for k in range(3)]
+    scene_diagonal = _diagonal(scene_lo, scene_hi)
+    
+    hidden = set()
+    if options.get("cull_hidden", False) and sum(triangles) > MAX_CULL_TRIANGLES:
+        log(f"WARNING: Skipping hidden part removal: {sum(triangles)} triangles exceeds {MAX_CULL_TRIANGLES}")
+    elif options.get("cull_hidden", False):
+        resolution = scaled_resolution(sum(triangles))
+        log(f"Visibility pass: casting rays from views around the model ({resolution} px grid)...")
+        hits, spacing = part_visibility(arrays, resolution=resolution)
+        # A part narrower than the ray spacing can fall between rays, so it is only hidden if larger
+        hidden = {i for i in range(len(meshes)) if hits[i] == 0 and diagonals[i] >= spacing}
+    small = set()
+    min_px = options.get("cull_small_px", 0)
+    if min_px > 0:
+        small = {i for i in range(len(meshes))
+                 if screen_size(diagonals[i], scene_diagonal) < min_px} - hidden
+    
+    decimate = options.get("cull_mode", "delete") == "decimate"
+    kept = []
+    reduced = []
+    removed_tris = 0
+    for i, obj in enumerate(meshes):
+        if i in hidden and decimate:
+            try:
+                bpy.context.view_layer.objects.active = obj
+                dec = obj.modifiers.new(name="CullDecimate", type='DECIMATE')
+                dec.decimate_type = 'COLLAPSE'
+                dec.ratio = CULL_DECIMATE_RATIO
+                bpy.ops.object.modifier_apply(modifier=dec.name)
+                removed_tris += triangles[i] - len(mesh_world_arrays(obj.data, obj.matrix_world)[1])
+            except Exception as e:
+                log(f"  WARNING: {obj.name} decimation failed: {e}")
+            reduced.append(obj)
+        elif i in hidden or i in small:
+            removed_tris += triangles[i]
+            bpy.data.objects.remove(obj, do_unlink=True)
+        else:
+            kept.append(obj)
+    
+    total = sum(triangles)
+    if hidden:
+        log(f"  {len(hidden)} hidden mesh(es) {'decimated' if decimate else 'removed'}")
+    if small:
+        log(f"  {len(small)} mesh(es) under {min_px} px removed")
+    log(f"Culling: triangles {total} -> {total - removed_tris} "
+        f"({removed_tris / total * 100 if total else 0.0:.1f}% removed before decimation)")
+    if len(kept) + len(reduced) < len(meshes):
+        removed = remove_childless_empties()
+        if removed:
+            log(f"Removed {removed} empty node(s) left without children")
+    return kept, reduced
+
+
 def simplify_model(model_path, reduction_ratio, log_file=None, options=None):
     """Simplify a GLB/GLTF model using Blender's decimation modifier."""
     
     import bpy
+    from mathutils import Vector
     
     options = options or {}
     
@@ -66,27 +388,46 @@ def simplify_model(model_path, reduction_ratio, log_file=None, options=None):
                 log(f"  WARNING: {obj.name} pre-process failed: {e}")
                 bpy.ops.object.mode_set(mode='OBJECT')
     
-    # Categorize meshes
-    log("Analyzing mesh complexity...")
-    MIN_TRIANGLES = 500
-    
-    # First pass: identify meshes to merge (under MIN_TRIANGLES)
-    small_meshes = []
-    large_meshes = []
+    # Plan draw-call reduction: cluster meshes by material and spatial proximity
+    meshes = [obj for obj in bpy.context.scene.objects if obj.type == 'MESH']
+    # Hidden meshes already decimated by culling stay out of merging and decimation
+    reduced = []
+    if (options.get("cull_hidden", False) or options.get("cull_small_px", 0) > 0) and meshes:
+        try:
+            meshes, reduced = cull_parts(meshes, options, log)
+        except ImportError as e:
+            log(f"WARNING: Visibility culling unavailable: {e}")
+    if options.get("dedupe_materials", False):
+        try:
+            before, after = dedupe_blender_materials(meshes + reduced, MATERIAL_TOLERANCE)
+            log(f"Materials: {before} -> {after} after merging equivalent materials")
+        except Exception as e:
+            log(f"WARNING: Material deduplication failed: {e}")
     
-    for obj in bpy.context.scene.objects:
-        if obj.type != 'MESH':
-            continue
-        
-        mesh = obj.data
-        tri_count = len(mesh.polygons)
-        
-        if tri_count < MIN_TRIANGLES:
-            small_meshes.append(obj)
+    # Triangle budget: the ratio comes from what is left after culling
+    budget = options.get("triangle_budget", 0)
+    if budget > 0 and not options.get("tolerance_mm"):
+        from pipeline import budget_ratio
+        triangles = 0
+        reduced_triangles = 0
+        for obj in meshes + reduced:
+            obj.data.calc_loop_triangles()
+            if obj in reduced:
+                reduced_triangles += len(obj.data.loop_triangles)
+            else:
+                triangles += len(obj.data.loop_triangles)
+        # Reduced hidden meshes are not decimated again, so they use up part of the budget
+        ratio = budget_ratio(triangles, budget - reduced_triangles)
+        if ratio is None:
+            log(f"Triangle budget: {triangles} triangles, within the budget of {budget}; decimation skipped")
+            reduction_ratio = 1.0
         else:
-            large_meshes.append(obj)
+            log(f"Triangle budget: {triangles} triangles, decimating to {ratio:.0%} for the budget of {budget}")
+            reduction_ratio = ratio
     
-    log(f"Found {len(small_meshes)} small meshes and {len(large_meshes)} large meshes")
+    nodes_before = len(bpy.context.scene.objects)
+    draw_calls_before = sum(count_draw_calls(obj) for obj in meshes + reduced)
+    log(f"Found {len(meshes) + len(reduced)} meshes, {nodes_before} nodes, {draw_calls_before} draw calls")
     
     def merge_mesh_group(mesh_group, label):
         """Join a group of meshes into one, return merged object or None."""
@@ -99,39 +440,76 @@ def simplify_model(model_path, reduction_ratio, log_file=None, options=None):
         try:
             bpy.ops.object.join()
             merged_mesh = mesh_group[0]
-            log(f"  {label}: merged into {merged_mesh.name}")
+            log(f"  {label}: merged {len(mesh_group)} meshes into {merged_mesh.name}")
             return merged_mesh
         except Exception as e:
             log(f"  WARNING: {label} merge failed: {e}")
             return None
 
-    # Merge small meshes together if there are any
-    if len(small_meshes) > 0:
-        # Batch merges to avoid overly heavy single join in large scenes
-        MERGE_BATCH_SIZE = 50
-        log(f"Merging {len(small_meshes)} small meshes in batches of {MERGE_BATCH_SIZE}...")
-        merged_groups = []
-        for i in range(0, len(small_meshes), MERGE_BATCH_SIZE):
-            batch = small_meshes[i:i + MERGE_BATCH_SIZE]
-            merged = merge_mesh_group(batch, f"Small batch {i // MERGE_BATCH_SIZE + 1}")
+    if options.get("merge", True) and len(meshes) > 1:
+        # Estimate post-decimation vertex counts so the cap applies to the exported mesh
+        # (unknown in error-bounded mode, so assume no reduction there)
+        vertex_scale = reduction_ratio if options.get("advanced_simplify", True) else 1.0
+        if options.get("tolerance_mm"):
+            vertex_scale = 1.0
+        items = []
+        for i, obj in enumerate(meshes):
+            corners = [obj.matrix_world @ Vector(c) for c in obj.bound_box]
+            items.append({
+                "key": i,
+                "material": tuple(slot.material.name if slot.material else "" for slot in obj.material_slots),
+                "bbox_min": tuple(min(c[k] for c in corners) for k in range(3)),
+                "bbox_max": tuple(max(c[k] for c in corners) for k in range(3)),
+                "vertices": int(len(obj.data.vertices) * vertex_scale),
+            })
+        
+        max_vertices = options.get("merge_max_vertices", MERGE_MAX_VERTICES)
+        target = options.get("merge_target")
+        clusters = plan_merge_clusters(items, max_vertices=max_vertices, target_draw_calls=target)
+        log(f"Merging meshes into {len(clusters)} cluster(s) "
+            f"(max {max_vertices} vertices per cluster, target draw calls: {target or 'auto'})...")
+        
+        merged_meshes = []
+        for n, cluster in enumerate(clusters):
+            group = [meshes[k] for k in cluster]
+            if len(group) == 1:
+                merged_meshes.extend(group)
+                continue
+            merged = merge_mesh_group(group, f"Cluster {n + 1}")
             if merged:
-                merged_groups.append(merged)
+                merged_meshes.append(merged)
             else:
                 # Fall back to individual meshes when merge fails
-                merged_groups.extend(batch)
-
-        # Add merged groups to large meshes for simplification
-        large_meshes.extend(merged_groups)
+                merged_meshes.extend(group)
+        meshes = merged_meshes
+        
+        removed = remove_childless_empties()
+        if removed:
+            log(f"Removed {removed} empty node(s) left without children")
+    
+    nodes_after = len(bpy.context.scene.objects)
+    draw_calls_after = sum(count_draw_calls(obj) for obj in meshes + reduced)
+    log(f"Nodes: {nodes_before} -> {nodes_after}")
+    log(f"Draw calls: {draw_calls_before} -> {draw_calls_after}")
+    if options.get("merge_target") and draw_calls_after > options["merge_target"]:
+        log(f"  NOTE: target of {options['merge_target']} draw calls not reached "
+            f"(limited by materials and the per-cluster vertex cap)")
     
     # Second pass: advanced simplification on all meshes
     simplified_count = 0
+    # Error-bounded mode: tolerance in scene units (glTF imports in metres)
+    tolerance = options.get("tolerance_mm", 0.0) / 1000.0
+    tolerance_tris_before = 0
+    tolerance_tris_after = 0
+    if tolerance:
+        log(f"Error-bounded decimation: max deviation {options['tolerance_mm']} mm per mesh")
     if not options.get("advanced_simplify", True):
         log("Skipping advanced simplification (disabled)")
-        large_meshes = []
+        meshes = []
     else:
-        log(f"Applying advanced simplification to {len(large_meshes)} mesh(es)...")
+        log(f"Applying advanced simplification to {len(meshes)} mesh(es)...")
     
-    for obj in large_meshes:
+    for obj in meshes:
         mesh = obj.data
         tri_count_before = len(mesh.polygons)
         
@@ -143,8 +521,15 @@ def simplify_model(model_path, reduction_ratio, log_file=None, options=None):
             # Main decimation
             dec = obj.modifiers.new(name="Decimate", type='DECIMATE')
             dec.decimate_type = 'COLLAPSE'
-            dec.ratio = reduction_ratio
             dec.use_collapse_triangulate = True
+            if tolerance:
+                ratio, error, tris_before, tris_after = find_tolerance_ratio(obj, dec, tolerance)
+                tolerance_tris_before += tris_before
+                tolerance_tris_after += tris_after
+                log(f"  {obj.name}: ratio {ratio:.3f}, max deviation {error * 1000.0:.4f} mm, "
+                    f"triangles {tris_before} -> {tris_after}")
+            else:
+                dec.ratio = reduction_ratio
             
             bpy.ops.object.modifier_apply(modifier=dec.name)
             
@@ -164,28 +549,44 @@ def simplify_model(model_path, reduction_ratio, log_file=None, options=None):
             obj.select_set(False)
             
             simplified_count += 1
-            simplified_count += 1
         except Exception as e:
             log(f"    ERROR: {e}")
             bpy.ops.object.mode_set(mode='OBJECT')
     
     log(f"Simplified {simplified_count} meshes")
+    if tolerance and tolerance_tris_before:
+        saved = tolerance_tris_before - tolerance_tris_after
+        log(f"Triangles: {tolerance_tris_before} -> {tolerance_tris_after} "
+            f"({saved / tolerance_tris_before * 100:.1f}% saved)")
     
     # Export the result
     log("Exporting simplified GLB...")
+    # Export next to the model and rename, so an interrupted export never leaves a half-written file
+    base, ext = os.path.splitext(model_path)
+    tmp_path = base + ".partial" + (ext if ext.lower() == '.glb' else '.glb')
     try:
         bpy.ops.export_scene.gltf(
-            filepath=model_path,
+            filepath=tmp_path,
             export_format='GLB',
             export_apply=True
         )
+        os.replace(tmp_path, model_path)
         log("Export successful")
-        return True
     except Exception as e:
         log(f"ERROR: Export failed: {e}")
         import traceback
         traceback.print_exc()
         return False
+    
+    if options.get("optimize", False):
+        log("Optimising exported GLB...")
+        try:
+            from glb_optimize import format_stats, optimize_glb
+            log(f"Optimised: {format_stats(optimize_glb(model_path, tolerance=MATERIAL_TOLERANCE))}")
+        except Exception as e:
+            # The export itself is valid; optimisation is best effort
+            log(f"WARNING: GLB optimisation failed: {e}")
+    return True
 
 
 def main():
@@ -214,6 +615,16 @@ def main():
         "advanced_simplify": True,
         "delete_loose": True,
         "smooth_normals": False,
+        "merge": True,
+        "merge_target": None,
+        "merge_max_vertices": MERGE_MAX_VERTICES,
+        "tolerance_mm": 0.0,
+        "dedupe_materials": False,
+        "optimize": False,
+        "triangle_budget": 0,
+        "cull_hidden": False,
+        "cull_mode": "delete",
+        "cull_small_px": 0.0,
     }
     for arg in args[2:]:
         if arg == "--no-preprocess":
@@ -224,6 +635,52 @@ def main():
             opts["delete_loose"] = False
         elif arg == "--smooth":
             opts["smooth_normals"] = True
+        elif arg == "--no-merge":
+            opts["merge"] = False
+        elif arg.startswith("--merge-target=") or arg.startswith("--merge-max-verts="):
+            name, value = arg.split("=", 1)
+            try:
+                value = int(value)
+            except ValueError:
+                print(f"ERROR: Invalid value for {name}: {value}")
+                return False
+            if name == "--merge-target":
+                opts["merge_target"] = value if value > 0 else None
+            else:
+                opts["merge_max_vertices"] = value
+        elif arg == "--dedupe-materials":
+            opts["dedupe_materials"] = True
+        elif arg == "--optimize":
+            opts["optimize"] = True
+        elif arg.startswith("--triangle-budget="):
+            value = arg.split("=", 1)[1]
+            try:
+                opts["triangle_budget"] = max(0, int(value))
+            except ValueError:
+                print(f"ERROR: Invalid triangle budget: {value}")
+                return False
+        elif arg == "--cull-hidden":
+            opts["cull_hidden"] = True
+        elif arg.startswith("--cull-mode="):
+            value = arg.split("=", 1)[1]
+            if value not in ("delete", "decimate"):
+                print(f"ERROR: Invalid cull mode: {value}")
+                return False
+            opts["cull_mode"] = value
+        elif arg.startswith("--cull-small-px="):
+            value = arg.split("=", 1)[1]
+            try:
+                opts["cull_small_px"] = max(0.0, float(value))
+            except ValueError:
+                print(f"ERROR: Invalid screen size: {value}")
+                return False
+        elif arg.startswith("--tolerance-mm="):
+            value = arg.split("=", 1)[1]
+            try:
+                opts["tolerance_mm"] = max(0.0, float(value))
+            except ValueError:
+                print(f"ERROR: Invalid tolerance: {value}")
+                return False
     
     if not os.path.exists(model_path):
         print(f"ERROR: Model file not found: {model_path}")
@@ -0,0 +1,631 @@
+"""
+Conversion farm: one coordinator hands jobs to worker processes on other
+machines over plain HTTP/JSON (standard library only).
+
+Workers register with their capacity (parallel job slots), pull jobs,
+download the input, run the convert and/or simplify stages with their
+local mayo-conv and Blender (a .glb input is a simplify-only job), stream
+(tag, message) events back in the same format the GUI output queue uses,
+and upload the outputs. A worker that
+stops sending heartbeats is dropped and its jobs are queued again.
+
+No authentication: run it on a trusted network only.
+
+Usage: python farm.py coordinator <input.step|input.glb> [...] --out DIR [--port N] [--simplify] [--ratio R]
+                                   [--quality PRESET|Auto] [--budget TRIANGLES]
+       python farm.py worker http://HOST:PORT [--mayo PATH] [--blender PATH] [--capacity N] [--workdir DIR]
+"""
+
+import json
+import math
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pipeline
+
+
+DEFAULT_PORT = 8765
+HEARTBEAT_INTERVAL = 2.0
+# A worker silent for this long is considered lost and its jobs are requeued
+WORKER_TIMEOUT = 10.0
+# Attempts per job before it is failed (worker losses count, tool failures do not retry)
+MAX_ATTEMPTS = 3
+EVENT_FLUSH_INTERVAL = 0.5
+POLL_INTERVAL = 1.0
+
+
+class Coordinator:
+    """
+    Job queue and HTTP endpoints for the farm.
+
+    Events go to `emit` as (tag, message): "out"/"err" lines relayed from
+    workers, ("job_status", (job_id, input, stage, status)), ("job_done",
+    (job_id, ok)) as each job finishes and finally ("batch_done", summary)
+    once every job has finished.
+    """
+
+    def __init__(self, out_dir, emit):
+        self.out_dir = out_dir
+        self.emit = emit
+        self.jobs = {}
+        self.workers = {}
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._server = None
+        self._next_job = 1
+        self._next_worker = 1
+
+    def submit(self, input_path, outputs, options):
+        """
+        Queue a job; `outputs` are file names written to out_dir. A .glb input
+        is only simplified, anything else is converted and optionally simplified.
+        Returns the job id.
+        """
+        with self._lock:
+            job_id = self._next_job
+            self._next_job += 1
+            if input_path.lower().endswith('.glb'):
+                stages = ["simplify"]
+            else:
+                stages = ["convert"] + (["simplify"] if options.get("simplify") else [])
+            self.jobs[job_id] = {
+                "id": job_id, "input": input_path, "outputs": [os.path.basename(o) for o in outputs],
+                "options": options, "stages": stages, "status": "pending",
+                "worker": None, "attempts": 0, "error": None,
+            }
+            self._done.clear()
+            return job_id
+
+    def serve(self, host="", port=DEFAULT_PORT):
+        """Start the HTTP server and the worker reaper in background threads."""
+        coordinator = self
+
+        class Handler(FarmRequestHandler):
+            farm = coordinator
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        for target in (self._server.serve_forever, self._reap_workers):
+            t = threading.Thread(target=target)
+            t.daemon = True
+            t.start()
+        return self._server.server_address
+
+    def shutdown(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+    def summary(self):
+        with self._lock:
+            statuses = [job["status"] for job in self.jobs.values()]
+        return {"done": statuses.count("done"), "failed": statuses.count("failed"),
+                "pending": statuses.count("pending"), "running": statuses.count("running")}
+
+    # -- worker protocol ----------------------------------------------------
+
+    def register(self, name, capacity):
+        """
+        Add a worker. A worker registering again under the same name (after a 410)
+        replaces its old entry, and jobs still leased to the old id move to the new
+        one so they keep counting against its capacity.
+        """
+        with self._lock:
+            worker_id = f"w{self._next_worker}"
+            self._next_worker += 1
+            for old_id in [wid for wid, w in self.workers.items() if w["name"] == name]:
+                del self.workers[old_id]
+                for job in self.jobs.values():
+                    if job["worker"] == old_id:
+                        job["worker"] = worker_id
+            self.workers[worker_id] = {"name": name, "capacity": max(1, int(capacity)), "last_seen": time.time()}
+        self.emit(("out", f"Worker {name} ({worker_id}) joined with capacity {capacity}\n"))
+        return worker_id
+
+    def touch(self, worker_id):
+        """Record a sign of life. Returns False for unknown (reaped) workers."""
+        with self._lock:
+            worker = self.workers.get(worker_id)
+            if worker is None:
+                return False
+            worker["last_seen"] = time.time()
+            return True
+
+    def lease(self, worker_id, slots=None):
+        """
+        Hand out jobs to a worker: no more than its free slots (as reported by the
+        worker in `slots`, and by the jobs leased to it here), and no more than its
+        capacity-weighted share of the pending jobs, so larger workers get more.
+        """
+        with self._lock:
+            # The reaper may have dropped the worker since its request was accepted
+            worker = self.workers.get(worker_id)
+            if worker is None:
+                return []
+            running = sum(1 for job in self.jobs.values() if job["worker"] == worker_id and job["status"] == "running")
+            free = worker["capacity"] - running
+            if slots is not None:
+                free = min(free, int(slots))
+            pending = [job for job in self.jobs.values() if job["status"] == "pending"]
+            total_capacity = sum(w["capacity"] for w in self.workers.values())
+            share = math.ceil(len(pending) * worker["capacity"] / total_capacity) if pending else 0
+            granted = pending[:max(0, min(free, share))]
+            for job in granted:
+                job["status"] = "running"
+                job["worker"] = worker_id
+                job["attempts"] += 1
+            leased = [{k: job[k] for k in ("id", "outputs", "options", "stages")} for job in granted]
+            for job in leased:
+                job["input_name"] = os.path.basename(self.jobs[job["id"]]["input"])
+        for job in granted:
+            self.emit(("out", f"Job {job['id']} ({os.path.basename(job['input'])}) -> {worker['name']}"
+                              f" (attempt {job['attempts']})\n"))
+        return leased
+
+    def owned_job(self, worker_id, job_id):
+        """The job if it is currently leased to this worker, else None (e.g. requeued after loss)."""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job and job["worker"] == worker_id and job["status"] == "running":
+                return job
+            return None
+
+    def relay(self, job, events):
+        name = self.workers.get(job["worker"], {}).get("name", "?")
+        for tag, msg in events:
+            if tag == "job_status":
+                _job_id, _input, stage, status = msg
+                self.emit(("job_status", (job["id"], job["input"], stage, status)))
+            elif tag == "job_metrics":
+                self.emit(("job_metrics", (job["id"], msg[1])))
+            elif tag in ("out", "err"):
+                self.emit((tag, f"[{name}] {msg}"))
+
+    def store_result(self, job, name, data):
+        name = os.path.basename(name)
+        if name not in job["outputs"] and not name.endswith('.bin'):
+            raise ValueError(f"Unexpected output {name}")
+        os.makedirs(self.out_dir, exist_ok=True)
+        path = os.path.join(self.out_dir, name)
+        tmp = path + ".tmp"
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def complete(self, job, ok, error=None):
+        with self._lock:
+            job["status"] = "done" if ok else "failed"
+            job["error"] = error
+        self._report(job)
+        self._check_finished()
+
+    def _report(self, job):
+        ok = job["status"] == "done"
+        self.emit(("job_done", (job["id"], ok)))
+        self.emit(("out" if ok else "err",
+                   f"Job {job['id']} ({os.path.basename(job['input'])}) {job['status']}"
+                   f"{': ' + job['error'] if job['error'] else ''}\n"))
+
+    def _check_finished(self):
+        with self._lock:
+            finished = all(j["status"] in ("done", "failed") for j in self.jobs.values())
+        if finished and not self._done.is_set():
+            self.emit(("batch_done", self.summary()))
+            self._done.set()
+
+    def _reap_workers(self):
+        while True:
+            time.sleep(HEARTBEAT_INTERVAL)
+            now = time.time()
+            failed = []
+            with self._lock:
+                lost = [wid for wid, w in self.workers.items() if now - w["last_seen"] > WORKER_TIMEOUT]
+                for wid in lost:
+                    worker = self.workers.pop(wid)
+                    self.emit(("err", f"Worker {worker['name']} ({wid}) lost\n"))
+                    for job in self.jobs.values():
+                        if job["worker"] == wid and job["status"] == "running":
+                            job["worker"] = None
+                            if job["attempts"] >= MAX_ATTEMPTS:
+                                job["status"] = "failed"
+                                job["error"] = f"worker lost {MAX_ATTEMPTS} times"
+                                failed.append(job)
+                            else:
+                                job["status"] = "pending"
+                                self.emit(("out", f"Job {job['id']} requeued\n"))
+            for job in failed:
+                self._report(job)
+            if failed:
+                self._check_finished()
+
+
+class FarmRequestHandler(BaseHTTPRequestHandler):
+    """HTTP routes of the coordinator; `farm` is set to the Coordinator by a subclass."""
+
+    farm = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, code, payload=None):
+        body = json.dumps(payload if payload is not None else {}).encode('utf-8')
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _body(self):
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def _worker(self):
+        """Authenticated-by-id worker of this request, or None after replying 410 (re-register)."""
+        worker_id = self.headers.get("X-Worker-Id", "")
+        if not self.farm.touch(worker_id):
+            self._reply(410, {"error": "unknown worker"})
+            return None
+        return worker_id
+
+    def _job(self, worker_id, job_id):
+        job = self.farm.owned_job(worker_id, int(job_id))
+        if job is None:
+            self._reply(409, {"error": "job not leased to this worker"})
+        return job
+
+    def do_GET(self):
+        parts = self.path.strip('/').split('/')
+        if parts == ["status"]:
+            self._reply(200, self.farm.summary())
+        elif len(parts) == 3 and parts[0] == "jobs" and parts[2] == "input":
+            worker_id = self._worker()
+            job = worker_id and self._job(worker_id, parts[1])
+            if not job:
+                return
+            with open(job["input"], 'rb') as f:
+                data = f.read()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        else:
+            self._reply(404, {"error": "not found"})
+
+    def do_POST(self):
+        parts = self.path.strip('/').split('/')
+        try:
+            payload = json.loads(self._body() or b'{}')
+        except ValueError:
+            self._reply(400, {"error": "invalid JSON"})
+            return
+        if parts == ["register"]:
+            self._reply(200, {"worker_id": self.farm.register(payload.get("name", "worker"), payload.get("capacity", 1))})
+            return
+        worker_id = self._worker()
+        if worker_id is None:
+            return
+        if parts == ["heartbeat"]:
+            self._reply(200)
+        elif parts == ["lease"]:
+            self._reply(200, {"jobs": self.farm.lease(worker_id, payload.get("slots"))})
+        elif len(parts) == 3 and parts[0] == "jobs" and parts[2] in ("events", "complete"):
+            job = self._job(worker_id, parts[1])
+            if not job:
+                return
+            if parts[2] == "events":
+                self.farm.relay(job, payload.get("events", []))
+            else:
+                self.farm.complete(job, bool(payload.get("ok")), payload.get("error"))
+            self._reply(200)
+        else:
+            self._reply(404, {"error": "not found"})
+
+    def do_PUT(self):
+        parts = self.path.strip('/').split('/')
+        worker_id = self._worker()
+        if worker_id is None:
+            return
+        if len(parts) == 4 and parts[0] == "jobs" and parts[2] == "results":
+            job = self._job(worker_id, parts[1])
+            if not job:
+                return
+            try:
+                self.farm.store_result(job, urllib.request.url2pathname(parts[3]), self._body())
+            except (ValueError, OSError) as e:
+                self._reply(400, {"error": str(e)})
+                return
+            self._reply(200)
+        else:
+            self._reply(404, {"error": "not found"})
+
+
+class WorkerLost(Exception):
+    """The coordinator no longer knows this worker (HTTP 410)."""
+
+
+class FarmWorker:
+    """Pulls jobs from a coordinator and runs up to `capacity` of them at once."""
+
+    def __init__(self, url, mayo, blender, capacity=1, workdir=None, name=None, emit=None):
+        self.url = url.rstrip('/')
+        self.mayo = mayo
+        self.blender = blender
+        self.capacity = max(1, capacity)
+        self.workdir = workdir or tempfile.mkdtemp(prefix="mayo_farm_")
+        self.name = name or f"{os.uname().nodename if hasattr(os, 'uname') else 'worker'}:{os.getpid()}"
+        self.emit = emit or (lambda event: None)
+        self.worker_id = None
+        self.active = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def _request(self, method, path, payload=None, data=None):
+        if payload is not None:
+            data = json.dumps(payload).encode('utf-8')
+        req = urllib.request.Request(self.url + path, data=data, method=method)
+        if self.worker_id:
+            req.add_header("X-Worker-Id", self.worker_id)
+        try:
+            with urllib.request.urlopen(req, timeout=60) as resp:
+                body = resp.read()
+        except urllib.error.HTTPError as e:
+            if e.code == 410:
+                raise WorkerLost() from e
+            raise
+        if resp.headers.get("Content-Type") == "application/json":
+            return json.loads(body or b'{}')
+        return body
+
+    def register(self):
+        self.worker_id = None
+        reply = self._request("POST", "/register", {"name": self.name, "capacity": self.capacity})
+        self.worker_id = reply["worker_id"]
+        self.emit(("out", f"Registered as {self.worker_id} with {self.url}\n"))
+
+    def stop(self):
+        self._stop.set()
+
+    def run(self):
+        """
+        Register, then lease and run jobs until stopped. Returns False if the
+        coordinator cannot be reached for the initial registration.
+        """
+        try:
+            self.register()
+        except (urllib.error.URLError, OSError, ValueError) as e:
+            self.emit(("err", f"ERROR: Cannot register with coordinator {self.url}: {e}\n"))
+            return False
+        heartbeat = threading.Thread(target=self._heartbeat)
+        heartbeat.daemon = True
+        heartbeat.start()
+        while not self._stop.is_set():
+            try:
+                if self.worker_id is None:
+                    self.register()
+                free = self.capacity - len(self.active)
+                if free > 0:
+                    for job in self._request("POST", "/lease", {"slots": free})["jobs"]:
+                        t = threading.Thread(target=self.run_job, args=(job,))
+                        t.daemon = True
+                        with self._lock:
+                            self.active[job["id"]] = t
+                        t.start()
+            except WorkerLost:
+                # Reaped while unreachable; running jobs were requeued elsewhere
+                self.worker_id = None
+                continue
+            except (urllib.error.URLError, OSError) as e:
+                # Also covers a failed re-registration, which is retried on the next poll
+                self.emit(("err", f"Coordinator unreachable: {e}\n"))
+            self._stop.wait(POLL_INTERVAL)
+        return True
+
+    def _heartbeat(self):
+        while not self._stop.wait(HEARTBEAT_INTERVAL):
+            try:
+                self._request("POST", "/heartbeat", {})
+            except WorkerLost:
+                pass  # the lease loop re-registers
+            except (urllib.error.URLError, OSError):
+                pass
+
+    def run_job(self, job):
+        """Download, convert/simplify and upload one job, streaming its events."""
+        job_dir = os.path.join(self.workdir, f"job{job['id']}_{os.getpid()}")
+        os.makedirs(job_dir, exist_ok=True)
+        events = []
+        events_lock = threading.Lock()
+        finished = threading.Event()
+
+        def emit(event):
+            with events_lock:
+                events.append(event)
+
+        def flush():
+            with events_lock:
+                batch = events[:]
+                del events[:]
+            if batch:
+                self._request("POST", f"/jobs/{job['id']}/events", {"events": batch})
+
+        def flusher():
+            while not finished.wait(EVENT_FLUSH_INTERVAL):
+                try:
+                    flush()
+                except Exception:
+                    pass
+
+        t = threading.Thread(target=flusher)
+        t.daemon = True
+        t.start()
+        ok, error = False, None
+        try:
+            input_path = os.path.join(job_dir, os.path.basename(job["input_name"]))
+            with open(input_path, 'wb') as f:
+                f.write(self._request("GET", f"/jobs/{job['id']}/input"))
+            outputs = [os.path.join(job_dir, name) for name in job["outputs"]]
+            ok, error = self._run_stages(job, input_path, outputs, emit)
+            finished.set()
+            flush()
+            if ok:
+                for path in self._result_files(outputs):
+                    with open(path, 'rb') as f:
+                        self._request("PUT", f"/jobs/{job['id']}/results/{urllib.request.pathname2url(os.path.basename(path))}",
+                                      data=f.read())
+            self._request("POST", f"/jobs/{job['id']}/complete", {"ok": ok, "error": error})
+        except (WorkerLost, urllib.error.HTTPError):
+            # The job was taken away from us (worker reaped or job requeued)
+            pass
+        except Exception as e:
+            try:
+                self._request("POST", f"/jobs/{job['id']}/complete", {"ok": False, "error": str(e)})
+            except Exception:
+                pass
+        finally:
+            finished.set()
+            with self._lock:
+                self.active.pop(job["id"], None)
+            shutil.rmtree(job_dir, ignore_errors=True)
+
+    def _run_stages(self, job, input_path, outputs, emit):
+        options = job["options"]
+        if "convert" in job["stages"]:
+            ok = self._convert(job, input_path, outputs, emit)
+            if not ok:
+                return False, "convert failed"
+        else:
+            # Simplify-only job: the downloaded GLB is the model to simplify
+            shutil.copyfile(input_path, outputs[0])
+
+        if "simplify" in job["stages"]:
+            emit(("job_status", (job["id"], job["input_name"], "simplify", "running")))
+            ok = all([pipeline.run_simplify(self.blender, o, options, emit)
+                      for o in outputs if pipeline.needs_simplification(o) and os.path.exists(o)])
+            emit(("job_status", (job["id"], job["input_name"], "simplify", "done" if ok else "failed")))
+            if not ok:
+                return False, "simplify failed"
+        return True, None
+
+    def _convert(self, job, input_path, outputs, emit):
+        started = time.time()
+        emit(("job_status", (job["id"], job["input_name"], "convert", "running")))
+        settings = pipeline.mesh_settings_file(input_path, job["options"], emit)
+        cmd = pipeline.build_convert_command(self.mayo, input_path, [pipeline.partial_path(o) for o in outputs], settings)
+        emit(("out", f"> Running: {' '.join(cmd)}\n"))
+        try:
+            rc = pipeline.run_process(cmd, emit)
+        finally:
+            if settings:
+                os.remove(settings)
+        pipeline.finalize_outputs(outputs, rc == 0)
+        if rc != 0 or pipeline.output_status(outputs[0], started) != "ok":
+            emit(("job_status", (job["id"], job["input_name"], "convert", "failed")))
+            return False
+        emit(("job_status", (job["id"], job["input_name"], "convert", "done")))
+        return True
+
+    @staticmethod
+    def _result_files(outputs):
+        """Outputs plus the .bin sidecars of .gltf outputs."""
+        files = [o for o in outputs if os.path.exists(o)]
+        for out in outputs:
+            if out.lower().endswith('.gltf') and os.path.exists(out):
+                files += [os.path.join(os.path.dirname(out), uri) for uri in _gltf_buffer_uris(out)]
+        return files
+
+
+def _gltf_buffer_uris(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        gltf = json.load(f)
+    uris = [b.get("uri") for b in gltf.get("buffers", [])]
+    return [u for u in uris if u and not u.startswith("data:") and os.path.exists(os.path.join(os.path.dirname(path), u))]
+
+
+def main():
+    """Main entry point for the script."""
+    args = sys.argv[1:]
+    if not args or args[0] not in ("coordinator", "worker"):
+        print(__doc__.strip().split("\n\n")[-1])
+        return False
+    mode = args.pop(0)
+    opts = {"--port": str(DEFAULT_PORT), "--out": "", "--ratio": "0.7", "--quality": "", "--budget": "0", "--mayo": "mayo-conv",
+            "--blender": "blender", "--capacity": "1", "--workdir": ""}
+    flags = set()
+    positional = []
+    i = 0
+    while i < len(args):
+        if args[i] in opts and i + 1 < len(args):
+            opts[args[i]] = args[i + 1]
+            i += 1
+        elif args[i] == "--simplify":
+            flags.add(args[i])
+        else:
+            positional.append(args[i])
+        i += 1
+
+    def emit(event):
+        tag, msg = event
+        if tag in ("out", "err"):
+            sys.stdout.write(msg)
+            sys.stdout.flush()
+
+    if mode == "worker":
+        if not positional:
+            print("ERROR: Coordinator URL missing")
+            return False
+        try:
+            capacity = int(opts["--capacity"])
+        except ValueError:
+            print(f"ERROR: Invalid capacity: {opts['--capacity']}")
+            return False
+        worker = FarmWorker(positional[0], opts["--mayo"], opts["--blender"], capacity,
+                            workdir=opts["--workdir"] or None, emit=emit)
+        try:
+            return worker.run()
+        except KeyboardInterrupt:
+            worker.stop()
+        return True
+
+    if not positional or not opts["--out"]:
+        print("ERROR: Usage: python farm.py coordinator <input.step> [...] --out DIR [--port N]")
+        return False
+    numbers = {}
+    for flag, cast, label in (("--ratio", float, "ratio"), ("--budget", int, "triangle budget"), ("--port", int, "port")):
+        try:
+            numbers[flag] = cast(opts[flag])
+        except ValueError:
+            print(f"ERROR: Invalid {label}: {opts[flag]}")
+            return False
+    coordinator = Coordinator(opts["--out"], emit)
+    options = {"simplify": "--simplify" in flags, "ratio": numbers["--ratio"],
+               "mesh_quality": opts["--quality"], "triangle_budget": numbers["--budget"]}
+    for inp in positional:
+        base = os.path.splitext(os.path.basename(inp))[0]
+        # Simplify-only jobs get a distinct name so results never overwrite their input
+        coordinator.submit(inp, [base + ("_simplified.glb" if inp.lower().endswith('.glb') else ".glb")], options)
+    host, port = coordinator.serve(port=numbers["--port"])
+    print(f"Coordinator listening on port {port} with {len(positional)} job(s)")
+    try:
+        coordinator.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        coordinator.shutdown()
+    summary = coordinator.summary()
+    print(f"{summary['done']} done, {summary['failed']} failed")
+    return summary["failed"] == 0 and summary["done"] == len(positional)
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
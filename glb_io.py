@@ -0,0 +1,335 @@
+"""
+Minimal glTF 2.0 / GLB reader and writer used by the in-process tools
+(thumbnails, optimisation).
+Only needs NumPy; Blender and a GPU are not required.
+"""
+
+import base64
+import json
+import os
+import struct
+
+import numpy as np
+
+
+GLB_MAGIC = 0x46546C67  # b'glTF'
+CHUNK_JSON = 0x4E4F534A
+CHUNK_BIN = 0x004E4942
+
+COMPONENT_DTYPES = {
+    5120: np.int8,
+    5121: np.uint8,
+    5122: np.int16,
+    5123: np.uint16,
+    5125: np.uint32,
+    5126: np.float32,
+}
+
+TYPE_SIZES = {
+    "SCALAR": 1,
+    "VEC2": 2,
+    "VEC3": 3,
+    "VEC4": 4,
+    "MAT2": 4,
+    "MAT3": 9,
+    "MAT4": 16,
+}
+
+MODE_TRIANGLES = 4
+DEFAULT_COLOR = (0.8, 0.8, 0.8)
+
+
+def load_gltf(path):
+    """Load a .glb or .gltf file and return (gltf_json, buffers)."""
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    if len(data) >= 12 and struct.unpack_from('<I', data, 0)[0] == GLB_MAGIC:
+        gltf, bin_chunk = _parse_glb(data)
+    else:
+        gltf = json.loads(data.decode('utf-8'))
+        bin_chunk = None
+
+    base_dir = os.path.dirname(os.path.abspath(path))
+    buffers = []
+    for i, buf in enumerate(gltf.get("buffers", [])):
+        uri = buf.get("uri")
+        if uri is None:
+            if i != 0 or bin_chunk is None:
+                raise ValueError(f"Buffer {i} has no uri and no GLB binary chunk")
+            buffers.append(bin_chunk)
+        elif uri.startswith("data:"):
+            buffers.append(base64.b64decode(uri.split(",", 1)[1]))
+        else:
+            with open(os.path.join(base_dir, uri), 'rb') as f:
+                buffers.append(f.read())
+    return gltf, buffers
+
+
+def _parse_glb(data):
+    """Split a GLB container into its JSON and BIN chunks."""
+    _magic, version, length = struct.unpack_from('<III', data, 0)
+    if version != 2:
+        raise ValueError(f"Unsupported GLB version: {version}")
+
+    gltf = None
+    bin_chunk = None
+    offset = 12
+    while offset + 8 <= min(length, len(data)):
+        chunk_len, chunk_type = struct.unpack_from('<II', data, offset)
+        chunk = data[offset + 8:offset + 8 + chunk_len]
+        if chunk_type == CHUNK_JSON:
+            gltf = json.loads(chunk.decode('utf-8'))
+        elif chunk_type == CHUNK_BIN and bin_chunk is None:
+            bin_chunk = bytes(chunk)
+        offset += 8 + chunk_len
+
+    if gltf is None:
+        raise ValueError("GLB file has no JSON chunk")
+    return gltf, bin_chunk
+
+
+def read_accessor(gltf, buffers, index):
+    """Decode an accessor into a (count, components) NumPy array."""
+    acc = gltf["accessors"][index]
+    dtype = np.dtype(COMPONENT_DTYPES[acc["componentType"]]).newbyteorder('<')
+    ncomp = TYPE_SIZES[acc["type"]]
+    count = acc["count"]
+
+    if "bufferView" not in acc:
+        # Accessors without a buffer view are all zeros (sparse data is not supported)
+        return np.zeros((count, ncomp), dtype=dtype)
+
+    view = gltf["bufferViews"][acc["bufferView"]]
+    data = buffers[view["buffer"]]
+    offset = view.get("byteOffset", 0) + acc.get("byteOffset", 0)
+    packed = dtype.itemsize * ncomp
+    stride = view.get("byteStride") or packed
+
+    if stride == packed:
+        arr = np.frombuffer(data, dtype=dtype, count=count * ncomp, offset=offset)
+        return arr.reshape(count, ncomp)
+    return np.ndarray((count, ncomp), dtype=dtype, buffer=data, offset=offset,
+                      strides=(stride, dtype.itemsize)).copy()
+
+
+def node_local_matrix(node):
+    """Return the 4x4 local transform of a node (matrix or TRS)."""
+    if "matrix" in node:
+        return np.array(node["matrix"], dtype=np.float64).reshape(4, 4).T
+
+    t = node.get("translation", [0.0, 0.0, 0.0])
+    x, y, z, w = node.get("rotation", [0.0, 0.0, 0.0, 1.0])
+    s = node.get("scale", [1.0, 1.0, 1.0])
+
+    rot = np.array([
+        [1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)],
+        [2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)],
+        [2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)],
+    ], dtype=np.float64)
+
+    m = np.eye(4)
+    m[:3, :3] = rot * np.asarray(s, dtype=np.float64)
+    m[:3, 3] = t
+    return m
+
+
+def iter_mesh_instances(gltf):
+    """Yield (node_index, mesh_index, world_matrix) for every mesh node in the default scene."""
+    nodes = gltf.get("nodes", [])
+    scenes = gltf.get("scenes")
+    if scenes:
+        roots = scenes[gltf.get("scene", 0)].get("nodes", [])
+    else:
+        children = {c for n in nodes for c in n.get("children", [])}
+        roots = [i for i in range(len(nodes)) if i not in children]
+
+    stack = [(i, np.eye(4)) for i in reversed(roots)]
+    while stack:
+        idx, parent = stack.pop()
+        node = nodes[idx]
+        world = parent @ node_local_matrix(node)
+        if "mesh" in node:
+            yield idx, node["mesh"], world
+        for child in reversed(node.get("children", [])):
+            stack.append((child, world))
+
+
+def material_color(gltf, material_index):
+    """Return the RGB base colour of a material, or a neutral grey."""
+    if material_index is None:
+        return DEFAULT_COLOR
+    try:
+        mat = gltf["materials"][material_index]
+    except (KeyError, IndexError):
+        return DEFAULT_COLOR
+    factor = mat.get("pbrMetallicRoughness", {}).get("baseColorFactor", [1.0, 1.0, 1.0, 1.0])
+    return tuple(factor[:3])
+
+
+def primitive_triangles(gltf, buffers, prim):
+    """Return (positions, triangles) for a triangle primitive, or None if it cannot be read."""
+    if prim.get("mode", MODE_TRIANGLES) != MODE_TRIANGLES:
+        return None
+    pos_index = prim.get("attributes", {}).get("POSITION")
+    if pos_index is None or "bufferView" not in gltf["accessors"][pos_index]:
+        # Compressed (e.g. Draco) or empty primitive
+        return None
+
+    positions = read_accessor(gltf, buffers, pos_index).astype(np.float64)
+    if "indices" in prim:
+        indices = read_accessor(gltf, buffers, prim["indices"]).reshape(-1).astype(np.int64)
+    else:
+        indices = np.arange(len(positions), dtype=np.int64)
+    indices = indices[:len(indices) - len(indices) % 3]
+    return positions, indices.reshape(-1, 3)
+
+
+def load_scene(path):
+    """
+    Flatten a glTF scene into world-space triangles.
+
+    Returns a dict with 'positions' (N, 3), 'triangles' (M, 3) and per-triangle
+    'colors' (M, 3) taken from the material base colour.
+    """
+    gltf, buffers = load_gltf(path)
+    meshes = gltf.get("meshes", [])
+
+    all_pos = []
+    all_tris = []
+    all_colors = []
+    base = 0
+    for _node, mesh_index, world in iter_mesh_instances(gltf):
+        for prim in meshes[mesh_index].get("primitives", []):
+            result = primitive_triangles(gltf, buffers, prim)
+            if result is None:
+                continue
+            positions, tris = result
+            if len(tris) == 0:
+                continue
+            world_pos = positions @ world[:3, :3].T + world[:3, 3]
+            all_pos.append(world_pos)
+            all_tris.append(tris + base)
+            color = material_color(gltf, prim.get("material"))
+            all_colors.append(np.tile(np.asarray(color, dtype=np.float64), (len(tris), 1)))
+            base += len(positions)
+
+    if not all_pos:
+        return {
+            "positions": np.zeros((0, 3)),
+            "triangles": np.zeros((0, 3), dtype=np.int64),
+            "colors": np.zeros((0, 3)),
+        }
+    return {
+        "positions": np.concatenate(all_pos),
+        "triangles": np.concatenate(all_tris),
+        "colors": np.concatenate(all_colors),
+    }
+
+
+def save_glb(path, gltf, bin_data):
+    """Write a glTF JSON document and a single binary buffer as a GLB file."""
+    gltf = dict(gltf)
+    if bin_data:
+        gltf["buffers"] = [{"byteLength": len(bin_data)}]
+    else:
+        gltf.pop("buffers", None)
+    json_data = json.dumps(gltf, separators=(',', ':')).encode('utf-8')
+    json_data += b' ' * (-len(json_data) % 4)
+    bin_data = bytes(bin_data) + b'\0' * (-len(bin_data) % 4)
+
+    length = 12 + 8 + len(json_data) + (8 + len(bin_data) if bin_data else 0)
+    # Write to a temporary file and rename so an interrupted write never leaves a truncated GLB
+    tmp = path + ".tmp"
+    with open(tmp, 'wb') as f:
+        f.write(struct.pack('<III', GLB_MAGIC, 2, length))
+        f.write(struct.pack('<II', len(json_data), CHUNK_JSON))
+        f.write(json_data)
+        if bin_data:
+            f.write(struct.pack('<II', len(bin_data), CHUNK_BIN))
+            f.write(bin_data)
+    os.replace(tmp, path)
+
+
+def _component_type(dtype):
+    for ctype, dt in COMPONENT_DTYPES.items():
+        if np.dtype(dt) == np.dtype(dtype).newbyteorder('='):
+            return ctype
+    raise ValueError(f"Unsupported accessor dtype: {dtype}")
+
+
+def repack(gltf, buffers, overrides=None):
+    """
+    Rebuild all binary data into one tightly packed buffer.
+
+    Every accessor gets its own buffer view; `overrides` maps accessor
+    indices to replacement arrays (count, components). Image buffer views are
+    copied. Buffer views no longer referenced are dropped. Sparse accessors
+    and compressed-mesh extensions are not supported.
+    Returns (gltf, bin_data) with a new JSON document.
+    """
+    overrides = overrides or {}
+    gltf = json.loads(json.dumps(gltf))
+    out = bytearray()
+    views = []
+
+    def add_view(data, target=None, stride=None):
+        out.extend(b'\0' * (-len(out) % 4))
+        view = {"buffer": 0, "byteOffset": len(out), "byteLength": len(data)}
+        if target:
+            view["target"] = target
+        if stride:
+            view["byteStride"] = stride
+        out.extend(data)
+        views.append(view)
+        return len(views) - 1
+
+    targets = {}
+    for mesh in gltf.get("meshes", []):
+        for prim in mesh.get("primitives", []):
+            for acc_index in prim.get("attributes", {}).values():
+                targets[acc_index] = 34962  # ARRAY_BUFFER
+            if "indices" in prim:
+                targets[prim["indices"]] = 34963  # ELEMENT_ARRAY_BUFFER
+
+    for i, acc in enumerate(gltf.get("accessors", [])):
+        if "sparse" in acc:
+            raise ValueError("Sparse accessors are not supported")
+        if i in overrides:
+            data = np.ascontiguousarray(overrides[i])
+            if data.ndim == 1:
+                data = data.reshape(-1, 1)
+            acc["componentType"] = _component_type(data.dtype)
+            acc["count"] = len(data)
+            if "min" in acc or "max" in acc:
+                if len(data):
+                    acc["min"] = data.min(axis=0).tolist()
+                    acc["max"] = data.max(axis=0).tolist()
+        elif "bufferView" in acc:
+            data = read_accessor(gltf, buffers, i)
+        else:
+            continue
+        acc.pop("byteOffset", None)
+        data = np.ascontiguousarray(data.astype(data.dtype.newbyteorder('<')))
+        element = data.dtype.itemsize * (data.shape[1] if data.ndim > 1 else 1)
+        if targets.get(i) == 34962 and element % 4:
+            # Vertex attribute elements must start on 4-byte boundaries (e.g. u8/i16 VEC3)
+            stride = element + (-element % 4)
+            padded = np.zeros((len(data), stride), dtype=np.uint8)
+            padded[:, :element] = data.reshape(len(data), -1).view(np.uint8)
+            acc["bufferView"] = add_view(padded.tobytes(), targets.get(i), stride)
+        else:
+            acc["bufferView"] = add_view(data.tobytes(), targets.get(i))
+
+    for image in gltf.get("images", []):
+        if "bufferView" in image:
+            old = gltf["bufferViews"][image["bufferView"]]
+            start = old.get("byteOffset", 0)
+            data = buffers[old["buffer"]][start:start + old["byteLength"]]
+            image["bufferView"] = add_view(data)
+
+    if views:
+        gltf["bufferViews"] = views
+    else:
+        gltf.pop("bufferViews", None)
+    return gltf, bytes(out)
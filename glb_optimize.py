@@ -0,0 +1,649 @@
+"""
+GLB optimisation passes (NumPy; runs standalone or inside Blender's Python).
+Usage: python glb_optimize.py <model.glb|folder> [...] [--tolerance X] [--no-dedupe] [--vcache] [--overdraw]
+Folds flat vertex colours into materials, drops unused vertex attributes,
+merges materials that are equal within a tolerance, joins primitives that
+end up sharing a material and prunes unused materials, textures and accessors.
+Optionally reorders triangles and vertices for the post-transform vertex
+cache (Tipsify), orders triangle clusters to reduce overdraw and narrows
+index buffers to uint16.
+"""
+
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from glb_io import MODE_TRIANGLES, load_gltf, read_accessor, repack, save_glb
+
+
+# Materials whose numeric values all agree within this are merged (about half an 8-bit step)
+DEFAULT_MATERIAL_TOLERANCE = 0.002
+# Post-transform cache size assumed for low-end GPUs (Tipsify k and ACMR simulation)
+VERTEX_CACHE_SIZE = 16
+# Extensions whose data we cannot rewrite safely
+UNSUPPORTED_EXTENSIONS = ("KHR_draco_mesh_compression", "EXT_meshopt_compression")
+
+
+def _texture_infos(obj):
+    """Yield every textureInfo dict (anything under a '*Texture' key with an index)."""
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            if key.endswith("Texture") and isinstance(value, dict) and "index" in value:
+                yield value
+            yield from _texture_infos(value)
+    elif isinstance(obj, list):
+        for value in obj:
+            yield from _texture_infos(value)
+
+
+def _used_texcoords(material):
+    """Return the set of TEXCOORD_n indices a material samples."""
+    used = set()
+    for info in _texture_infos(material or {}):
+        used.add(info.get("texCoord", 0))
+        transform = info.get("extensions", {}).get("KHR_texture_transform", {})
+        if "texCoord" in transform:
+            used.add(transform["texCoord"])
+    return used
+
+
+def _needs_tangents(material):
+    if not material:
+        return False
+    if "KHR_materials_anisotropy" in material.get("extensions", {}):
+        return True
+    return any(key.lower().endswith("normaltexture") for key in _texture_keys(material))
+
+
+def _texture_keys(obj):
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            if key.endswith("Texture") and isinstance(value, dict):
+                yield key
+            yield from _texture_keys(value)
+    elif isinstance(obj, list):
+        for value in obj:
+            yield from _texture_keys(value)
+
+
+def _normalized_values(acc, data):
+    """Convert accessor data to floats, applying glTF normalisation."""
+    values = data.astype(np.float64)
+    if acc.get("normalized"):
+        values /= float(np.iinfo(data.dtype).max)
+    return values
+
+
+def _skinned_meshes(gltf):
+    return {node["mesh"] for node in gltf.get("nodes", []) if "mesh" in node and "skin" in node}
+
+
+def fold_constant_colors(gltf, buffers, tolerance):
+    """
+    Replace a COLOR_0 that is identical on every vertex with a material colour.
+    Returns the number of attributes removed.
+    """
+    materials = gltf.setdefault("materials", [])
+    variants = {}
+    removed = 0
+    for mesh in gltf.get("meshes", []):
+        for prim in mesh.get("primitives", []):
+            attrs = prim.get("attributes", {})
+            if "COLOR_0" not in attrs or prim.get("targets"):
+                continue
+            acc = gltf["accessors"][attrs["COLOR_0"]]
+            values = _normalized_values(acc, read_accessor(gltf, buffers, attrs["COLOR_0"]))
+            if len(values) == 0 or np.ptp(values, axis=0).max() > tolerance:
+                continue
+
+            color = list(values[0]) + [1.0] * (4 - values.shape[1])
+            del attrs["COLOR_0"]
+            removed += 1
+            if all(abs(c - 1.0) <= tolerance for c in color):
+                continue
+
+            # Multiply into a copy of the material; duplicates are merged later
+            key = (prim.get("material"), tuple(round(c / tolerance) for c in color))
+            if key not in variants:
+                base = materials[prim["material"]] if "material" in prim else {}
+                variant = json.loads(json.dumps(base))
+                pbr = variant.setdefault("pbrMetallicRoughness", {})
+                factor = pbr.get("baseColorFactor", [1.0, 1.0, 1.0, 1.0])
+                pbr["baseColorFactor"] = [float(f * c) for f, c in zip(factor, color)]
+                materials.append(variant)
+                variants[key] = len(materials) - 1
+            prim["material"] = variants[key]
+    if not materials:
+        gltf.pop("materials")
+    return removed
+
+
+def drop_unused_attributes(gltf):
+    """
+    Remove vertex attributes nothing reads: UV sets no texture samples,
+    tangents without a normal map, COLOR_1+ and skinning data on unskinned meshes.
+    Returns the number of attributes removed.
+    """
+    materials = gltf.get("materials", [])
+    skinned = _skinned_meshes(gltf)
+    removed = 0
+    for mesh_index, mesh in enumerate(gltf.get("meshes", [])):
+        for prim in mesh.get("primitives", []):
+            if prim.get("targets"):
+                continue
+            material = materials[prim["material"]] if "material" in prim else None
+            texcoords = _used_texcoords(material)
+            attrs = prim.get("attributes", {})
+            # TEXCOORD_n must stay contiguous and materials refer to sets by
+            # number, so only unused sets above the highest used one go
+            present = [int(n.split("_")[1]) for n in attrs if n.startswith("TEXCOORD_")]
+            keep_below = max([n for n in present if n in texcoords], default=-1)
+            for name in list(attrs):
+                if name.startswith("TEXCOORD_"):
+                    drop = int(name.split("_")[1]) > keep_below
+                elif name == "TANGENT":
+                    drop = not _needs_tangents(material)
+                elif name.startswith("COLOR_"):
+                    drop = name != "COLOR_0"
+                elif name.startswith(("JOINTS_", "WEIGHTS_")):
+                    drop = mesh_index not in skinned
+                else:
+                    drop = False
+                if drop:
+                    del attrs[name]
+                    removed += 1
+    return removed
+
+
+def _quantize(value, tolerance):
+    if isinstance(value, dict):
+        return {k: _quantize(v, tolerance) for k, v in value.items() if k != "name"}
+    if isinstance(value, list):
+        return [_quantize(v, tolerance) for v in value]
+    if isinstance(value, float):
+        return round(value / tolerance)
+    return value
+
+
+def dedupe_materials(gltf, tolerance):
+    """Point primitives at one representative per group of equivalent materials. Returns merges done."""
+    materials = gltf.get("materials", [])
+    representative = {}
+    mapping = {}
+    for i, mat in enumerate(materials):
+        key = json.dumps(_quantize(mat, tolerance), sort_keys=True)
+        mapping[i] = representative.setdefault(key, i)
+    for mesh in gltf.get("meshes", []):
+        for prim in mesh.get("primitives", []):
+            if "material" in prim:
+                prim["material"] = mapping[prim["material"]]
+    return len(materials) - len(representative)
+
+
+def merge_primitives(gltf, buffers, overrides):
+    """
+    Join primitives of the same mesh that share material and vertex layout,
+    so each material costs one draw call per mesh. Primitives that share
+    vertex accessors only have their indices joined; groups whose vertex
+    data is used elsewhere are left alone. New accessor data is stored in
+    `overrides`. Returns the number of primitives removed.
+    """
+    accessors = gltf.get("accessors", [])
+
+    def data(index):
+        if index in overrides:
+            return overrides[index]
+        return read_accessor(gltf, buffers, index)
+
+    def layout(prim):
+        attrs = prim.get("attributes", {})
+        return (
+            prim.get("material"),
+            tuple(sorted(
+                (name, accessors[i]["componentType"], accessors[i]["type"], accessors[i].get("normalized", False))
+                for name, i in attrs.items())),
+        )
+
+    # Vertex data referenced outside a group would be copied rather than moved
+    users = {}
+    for mesh in gltf.get("meshes", []):
+        for prim in mesh.get("primitives", []):
+            for index in set(prim.get("attributes", {}).values()):
+                users[index] = users.get(index, 0) + 1
+
+    removed = 0
+    for mesh in gltf.get("meshes", []):
+        prims = mesh.get("primitives", [])
+        groups = {}
+        kept = []
+        for prim in prims:
+            if prim.get("mode", MODE_TRIANGLES) != MODE_TRIANGLES or prim.get("targets") or prim.get("extensions"):
+                kept.append([prim])
+                continue
+            key = layout(prim)
+            if key not in groups:
+                groups[key] = []
+                kept.append(groups[key])
+            groups[key].append(prim)
+
+        new_prims = []
+        for group in kept:
+            # Primitives sharing one set of vertex accessors keep it; only indices are joined
+            vertex_sets = []
+            for prim in group:
+                attrs = tuple(sorted(prim["attributes"].items()))
+                if attrs not in vertex_sets:
+                    vertex_sets.append(attrs)
+            in_group = {}
+            for attrs in vertex_sets:
+                for _name, index in attrs:
+                    in_group[index] = in_group.get(index, 0) + 1
+            group_users = {index: sum(index in prim["attributes"].values() for prim in group) for index in in_group}
+            # Concatenating partly shared or externally used vertex data would duplicate it
+            copies = any(count > 1 or users[index] > group_users[index] for index, count in in_group.items())
+            if len(group) == 1 or (len(vertex_sets) > 1 and copies):
+                new_prims.extend(group)
+                continue
+
+            merged = json.loads(json.dumps(group[0]))
+            bases = {}
+            base = 0
+            for attrs in vertex_sets:
+                bases[attrs] = base
+                base += len(data(dict(attrs)["POSITION"]))
+            indices = []
+            for prim in group:
+                offset = bases[tuple(sorted(prim["attributes"].items()))]
+                if "indices" in prim:
+                    indices.append(data(prim["indices"]).reshape(-1).astype(np.int64) + offset)
+                else:
+                    count = len(data(prim["attributes"]["POSITION"]))
+                    indices.append(np.arange(count, dtype=np.int64) + offset)
+
+            if len(vertex_sets) > 1:
+                for name in merged["attributes"]:
+                    arrays = [data(dict(attrs)[name]) for attrs in vertex_sets]
+                    acc = dict(accessors[group[0]["attributes"][name]])
+                    acc.pop("bufferView", None)
+                    acc.pop("byteOffset", None)
+                    acc["count"] = base
+                    accessors.append(acc)
+                    overrides[len(accessors) - 1] = np.concatenate(arrays)
+                    merged["attributes"][name] = len(accessors) - 1
+
+            index_dtype = np.uint16 if base <= 0xFFFF else np.uint32
+            joined = np.concatenate(indices).astype(index_dtype)
+            accessors.append({"componentType": 0, "count": len(joined), "type": "SCALAR"})
+            overrides[len(accessors) - 1] = joined
+            merged["indices"] = len(accessors) - 1
+            new_prims.append(merged)
+            removed += len(group) - 1
+        mesh["primitives"] = new_prims
+    return removed
+
+
+def simulate_acmr(indices, cache_size=VERTEX_CACHE_SIZE):
+    """Average cache miss ratio (vertex transforms per triangle) for a FIFO cache."""
+    if len(indices) < 3:
+        return 0.0
+    entered = {}
+    misses = 0
+    for v in indices.tolist():
+        # In a FIFO, a vertex stays cached for cache_size further misses
+        t = entered.get(v)
+        if t is None or misses - t >= cache_size:
+            entered[v] = misses
+            misses += 1
+    return misses / (len(indices) // 3)
+
+
+def tipsify(triangles, vertex_count, cache_size=VERTEX_CACHE_SIZE):
+    """
+    Reorder triangles for vertex cache locality (Sander et al. 2007, "Tipsify").
+
+    Returns (order, cluster_starts): the new triangle order and the positions
+    in it where the fan walk restarted, which delimit clusters for overdraw
+    ordering. Adjacency is built with NumPy; the walk itself is sequential.
+    """
+    tris = np.asarray(triangles, dtype=np.int64)
+    flat = tris.reshape(-1)
+    counts = np.bincount(flat, minlength=vertex_count)
+    offsets = np.concatenate([[0], np.cumsum(counts)]).tolist()
+    adjacency = (np.argsort(flat, kind='stable') // 3).tolist()
+
+    tri_list = tris.tolist()
+    live = counts.tolist()
+    cache_time = [-(cache_size + 1)] * vertex_count
+    emitted = [False] * len(tri_list)
+    dead_end = []
+    order = []
+    cluster_starts = [0]
+    timestamp = 0
+    cursor = 0
+    fan = 0 if vertex_count else -1
+    while fan >= 0 and len(order) < len(tri_list):
+        candidates = []
+        for t in adjacency[offsets[fan]:offsets[fan + 1]]:
+            if emitted[t]:
+                continue
+            emitted[t] = True
+            order.append(t)
+            for v in tri_list[t]:
+                dead_end.append(v)
+                candidates.append(v)
+                live[v] -= 1
+                if timestamp - cache_time[v] > cache_size:
+                    cache_time[v] = timestamp
+                    timestamp += 1
+
+        # Prefer a candidate that will still be in cache after its fan is emitted
+        fan = -1
+        best = -1
+        for v in candidates:
+            if live[v] > 0:
+                priority = 0
+                if timestamp - cache_time[v] + 2 * live[v] <= cache_size:
+                    priority = timestamp - cache_time[v]
+                if priority > best:
+                    best = priority
+                    fan = v
+        if fan >= 0:
+            continue
+
+        # Dead end: backtrack through recently touched vertices, then scan forward
+        while dead_end:
+            v = dead_end.pop()
+            if live[v] > 0:
+                fan = v
+                break
+        else:
+            while cursor < vertex_count and live[cursor] == 0:
+                cursor += 1
+            fan = cursor if cursor < vertex_count else -1
+        if fan >= 0 and len(order) > cluster_starts[-1]:
+            cluster_starts.append(len(order))
+
+    if len(order) < len(tri_list):
+        # Triangles with out-of-range or degenerate references keep their place at the end
+        order.extend(t for t in range(len(tri_list)) if not emitted[t])
+    return np.asarray(order, dtype=np.int64), cluster_starts
+
+
+def overdraw_order(positions, triangles, order, cluster_starts):
+    """
+    Sort Tipsify clusters so outward-facing ones are drawn first
+    (Sander et al.: dot(cluster centroid - mesh centroid, cluster normal), descending).
+    """
+    if len(cluster_starts) < 2:
+        return order
+    tris = triangles[order]
+    a = positions[tris[:, 0]]
+    b = positions[tris[:, 1]]
+    c = positions[tris[:, 2]]
+    normals = np.cross(b - a, c - a)  # length is twice the area
+    centroids = (a + b + c) / 3.0
+    area = np.linalg.norm(normals, axis=1)
+
+    starts = np.asarray(cluster_starts)
+    cluster_normal = np.add.reduceat(normals, starts)
+    cluster_area = np.add.reduceat(area, starts)
+    cluster_centroid = np.add.reduceat(centroids * area[:, None], starts) / np.maximum(cluster_area, 1e-30)[:, None]
+    mesh_centroid = (centroids * area[:, None]).sum(axis=0) / max(area.sum(), 1e-30)
+    score = np.einsum('ij,ij->i', cluster_centroid - mesh_centroid, cluster_normal)
+
+    ends = np.append(starts[1:], len(order))
+    ranked = np.argsort(-score, kind='stable')
+    return np.concatenate([order[starts[k]:ends[k]] for k in ranked])
+
+
+def optimize_vertex_cache(gltf, buffers, overrides, overdraw=False):
+    """
+    Reorder triangles (Tipsify, optionally overdraw-sorted) and vertices
+    (first-use order) of every indexed triangle primitive, and narrow index
+    buffers to uint16 where they fit. Returns (acmr_before, acmr_after),
+    averaged over all triangles.
+    """
+    accessors = gltf.get("accessors", [])
+
+    def data(index):
+        if index in overrides:
+            return overrides[index]
+        return read_accessor(gltf, buffers, index)
+
+    # Vertex data shared between primitives cannot be reordered per primitive
+    users = {}
+    for mesh in gltf.get("meshes", []):
+        for prim in mesh.get("primitives", []):
+            for index in prim.get("attributes", {}).values():
+                users[index] = users.get(index, 0) + 1
+
+    misses_before = 0.0
+    misses_after = 0.0
+    total = 0
+    for mesh in gltf.get("meshes", []):
+        for prim in mesh.get("primitives", []):
+            if (prim.get("mode", MODE_TRIANGLES) != MODE_TRIANGLES or "indices" not in prim
+                    or prim.get("extensions") or "POSITION" not in prim.get("attributes", {})):
+                continue
+            attrs = prim["attributes"]
+            # Merged accessors only hold their data in `overrides`, so count from the data
+            vertex_count = len(data(attrs["POSITION"]))
+            indices = data(prim["indices"]).reshape(-1).astype(np.int64)
+            indices = indices[:len(indices) - len(indices) % 3]
+            if len(indices) == 0 or indices.max() >= vertex_count:
+                continue
+            tris = indices.reshape(-1, 3)
+            total += len(tris)
+            misses_before += simulate_acmr(indices) * len(tris)
+
+            order, cluster_starts = tipsify(tris, vertex_count)
+            if overdraw:
+                positions = data(attrs["POSITION"]).astype(np.float64)
+                order = overdraw_order(positions, tris, order, cluster_starts)
+            indices = tris[order].reshape(-1)
+
+            if not prim.get("targets") and all(users[i] == 1 for i in attrs.values()):
+                # Renumber vertices in first-use order; unreferenced vertices are dropped
+                _, first = np.unique(indices, return_index=True)
+                used = indices[np.sort(first)]
+                remap = np.empty(vertex_count, dtype=np.int64)
+                remap[used] = np.arange(len(used))
+                indices = remap[indices]
+                for name, index in attrs.items():
+                    overrides[index] = data(index)[used]
+
+            misses_after += simulate_acmr(indices) * len(tris)
+            # 0xFFFF is the primitive restart value and may not be used as an index
+            index_dtype = np.uint16 if indices.max() < 0xFFFF else np.uint32
+            overrides[prim["indices"]] = indices.astype(index_dtype)
+
+    if not total:
+        return None, None
+    return misses_before / total, misses_after / total
+
+
+def _compact(gltf, key, used):
+    """Keep only the used entries of a top-level array; return old->new index mapping."""
+    mapping = {}
+    kept = []
+    for i, item in enumerate(gltf.get(key, [])):
+        if i in used:
+            mapping[i] = len(kept)
+            kept.append(item)
+    if kept:
+        gltf[key] = kept
+    else:
+        gltf.pop(key, None)
+    return mapping
+
+
+def prune_unused(gltf, overrides):
+    """
+    Drop unreferenced materials, textures, images, samplers and accessors,
+    remapping every reference (and the keys of `overrides`) to the new indices.
+    """
+    meshes = gltf.get("meshes", [])
+    prims = [prim for mesh in meshes for prim in mesh.get("primitives", [])]
+
+    used = {prim["material"] for prim in prims if "material" in prim}
+    mat_map = _compact(gltf, "materials", used)
+    for prim in prims:
+        if "material" in prim:
+            prim["material"] = mat_map[prim["material"]]
+
+    infos = list(_texture_infos(gltf.get("materials", [])))
+    tex_map = _compact(gltf, "textures", {info["index"] for info in infos})
+    for info in infos:
+        info["index"] = tex_map[info["index"]]
+
+    textures = gltf.get("textures", [])
+    sources = [tex for tex in textures if "source" in tex]
+    sources += [ext for tex in textures for ext in tex.get("extensions", {}).values()
+                if isinstance(ext, dict) and "source" in ext]
+    img_map = _compact(gltf, "images", {s["source"] for s in sources})
+    for s in sources:
+        s["source"] = img_map[s["source"]]
+    smp_map = _compact(gltf, "samplers", {tex["sampler"] for tex in textures if "sampler" in tex})
+    for tex in textures:
+        if "sampler" in tex:
+            tex["sampler"] = smp_map[tex["sampler"]]
+
+    refs = []  # (container, key) pairs that hold accessor indices
+    for prim in prims:
+        attrs = prim.get("attributes", {})
+        refs.extend((attrs, name) for name in attrs)
+        if "indices" in prim:
+            refs.append((prim, "indices"))
+        for target in prim.get("targets", []):
+            refs.extend((target, name) for name in target)
+    for skin in gltf.get("skins", []):
+        if "inverseBindMatrices" in skin:
+            refs.append((skin, "inverseBindMatrices"))
+    for anim in gltf.get("animations", []):
+        for sampler in anim.get("samplers", []):
+            refs.extend([(sampler, "input"), (sampler, "output")])
+
+    acc_map = _compact(gltf, "accessors", {c[k] for c, k in refs})
+    for container, key in refs:
+        container[key] = acc_map[container[key]]
+    remapped = {acc_map[i]: arr for i, arr in overrides.items() if i in acc_map}
+    overrides.clear()
+    overrides.update(remapped)
+
+
+def optimize_glb(path, out_path=None, tolerance=DEFAULT_MATERIAL_TOLERANCE, dedupe=True,
+                 vertex_cache=False, overdraw=False):
+    """
+    Run the selected passes on a GLB file and write the result (in place by default).
+    Overdraw ordering runs as part of the vertex cache pass, so either flag enables it.
+    Returns a stats dict for reporting.
+    """
+    out_path = out_path or path
+    gltf, buffers = load_gltf(path)
+    stats = {
+        "bytes_before": os.path.getsize(path),
+        "materials_before": len(gltf.get("materials", [])),
+        "accessors_before": len(gltf.get("accessors", [])),
+        "primitives_before": sum(len(m.get("primitives", [])) for m in gltf.get("meshes", [])),
+    }
+
+    used_ext = set(gltf.get("extensionsUsed", []))
+    skipped = [ext for ext in UNSUPPORTED_EXTENSIONS if ext in used_ext]
+    if skipped or any("sparse" in acc for acc in gltf.get("accessors", [])):
+        stats["skipped"] = ", ".join(skipped) or "sparse accessors"
+        return stats
+
+    overrides = {}
+    stats["attributes_removed"] = 0
+    if dedupe:
+        stats["attributes_removed"] = fold_constant_colors(gltf, buffers, tolerance)
+        stats["attributes_removed"] += drop_unused_attributes(gltf)
+        stats["materials_merged"] = dedupe_materials(gltf, tolerance)
+        stats["primitives_merged"] = merge_primitives(gltf, buffers, overrides)
+    prune_unused(gltf, overrides)
+    if vertex_cache or overdraw:
+        start = time.time()
+        stats["acmr_before"], stats["acmr_after"] = optimize_vertex_cache(gltf, buffers, overrides, overdraw)
+        stats["vertex_cache_seconds"] = time.time() - start
+
+    gltf, bin_data = repack(gltf, buffers, overrides)
+    save_glb(out_path, gltf, bin_data)
+
+    stats["bytes_after"] = os.path.getsize(out_path)
+    stats["materials_after"] = len(gltf.get("materials", []))
+    stats["accessors_after"] = len(gltf.get("accessors", []))
+    stats["primitives_after"] = sum(len(m.get("primitives", [])) for m in gltf.get("meshes", []))
+    return stats
+
+
+def format_stats(stats):
+    """One-line summary of optimize_glb() results."""
+    if "skipped" in stats:
+        return f"skipped ({stats['skipped']} not supported)"
+    saved = stats["bytes_before"] - stats["bytes_after"]
+    text = (f"{stats['bytes_before']} -> {stats['bytes_after']} bytes ({saved} saved), "
+            f"materials {stats['materials_before']} -> {stats['materials_after']}, "
+            f"primitives {stats['primitives_before']} -> {stats['primitives_after']}, "
+            f"accessors {stats['accessors_before']} -> {stats['accessors_after']}, "
+            f"{stats['attributes_removed']} attribute(s) removed")
+    if stats.get("acmr_before") is not None:
+        text += (f", ACMR {stats['acmr_before']:.3f} -> {stats['acmr_after']:.3f} "
+                 f"({stats['vertex_cache_seconds']:.1f}s)")
+    return text
+
+
+def main():
+    """Main entry point for the script."""
+    args = sys.argv[1:]
+    tolerance = DEFAULT_MATERIAL_TOLERANCE
+    passes = {"dedupe": True, "vertex_cache": False, "overdraw": False}
+    paths = []
+    i = 0
+    while i < len(args):
+        if args[i] == "--tolerance" and i + 1 < len(args):
+            try:
+                tolerance = float(args[i + 1])
+            except ValueError:
+                print(f"ERROR: Invalid tolerance: {args[i + 1]}")
+                return False
+            i += 1
+        elif args[i] == "--no-dedupe":
+            passes["dedupe"] = False
+        elif args[i] == "--vcache":
+            passes["vertex_cache"] = True
+        elif args[i] == "--overdraw":
+            passes["vertex_cache"] = True
+            passes["overdraw"] = True
+        else:
+            paths.append(args[i])
+        i += 1
+
+    if not paths:
+        print("ERROR: No input. Usage: python glb_optimize.py <model.glb|folder> [...] "
+              "[--tolerance X] [--no-dedupe] [--vcache] [--overdraw]")
+        return False
+
+    models = []
+    for p in paths:
+        if os.path.isdir(p):
+            models.extend(os.path.join(root, name) for root, _dirs, files in os.walk(p)
+                          for name in files if name.lower().endswith('.glb'))
+        else:
+            models.append(p)
+
+    ok = True
+    for model in sorted(models):
+        try:
+            print(f"{model}: {format_stats(optimize_glb(model, tolerance=tolerance, **passes))}")
+        except Exception as e:
+            print(f"ERROR: {model}: {e}")
+            ok = False
+    return ok
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
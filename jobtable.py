@@ -0,0 +1,340 @@
+"""
+Virtualised job table for the GUI (ttk.Treeview).
+
+The Treeview only ever holds one item per visible line. Job data lives in
+a JobModel (plain Python, no Tk); sorting and filtering build a list of job
+ids, and the visible window of that list is written into the fixed items. Updates from
+the event stream only mark jobs dirty and are applied at most every
+REFRESH_MS, so thousands of queued jobs cost the same per frame as ten.
+"""
+
+import os
+import time
+import tkinter as tk
+from tkinter import ttk
+
+
+REFRESH_MS = 100
+# (key, heading, width, anchor)
+COLUMNS = [
+    ("name", "File", 260, tk.W),
+    ("status", "Status", 90, tk.W),
+    ("progress", "Progress", 120, tk.W),
+    ("tris_before", "Triangles before", 110, tk.E),
+    ("tris_after", "Triangles after", 110, tk.E),
+    ("size", "Size", 80, tk.E),
+    ("duration", "Duration", 80, tk.E),
+]
+STATUS_FILTERS = ("All", "pending", "running", "done", "failed")
+# Columns that sort by a different field than the one displayed
+SORT_FIELDS = {"progress": "completed"}
+PROGRESS_WIDTH = 10
+
+
+def format_size(size):
+    if size is None:
+        return ""
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024.0
+
+
+def format_duration(seconds):
+    if seconds is None:
+        return ""
+    minutes, seconds = divmod(int(seconds), 60)
+    return f"{minutes}:{seconds:02d}"
+
+
+class JobModel:
+    """
+    Jobs, their sort/filter index and the scroll offset, without any widget.
+
+    A job's status comes from its stage events and, finally, from
+    finish_job(); the completed-stage count only drives the progress bar, so
+    resumed jobs (which skip finished stages) still end up done.
+    """
+
+    def __init__(self):
+        self.jobs = {}
+        self.order = []
+        self.offset = 0
+        self.sort_key = None
+        self.sort_reverse = False
+        self.filter_text = ""
+        self.status_filter = STATUS_FILTERS[0]
+        self.order_dirty = False
+
+    def add_job(self, job_id, input_path, stages=1, completed=0, status="pending"):
+        self.jobs[job_id] = {
+            "name": os.path.basename(input_path), "path": input_path, "status": status,
+            "stage": "", "stages": max(1, stages), "completed": min(completed, max(1, stages)),
+            "tris_before": None, "tris_after": None, "size": None,
+            "started": None, "duration": None,
+        }
+        self.order_dirty = True
+
+    def update_job(self, job_id, **fields):
+        """Merge new values for a job. Returns False for unknown jobs."""
+        job = self.jobs.get(job_id)
+        if job is None:
+            return False
+        job.update(fields)
+        if self.sort_key in fields or "status" in fields:
+            self.order_dirty = True
+        return True
+
+    def stage_event(self, job_id, stage, status, now=None):
+        """Apply a ("job_status", ...) event."""
+        job = self.jobs.get(job_id)
+        if job is None:
+            return False
+        now = time.time() if now is None else now
+        if job["started"] is None:
+            job["started"] = now
+        fields = {"stage": stage, "duration": now - job["started"]}
+        if status == "running":
+            fields["status"] = "running"
+        elif status == "done":
+            fields["completed"] = min(job["completed"] + 1, job["stages"])
+        else:
+            fields["status"] = "failed"
+        return self.update_job(job_id, **fields)
+
+    def finish_job(self, job_id, ok, now=None):
+        """Apply a ("job_done", ...) event: the job has no stages left to run."""
+        job = self.jobs.get(job_id)
+        if job is None:
+            return False
+        fields = {"status": "done" if ok else "failed", "stage": ""}
+        if ok:
+            fields["completed"] = job["stages"]
+        if job["started"] is not None:
+            fields["duration"] = (time.time() if now is None else now) - job["started"]
+        return self.update_job(job_id, **fields)
+
+    def clear(self):
+        self.jobs.clear()
+        self.offset = 0
+        self.order_dirty = True
+
+    def sort_by(self, key):
+        key = SORT_FIELDS.get(key, key)
+        if self.sort_key == key:
+            self.sort_reverse = not self.sort_reverse
+        else:
+            self.sort_key = key
+            self.sort_reverse = False
+        self.order_dirty = True
+
+    def set_filter(self, text, status):
+        self.filter_text = text.strip().lower()
+        self.status_filter = status
+        self.order_dirty = True
+
+    def rebuild_order(self):
+        text = self.filter_text
+        status = self.status_filter
+        ids = [job_id for job_id, job in self.jobs.items()
+               if (status == "All" or job["status"] == status) and (not text or text in job["name"].lower())]
+        if self.sort_key:
+            key = self.sort_key
+
+            def sort_value(job_id):
+                value = self.jobs[job_id][key]
+                # None sorts after every value in either direction
+                return (value is None) != self.sort_reverse, value if value is not None else 0
+
+            ids.sort(key=sort_value, reverse=self.sort_reverse)
+        self.order = ids
+        self.order_dirty = False
+
+    def set_offset(self, offset, rows):
+        """Scroll so the window of `rows` lines starts at `offset` (clamped). Returns whether it moved."""
+        offset = max(0, min(offset, len(self.order) - rows))
+        if offset == self.offset:
+            return False
+        self.offset = offset
+        return True
+
+    def window(self, rows):
+        """Job ids of the `rows` visible lines, rebuilding the index first if needed."""
+        if self.order_dirty:
+            self.rebuild_order()
+        self.offset = max(0, min(self.offset, len(self.order) - rows))
+        return self.order[self.offset:self.offset + rows]
+
+    def tick(self, job_ids, now=None):
+        """Advance the live duration of the given running jobs."""
+        now = time.time() if now is None else now
+        for job_id in job_ids:
+            job = self.jobs.get(job_id)
+            if job and job["status"] == "running" and job["started"] is not None:
+                job["duration"] = now - job["started"]
+
+    def counts(self):
+        counts = {}
+        for job in self.jobs.values():
+            counts[job["status"]] = counts.get(job["status"], 0) + 1
+        return counts
+
+    def summary(self):
+        counts = self.counts()
+        return f"{len(self.jobs)} jobs: " + ", ".join(f"{counts.get(s, 0)} {s}" for s in STATUS_FILTERS[1:])
+
+    @staticmethod
+    def row_values(job):
+        if job["status"] == "done":
+            filled = PROGRESS_WIDTH
+        else:
+            filled = PROGRESS_WIDTH * job["completed"] // job["stages"]
+        progress = "█" * filled + "░" * (PROGRESS_WIDTH - filled)
+        if job["status"] == "running" and job["stage"]:
+            progress += f" {job['stage']}"
+        return (
+            job["name"], job["status"], progress,
+            "" if job["tris_before"] is None else f"{job['tris_before']:,}",
+            "" if job["tris_after"] is None else f"{job['tris_after']:,}",
+            format_size(job["size"]), format_duration(job["duration"]),
+        )
+
+
+class JobTable(ttk.Frame):
+    """
+    Job list with status, progress, triangle counts, size and duration.
+
+    Call add_job() when jobs are queued, and stage_event(), finish_job() and
+    update_job() from the event stream; they only change the JobModel and
+    never touch the widget directly.
+    """
+
+    def __init__(self, master, **kwargs):
+        super().__init__(master, **kwargs)
+        self.model = JobModel()
+        self._after_id = None
+        self._tick_id = None
+        self._shown = []
+
+        self.filter_var = tk.StringVar()
+        self.status_var = tk.StringVar(value=STATUS_FILTERS[0])
+        self.summary_var = tk.StringVar()
+
+        bar = ttk.Frame(self)
+        bar.pack(fill=tk.X, pady=(0, 4))
+        ttk.Label(bar, text="Filter:").pack(side=tk.LEFT)
+        ttk.Entry(bar, textvariable=self.filter_var, width=30).pack(side=tk.LEFT, padx=4)
+        ttk.Combobox(bar, textvariable=self.status_var, values=STATUS_FILTERS, state="readonly",
+                     width=10).pack(side=tk.LEFT, padx=4)
+        ttk.Label(bar, textvariable=self.summary_var).pack(side=tk.RIGHT)
+        self.filter_var.trace('w', lambda *args: self._on_filter())
+        self.status_var.trace('w', lambda *args: self._on_filter())
+
+        body = ttk.Frame(self)
+        body.pack(fill=tk.BOTH, expand=True)
+        self.tree = ttk.Treeview(body, columns=[c[0] for c in COLUMNS], show="headings", selectmode="browse")
+        for key, heading, width, anchor in COLUMNS:
+            self.tree.heading(key, text=heading, command=lambda k=key: self.sort_by(k))
+            self.tree.column(key, width=width, anchor=anchor, stretch=(key == "name"))
+        self.scrollbar = ttk.Scrollbar(body, orient=tk.VERTICAL, command=self._on_scrollbar)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar.pack(side=tk.LEFT, fill=tk.Y)
+
+        self._row_height = int(ttk.Style(self).lookup("Treeview", "rowheight") or 20)
+        self.tree.bind("<Configure>", lambda e: self._schedule())
+        self.tree.bind("<MouseWheel>", lambda e: self.scroll(-1 if e.delta > 0 else 1, "units"))
+        self.tree.bind("<Button-4>", lambda e: self.scroll(-1, "units"))
+        self.tree.bind("<Button-5>", lambda e: self.scroll(1, "units"))
+        self.tree.bind("<Prior>", lambda e: self.scroll(-1, "pages"))
+        self.tree.bind("<Next>", lambda e: self.scroll(1, "pages"))
+
+    # -- model --------------------------------------------------------------
+
+    def add_job(self, job_id, input_path, stages=1, completed=0, status="pending"):
+        self.model.add_job(job_id, input_path, stages, completed, status)
+        self._schedule()
+
+    def update_job(self, job_id, **fields):
+        """Merge new values for a job; the row is redrawn on the next refresh."""
+        if self.model.update_job(job_id, **fields):
+            self._schedule()
+
+    def stage_event(self, job_id, stage, status):
+        if self.model.stage_event(job_id, stage, status):
+            self._schedule()
+
+    def finish_job(self, job_id, ok):
+        if self.model.finish_job(job_id, ok):
+            self._schedule()
+
+    def clear(self):
+        self.model.clear()
+        self._schedule()
+
+    def sort_by(self, key):
+        self.model.sort_by(key)
+        self._schedule()
+
+    # -- view ---------------------------------------------------------------
+
+    def _on_filter(self):
+        self.model.set_filter(self.filter_var.get(), self.status_var.get())
+        self._schedule()
+
+    def _schedule(self):
+        if self._after_id is None:
+            self._after_id = self.after(REFRESH_MS, self.refresh)
+
+    def visible_rows(self):
+        """Number of lines the tree can show at its current height."""
+        header = self._row_height + 4
+        return max(1, (self.tree.winfo_height() - header) // self._row_height)
+
+    def scroll(self, amount, what):
+        step = self.visible_rows() if what == "pages" else 1
+        if self.model.set_offset(self.model.offset + int(amount) * step, self.visible_rows()):
+            self._schedule()
+        return "break"
+
+    def _on_scrollbar(self, action, *args):
+        if action == "moveto":
+            if self.model.set_offset(int(float(args[0]) * len(self.model.order)), self.visible_rows()):
+                self._schedule()
+        elif action == "scroll":
+            self.scroll(args[0], args[1])
+
+    def refresh(self):
+        """Coalesced redraw: rebuild the index if needed, then rewrite only changed visible rows."""
+        self._after_id = None
+        model = self.model
+        rows = self.visible_rows()
+        window = model.window(rows)
+
+        # Keep exactly one tree item per visible line
+        items = self.tree.get_children()
+        for item in items[len(window):]:
+            self.tree.delete(item)
+        items = list(items[:len(window)])
+        while len(items) < len(window):
+            items.append(self.tree.insert("", tk.END, values=()))
+        shown = [(job_id, model.row_values(model.jobs[job_id])) for job_id in window]
+        for i, (item, (job_id, values)) in enumerate(zip(items, shown)):
+            if i >= len(self._shown) or self._shown[i] != (job_id, values):
+                self.tree.item(item, values=values)
+        self._shown = shown
+
+        total = len(model.order)
+        if total:
+            self.scrollbar.set(model.offset / total, min(1.0, (model.offset + rows) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+        self.summary_var.set(model.summary())
+
+        # Running jobs show a live duration
+        if model.counts().get("running") and self._tick_id is None:
+            self._tick_id = self.after(1000, self._tick)
+
+    def _tick(self):
+        self._tick_id = None
+        self.model.tick([job_id for job_id, _values in self._shown])
+        self._schedule()
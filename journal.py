@@ -0,0 +1,158 @@
+"""
+Persistent batch journal (SQLite, standard library only).
+
+Records every job's input, outputs, options, current stage, output hashes
+and stage timings, so a batch interrupted by closing the GUI or a reboot
+can resume by re-running only the stages that did not finish.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+STAGES = ("convert", "simplify", "optimize", "thumbnail")
+DEFAULT_PATH = os.path.join(os.path.expanduser("~"), ".mayo_gui", "journal.sqlite3")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS batches (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created REAL NOT NULL,
+    mayo TEXT,
+    blender TEXT,
+    finished REAL
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    batch_id INTEGER NOT NULL REFERENCES batches(id),
+    input TEXT NOT NULL,
+    outputs TEXT NOT NULL,
+    options TEXT NOT NULL,
+    stage TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',
+    error TEXT,
+    updated REAL
+);
+CREATE TABLE IF NOT EXISTS stages (
+    job_id INTEGER NOT NULL REFERENCES jobs(id),
+    stage TEXT NOT NULL,
+    status TEXT NOT NULL,
+    started REAL,
+    finished REAL,
+    hashes TEXT,
+    PRIMARY KEY (job_id, stage)
+);
+"""
+
+
+class JobJournal:
+    """
+    Thread-safe wrapper around the journal database.
+
+    Job status is one of 'pending', 'running', 'done' or 'failed'; stage rows
+    are 'running' until finished as 'done' (with the SHA-256 of each output)
+    or 'failed'. A job still 'running' when its batch is reopened was
+    interrupted.
+    """
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        # WAL keeps committed rows intact if the process dies mid-write
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+        self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            cur = self._db.execute(sql, params)
+            self._db.commit()
+            return cur
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    def create_batch(self, mayo, blender, jobs):
+        """Record a new batch. `jobs` is a list of (input, outputs, options). Returns the batch id."""
+        with self._lock:
+            cur = self._db.execute("INSERT INTO batches (created, mayo, blender) VALUES (?, ?, ?)",
+                                   (time.time(), mayo, blender))
+            batch_id = cur.lastrowid
+            self._db.executemany(
+                "INSERT INTO jobs (batch_id, input, outputs, options, updated) VALUES (?, ?, ?, ?, ?)",
+                [(batch_id, inp, json.dumps(outputs), json.dumps(options), time.time())
+                 for inp, outputs, options in jobs])
+            self._db.commit()
+            return batch_id
+
+    def batch(self, batch_id):
+        rows = self._query("SELECT * FROM batches WHERE id = ?", (batch_id,))
+        return dict(rows[0]) if rows else None
+
+    def finish_batch(self, batch_id):
+        self._execute("UPDATE batches SET finished = ? WHERE id = ?", (time.time(), batch_id))
+
+    def jobs(self, batch_id):
+        """Jobs of a batch as dicts, with outputs and options decoded."""
+        jobs = []
+        for row in self._query("SELECT * FROM jobs WHERE batch_id = ? ORDER BY id", (batch_id,)):
+            job = dict(row)
+            job["outputs"] = json.loads(job["outputs"])
+            job["options"] = json.loads(job["options"])
+            jobs.append(job)
+        return jobs
+
+    def incomplete_batches(self):
+        """Ids of unfinished batches that still have jobs left to run, oldest first."""
+        rows = self._query(
+            "SELECT DISTINCT b.id FROM batches b JOIN jobs j ON j.batch_id = b.id "
+            "WHERE b.finished IS NULL AND j.status IN ('pending', 'running') ORDER BY b.id")
+        return [row["id"] for row in rows]
+
+    def stage_records(self, job_id):
+        """Map of stage name -> stage row (with decoded output hashes) for a job."""
+        records = {}
+        for row in self._query("SELECT * FROM stages WHERE job_id = ?", (job_id,)):
+            rec = dict(row)
+            rec["hashes"] = json.loads(rec["hashes"]) if rec["hashes"] else {}
+            records[rec["stage"]] = rec
+        return records
+
+    def start_stage(self, job_id, stage):
+        now = time.time()
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO stages (job_id, stage, status, started) VALUES (?, ?, 'running', ?)",
+                             (job_id, stage, now))
+            self._db.execute("UPDATE jobs SET stage = ?, status = 'running', error = NULL, updated = ? WHERE id = ?",
+                             (stage, now, job_id))
+            self._db.commit()
+
+    def finish_stage(self, job_id, stage, ok, hashes=None, error=None):
+        """Close a stage; `hashes` maps each output path to its SHA-256 after the stage."""
+        now = time.time()
+        with self._lock:
+            self._db.execute("UPDATE stages SET status = ?, finished = ?, hashes = ? WHERE job_id = ? AND stage = ?",
+                             ("done" if ok else "failed", now, json.dumps(hashes or {}), job_id, stage))
+            if not ok:
+                self._db.execute("UPDATE jobs SET status = 'failed', error = ?, updated = ? WHERE id = ?",
+                                 (error or f"{stage} failed", now, job_id))
+            self._db.commit()
+
+    def finish_job(self, job_id):
+        self._execute("UPDATE jobs SET status = 'done', updated = ? WHERE id = ?", (time.time(), job_id))
+
+    def reset_job(self, job_id):
+        """Mark an interrupted or failed job as pending again, keeping its completed stages."""
+        self._execute("UPDATE jobs SET status = 'pending', error = NULL, updated = ? WHERE id = ?",
+                      (time.time(), job_id))
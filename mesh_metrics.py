@@ -0,0 +1,232 @@
+"""
+Vectorised mesh distance measurements (NumPy only).
+Used by blender_simplify.py to bound the geometric error of decimation.
+Works inside Blender's bundled Python as well as standalone.
+"""
+
+import numpy as np
+
+
+DEFAULT_SAMPLES = 20000
+# Upper bound on (point, triangle) candidate pairs evaluated per chunk
+MAX_PAIRS = 2_000_000
+# Triangles whose padded box covers more grid cells than this are kept out of
+# the grid and tested directly, so one large face among small ones cannot
+# blow the index up to millions of entries
+MAX_CELLS_PER_TRIANGLE = 64
+
+
+def _dot(a, b):
+    return np.einsum('ij,ij->i', a, b)
+
+
+def point_triangle_distances(p, a, b, c):
+    """
+    Distance from each point p[i] to triangle (a[i], b[i], c[i]).
+    Vectorised form of the closest-point-on-triangle region test (Ericson, RTCD 5.1.5).
+    """
+    ab = b - a
+    ac = c - a
+    ap = p - a
+    bp = p - b
+    cp = p - c
+    d1 = _dot(ab, ap)
+    d2 = _dot(ac, ap)
+    d3 = _dot(ab, bp)
+    d4 = _dot(ac, bp)
+    d5 = _dot(ab, cp)
+    d6 = _dot(ac, cp)
+    va = d3 * d6 - d5 * d4
+    vb = d5 * d2 - d1 * d6
+    vc = d1 * d4 - d3 * d2
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        denom = va + vb + vc
+        closest = a + ab * (vb / denom)[:, None] + ac * (vc / denom)[:, None]
+
+        # Apply the Voronoi regions in reverse priority so the highest one wins
+        e_bc = d4 - d3
+        f_bc = d5 - d6
+        m = (va <= 0) & (e_bc >= 0) & (f_bc >= 0)
+        t = (e_bc / (e_bc + f_bc))[:, None]
+        closest[m] = (b + t * (c - b))[m]
+
+        m = (vb <= 0) & (d2 >= 0) & (d6 <= 0)
+        t = (d2 / (d2 - d6))[:, None]
+        closest[m] = (a + t * ac)[m]
+
+        m = (d6 >= 0) & (d5 <= d6)
+        closest[m] = c[m]
+
+        m = (vc <= 0) & (d1 >= 0) & (d3 <= 0)
+        t = (d1 / (d1 - d3))[:, None]
+        closest[m] = (a + t * ab)[m]
+
+        m = (d3 >= 0) & (d4 <= d3)
+        closest[m] = b[m]
+
+        m = (d1 <= 0) & (d2 <= 0)
+        closest[m] = a[m]
+
+    dist = np.linalg.norm(p - closest, axis=1)
+    bad = ~np.isfinite(dist)
+    if bad.any():
+        # Degenerate triangles: fall back to the nearest corner
+        corners = np.stack([ap[bad], bp[bad], cp[bad]])
+        dist[bad] = np.linalg.norm(corners, axis=2).min(axis=0)
+    return dist
+
+
+class TriangleGrid:
+    """
+    Uniform grid spatial index over triangles for radius-limited distance queries.
+
+    Each triangle is registered in every cell its bounding box, padded by
+    `radius`, overlaps. A point then only needs its own cell to find every
+    triangle within `radius`; distances beyond the radius are reported as inf.
+    Triangles spanning more than MAX_CELLS_PER_TRIANGLE cells are instead
+    checked against every point inside their padded box.
+    """
+
+    def __init__(self, vertices, triangles, radius):
+        self.vertices = np.asarray(vertices, dtype=np.float64)
+        self.triangles = np.asarray(triangles, dtype=np.int64)
+        self.radius = float(radius)
+
+        corners = self.vertices[self.triangles]
+        lo = corners.min(axis=1) - self.radius
+        hi = corners.max(axis=1) + self.radius
+        extent = (hi - lo).max(axis=1) - 2 * self.radius
+        typical = float(np.median(extent)) if len(extent) else 0.0
+        self.cell = max(2 * self.radius, typical, 1e-12)
+
+        span = np.floor((hi - lo) / self.cell).astype(np.int64) + 2
+        large = span.prod(axis=1) > MAX_CELLS_PER_TRIANGLE
+        self.large = np.nonzero(large)[0]
+        self.large_lo = lo[large]
+        self.large_hi = hi[large]
+        gridded = np.nonzero(~large)[0]
+        lo = lo[gridded]
+        hi = hi[gridded]
+
+        self.origin = lo.min(axis=0) if len(lo) else np.zeros(3)
+        c0 = np.floor((lo - self.origin) / self.cell).astype(np.int64)
+        c1 = np.floor((hi - self.origin) / self.cell).astype(np.int64)
+        self.dims = (c1.max(axis=0) + 1) if len(c1) else np.ones(3, dtype=np.int64)
+
+        span = c1 - c0 + 1
+        counts = span.prod(axis=1)
+        owner = np.repeat(np.arange(len(counts)), counts)
+        local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        sx = span[owner, 0]
+        sy = span[owner, 1]
+        ix = c0[owner, 0] + local % sx
+        iy = c0[owner, 1] + (local // sx) % sy
+        iz = c0[owner, 2] + local // (sx * sy)
+
+        keys = self._key(ix, iy, iz)
+        order = np.argsort(keys, kind='stable')
+        self.keys = keys[order]
+        self.entries = gridded[owner[order]]
+
+    def _key(self, ix, iy, iz):
+        return ix + self.dims[0] * (iy + self.dims[1] * iz)
+
+    def distances(self, points):
+        """Distance from each point to the nearest triangle, or inf if farther than radius."""
+        points = np.asarray(points, dtype=np.float64)
+        result = np.full(len(points), np.inf)
+        if len(points) == 0:
+            return result
+        self._large_distances(points, result)
+        if len(self.keys) == 0:
+            result[result > self.radius] = np.inf
+            return result
+
+        cells = np.floor((points - self.origin) / self.cell).astype(np.int64)
+        inside = np.all((cells >= 0) & (cells < self.dims), axis=1)
+        idx = np.nonzero(inside)[0]
+        keys = self._key(cells[idx, 0], cells[idx, 1], cells[idx, 2])
+        start = np.searchsorted(self.keys, keys, side='left')
+        count = np.searchsorted(self.keys, keys, side='right') - start
+
+        bounds = np.cumsum(count)
+        pos = 0
+        while pos < len(idx):
+            limit = (bounds[pos - 1] if pos else 0) + MAX_PAIRS
+            stop = max(pos + 1, int(np.searchsorted(bounds, limit, side='right')))
+            n = count[pos:stop]
+            owner = np.repeat(np.arange(pos, stop), n)
+            offset = np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n)
+            tri = self.triangles[self.entries[start[owner] + offset]]
+            pts = points[idx[owner]]
+            d = point_triangle_distances(pts, self.vertices[tri[:, 0]],
+                                         self.vertices[tri[:, 1]], self.vertices[tri[:, 2]])
+            np.minimum.at(result, idx[owner], d)
+            pos = stop
+
+        result[result > self.radius] = np.inf
+        return result
+
+    def _large_distances(self, points, result):
+        """Fold distances to the out-of-grid triangles into `result`, for points in their padded boxes."""
+        if len(self.large) == 0:
+            return
+        step = max(1, MAX_PAIRS // len(self.large))
+        for pos in range(0, len(points), step):
+            pts = points[pos:pos + step]
+            near = np.all((pts[:, None, :] >= self.large_lo) & (pts[:, None, :] <= self.large_hi), axis=2)
+            point_idx, large_idx = np.nonzero(near)
+            if len(point_idx) == 0:
+                continue
+            tri = self.triangles[self.large[large_idx]]
+            d = point_triangle_distances(pts[point_idx], self.vertices[tri[:, 0]],
+                                         self.vertices[tri[:, 1]], self.vertices[tri[:, 2]])
+            np.minimum.at(result, pos + point_idx, d)
+
+
+def surface_samples(vertices, triangles, count=DEFAULT_SAMPLES, seed=0):
+    """Return the mesh vertices plus `count` area-weighted random surface points."""
+    vertices = np.asarray(vertices, dtype=np.float64)
+    triangles = np.asarray(triangles, dtype=np.int64)
+    if len(triangles) == 0 or count <= 0:
+        return vertices
+
+    a = vertices[triangles[:, 0]]
+    b = vertices[triangles[:, 1]]
+    c = vertices[triangles[:, 2]]
+    area = np.linalg.norm(np.cross(b - a, c - a), axis=1)
+    total = area.sum()
+    if total <= 0:
+        return vertices
+
+    rng = np.random.default_rng(seed)
+    pick = rng.choice(len(triangles), size=count, p=area / total)
+    r1 = np.sqrt(rng.random(count))[:, None]
+    r2 = rng.random(count)[:, None]
+    samples = (1 - r1) * a[pick] + r1 * (1 - r2) * b[pick] + r1 * r2 * c[pick]
+    used = np.unique(triangles)
+    return np.concatenate([vertices[used], samples])
+
+
+def hausdorff_distance(verts_a, tris_a, verts_b, tris_b, radius, samples=DEFAULT_SAMPLES,
+                       grid_a=None):
+    """
+    Symmetric sampled Hausdorff distance between two triangle meshes.
+
+    Only distances up to `radius` are resolved; larger deviations return inf.
+    Pass a prebuilt TriangleGrid for mesh A to reuse it across calls.
+    """
+    if len(tris_a) == 0 or len(tris_b) == 0:
+        return 0.0 if len(tris_a) == len(tris_b) else np.inf
+
+    if grid_a is None:
+        grid_a = TriangleGrid(verts_a, tris_a, radius)
+    d_ba = grid_a.distances(surface_samples(verts_b, tris_b, samples))
+    worst = d_ba.max()
+    if not np.isfinite(worst):
+        return np.inf
+
+    grid_b = TriangleGrid(verts_b, tris_b, radius)
+    d_ab = grid_b.distances(surface_samples(verts_a, tris_a, samples))
+    return float(max(worst, d_ab.max()))
@@ -0,0 +1,465 @@
+"""
+Conversion pipeline helpers shared by the GUI and batch tooling.
+Standard library only; the GLB stages import NumPy-based modules lazily.
+
+Stage functions report progress through an `emit(event)` callback taking
+the same (tag, message) tuples the GUI output queue uses.
+"""
+
+import hashlib
+import json
+import math
+import os
+import re
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+
+# Formats offered as extra outputs; mayo-conv picks the exporter from the extension
+EXPORT_FORMATS = {
+    "GLB": ".glb",
+    "glTF": ".gltf",
+    "STL": ".stl",
+    "OBJ": ".obj",
+    "PLY": ".ply",
+    "VRML": ".wrl",
+}
+# Outputs the Blender/GLB stages can process
+SIMPLIFY_EXTENSIONS = ('.glb', '.gltf')
+# Exports are written as <name>.partial<ext> and renamed once complete
+PARTIAL_TAG = ".partial"
+SIMPLIFY_TIMEOUT = 300
+
+# Tessellation presets: (chordal deflection in mm, angular deflection in degrees)
+MESH_PRESETS = {
+    "Very coarse": (4.0, 40.0),
+    "Coarse": (1.0, 30.0),
+    "Normal": (0.25, 20.0),
+    "Fine": (0.05, 12.0),
+    "Very fine": (0.01, 6.0),
+}
+MESH_AUTO = "Auto"
+# Decimation is skipped when the tessellated result is within this margin of the budget
+BUDGET_SLACK = 1.1
+# STEP length units, in mm
+STEP_UNITS = {".MILLI.": 1.0, ".CENTI.": 10.0, "$": 1000.0, "INCH": 25.4}
+STEP_POINT = re.compile(rb"CARTESIAN_POINT\s*\(\s*'[^']*'\s*,\s*\(([^)]*)\)")
+
+
+def build_convert_command(mayo, input_path, outputs, settings_path=None):
+    """
+    Build one mayo-conv command exporting every output.
+    The input (the expensive STEP parse) is read once, however many formats are requested.
+    `settings_path` is an INI file passed with --use-settings (e.g. meshing quality).
+    """
+    cmd = [mayo, input_path]
+    if settings_path:
+        cmd += ["--use-settings", settings_path]
+    for out in outputs:
+        cmd += ["--export", out]
+    return cmd
+
+
+def step_statistics(path):
+    """
+    Cheap size estimate of a STEP file without a CAD kernel: bounding-box diagonal
+    in mm (from CARTESIAN_POINTs, ignoring assembly placements) and face count.
+    """
+    lo = [math.inf] * 3
+    hi = [-math.inf] * 3
+    faces = 0
+    scale = 1.0
+    with open(path, 'rb') as f:
+        data = f.read()
+    for unit, factor in STEP_UNITS.items():
+        if unit == "INCH":
+            found = re.search(rb"CONVERSION_BASED_UNIT\s*\(\s*'INCH'", data, re.IGNORECASE)
+        else:
+            found = re.search(rb"SI_UNIT\s*\(\s*" + re.escape(unit.encode()) + rb"\s*,\s*\.METRE\.", data)
+        if found:
+            scale = factor
+            break
+    for match in STEP_POINT.finditer(data):
+        try:
+            coords = [float(c) for c in match.group(1).split(b',')]
+        except ValueError:
+            continue
+        for i, c in enumerate(coords[:3]):
+            lo[i] = min(lo[i], c)
+            hi[i] = max(hi[i], c)
+    faces = data.count(b"ADVANCED_FACE") + data.count(b"FACE_SURFACE")
+    if lo[0] == math.inf:
+        return {"diagonal": 0.0, "faces": faces}
+    diagonal = math.sqrt(sum((h - l) ** 2 for l, h in zip(lo, hi) if h >= l)) * scale
+    return {"diagonal": diagonal, "faces": faces}
+
+
+def auto_deflection(stats, budget):
+    """
+    Pick (chordal mm, angular degrees) so the tessellation lands near `budget` triangles.
+
+    A face of size s with curvature radius ~s meshed with chordal deflection d
+    needs about s / (8 d) triangles (edge length ~ sqrt(8 s d)), plus two for its
+    outline. Face size is taken as diagonal / sqrt(faces). The angular deflection
+    is the angle of a chord with that sagitta on the same radius.
+    """
+    faces = max(1, stats["faces"])
+    diagonal = stats["diagonal"]
+    if diagonal <= 0 or budget <= 0:
+        return MESH_PRESETS["Normal"]
+    size = diagonal / math.sqrt(faces)
+    curved = max(budget - 2 * faces, budget * 0.1)
+    chordal = faces * size / (8.0 * curved)
+    chordal = min(max(chordal, diagonal * 1e-5), size * 0.5)
+    angular = math.degrees(2.0 * math.acos(1.0 - chordal / size))
+    return chordal, min(max(angular, 5.0), 45.0)
+
+
+def mesh_settings_file(input_path, options, emit):
+    """
+    Write a mayo-conv settings INI for the job's mesh quality and return its path,
+    or None to keep mayo's own settings. The caller deletes the file.
+    """
+    quality = options.get("mesh_quality")
+    if not quality or (quality != MESH_AUTO and quality not in MESH_PRESETS):
+        return None
+    if quality == MESH_AUTO:
+        stats = step_statistics(input_path)
+        chordal, angular = auto_deflection(stats, options.get("triangle_budget", 0))
+        emit(("out", f"Auto mesh quality: {stats['faces']} faces, {stats['diagonal']:.1f} mm diagonal -> "
+                     f"chordal {chordal:.4g} mm, angular {angular:.1f} deg\n"))
+    else:
+        chordal, angular = MESH_PRESETS[quality]
+    # Keys of Mayo's "meshing" settings group; all deflections are absolute
+    fd, path = tempfile.mkstemp(prefix="mayo_settings_", suffix=".ini")
+    with os.fdopen(fd, 'w') as f:
+        f.write("[meshing]\n")
+        f.write("meshingQuality=UserDefined\n")
+        f.write(f"meshingChordalDeflection={chordal:.6g}\n")
+        f.write(f"meshingAngularDeflection={angular:.6g}\n")
+        f.write("meshingRelative=false\n")
+    return path
+
+
+def glb_triangle_count(path):
+    """Triangles in a GLB/glTF, counting every mesh instance, read from the JSON only."""
+    with open(path, 'rb') as f:
+        head = f.read(20)
+        if len(head) == 20 and head[:4] == b'glTF':
+            json_len = struct.unpack_from('<I', head, 12)[0]
+            gltf = json.loads(f.read(json_len).decode('utf-8'))
+        else:
+            gltf = json.loads((head + f.read()).decode('utf-8'))
+    accessors = gltf.get("accessors", [])
+    per_mesh = []
+    for mesh in gltf.get("meshes", []):
+        count = 0
+        for prim in mesh.get("primitives", []):
+            if prim.get("mode", 4) != 4:
+                continue
+            index = prim.get("indices", prim.get("attributes", {}).get("POSITION"))
+            if index is not None:
+                count += accessors[index]["count"] // 3
+        per_mesh.append(count)
+    return sum(per_mesh[n["mesh"]] for n in gltf.get("nodes", []) if "mesh" in n)
+
+
+def budget_ratio(triangles, budget):
+    """
+    Decimation ratio that brings `triangles` down to `budget`, or None if
+    they are already within budget. Also used by blender_simplify.py, which
+    applies it to the triangles left after culling.
+    """
+    if triangles <= budget * BUDGET_SLACK:
+        return None
+    return max(0.01, budget / float(triangles))
+
+
+def sibling_output(path, extension):
+    """Same folder and basename as `path`, with another extension."""
+    return os.path.splitext(path)[0] + extension
+
+
+def collect_outputs(primary, extra_extensions):
+    """Primary output followed by one sibling per extra extension, without duplicates."""
+    outputs = [primary]
+    for ext in extra_extensions:
+        out = sibling_output(primary, ext)
+        if out.lower() not in [o.lower() for o in outputs]:
+            outputs.append(out)
+    return outputs
+
+
+def needs_simplification(path):
+    """Only glTF outputs go through the Blender and in-process GLB stages."""
+    return path.lower().endswith(SIMPLIFY_EXTENSIONS)
+
+
+def output_status(path, started):
+    """
+    Status of one export after mayo-conv exits: 'ok', 'missing', 'empty'
+    or 'stale' (the file predates this run, so the export did not write it).
+    """
+    if not os.path.exists(path):
+        return "missing"
+    if os.path.getsize(path) == 0:
+        return "empty"
+    # Allow for coarse filesystem timestamps
+    if os.path.getmtime(path) < started - 2.0:
+        return "stale"
+    return "ok"
+
+
+def partial_path(path):
+    """
+    Temporary name an export is written to before it is renamed into place.
+    .gltf keeps its final name: its .bin sidecar is referenced by file name.
+    """
+    base, ext = os.path.splitext(path)
+    if ext.lower() == '.gltf':
+        return path
+    return base + PARTIAL_TAG + ext
+
+
+def finalize_outputs(outputs, success):
+    """Rename finished partial exports into place, or discard them after a failure."""
+    for out in outputs:
+        tmp = partial_path(out)
+        if tmp == out or not os.path.exists(tmp):
+            continue
+        try:
+            if success:
+                os.replace(tmp, out)
+            else:
+                os.remove(tmp)
+        except OSError:
+            pass
+
+
+def file_hash(path):
+    """SHA-256 of a file, or None if it does not exist."""
+    if not os.path.exists(path):
+        return None
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def script_path(name="blender_simplify.py"):
+    """Locate a helper script next to the app (or in the PyInstaller bundle)."""
+    if getattr(sys, 'frozen', False) and hasattr(sys, '_MEIPASS'):
+        script_dir = sys._MEIPASS
+    else:
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(script_dir, name)
+
+
+def simplify_flags(options):
+    """Translate job options into blender_simplify.py command-line flags."""
+    flags = []
+    if not options.get("preprocess", True):
+        flags.append("--no-preprocess")
+    if not options.get("advanced_simplify", True):
+        flags.append("--no-advanced")
+    if not options.get("delete_loose", True):
+        flags.append("--no-delete-loose")
+    if options.get("smooth_normals", False):
+        flags.append("--smooth")
+    if options.get("tolerance_mm", 0) > 0:
+        flags.append(f"--tolerance-mm={options['tolerance_mm']}")
+    if options.get("dedupe_materials", False):
+        # Merge equivalent materials before the merge planner groups by material
+        flags.append("--dedupe-materials")
+    if options.get("cull_hidden", False):
+        # Internal parts go before decimation, so the ratio is spent on what can be seen
+        flags.append("--cull-hidden")
+        if options.get("cull_mode") == "decimate":
+            flags.append("--cull-mode=decimate")
+    if options.get("cull_small_px", 0) > 0:
+        flags.append(f"--cull-small-px={options['cull_small_px']}")
+    if options.get("triangle_budget", 0) > 0 and options.get("tolerance_mm", 0) <= 0:
+        # The script derives the ratio itself, after culling, and skips only the
+        # decimation when the model is already within budget
+        flags.append(f"--triangle-budget={options['triangle_budget']}")
+    if not options.get("merge", True):
+        flags.append("--no-merge")
+    elif options.get("merge_target", 0) > 0:
+        flags.append(f"--merge-target={options['merge_target']}")
+    return flags
+
+
+def run_process(cmd, emit, on_start=None):
+    """
+    Run a command, streaming stdout/stderr lines as ("out"/"err", line) events.
+    Returns the exit code, or None if the process could not be started.
+    """
+    try:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+    except Exception as e:
+        emit(("err", f"Failed to start process: {e}\n"))
+        return None
+    if on_start:
+        on_start(proc)
+
+    # Read stdout and stderr lines
+    def reader(pipe, tag):
+        try:
+            for line in iter(pipe.readline, ''):
+                if line:
+                    emit((tag, line))
+        finally:
+            pipe.close()
+
+    out_thread = threading.Thread(target=reader, args=(proc.stdout, "out"))
+    err_thread = threading.Thread(target=reader, args=(proc.stderr, "err"))
+    out_thread.daemon = True
+    err_thread.daemon = True
+    out_thread.start()
+    err_thread.start()
+
+    rc = proc.wait()
+    out_thread.join()
+    err_thread.join()
+    return rc
+
+
+def run_simplify(blender, model_path, options, emit, on_start=None, timeout=SIMPLIFY_TIMEOUT, threads=0):
+    """
+    Run Blender simplification on one model, relaying its log file. Returns success.
+    `threads` > 0 caps Blender's worker threads (-t); 0 lets it use every core.
+    """
+    try:
+        script = script_path()
+        if not os.path.exists(script):
+            emit(("err", f"ERROR: Blender script not found at {script}\n"))
+            return False
+        
+        # Log file to track progress
+        log_file = model_path + ".simplify.log"
+        
+        # Run Blender with the script and arguments
+        cmd = [blender, "-b"]
+        if threads > 0:
+            cmd += ["-t", str(threads)]
+        cmd += ["-P", script, "--", model_path, str(options.get("ratio", 0.7))]
+        cmd += simplify_flags(options)
+        
+        emit(("out", f"> Running: {' '.join(cmd)}\n"))
+        
+        try:
+            proc = subprocess.Popen(
+                cmd,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                creationflags=subprocess.CREATE_NEW_PROCESS_GROUP if sys.platform == 'win32' else 0
+            )
+        except Exception as e:
+            emit(("err", f"ERROR: Failed to start Blender: {e}\n"))
+            return False
+        if on_start:
+            on_start(proc)
+        
+        # Monitor process and read log file
+        start_time = time.time()
+        last_log_pos = 0
+        process_completed = False
+        export_logged = False
+        
+        while True:
+            elapsed = time.time() - start_time
+            
+            # Check for timeout
+            if elapsed > timeout:
+                emit(("err", f"ERROR: Blender process timed out after {timeout} seconds\n"))
+                try:
+                    proc.terminate()
+                    proc.wait(timeout=5)
+                except:
+                    try:
+                        proc.kill()
+                    except:
+                        pass
+                return False
+            
+            # Check if process has completed
+            if proc.poll() is not None:
+                process_completed = True
+            
+            # Read new lines from log file
+            if os.path.exists(log_file):
+                try:
+                    with open(log_file, 'r', encoding='utf-8') as f:
+                        f.seek(last_log_pos)
+                        new_lines = f.read()
+                        if new_lines:
+                            emit(("out", new_lines))
+                            if (not export_logged) and ("Export successful" in new_lines):
+                                export_logged = True
+                                emit(("out", "Export done. Waiting for Blender to exit...\n"))
+                        last_log_pos = f.tell()
+                except:
+                    pass
+            
+            # If process completed and we've read the log, we're done
+            if process_completed:
+                # Final read to catch any last lines
+                if os.path.exists(log_file):
+                    try:
+                        with open(log_file, 'r', encoding='utf-8') as f:
+                            f.seek(last_log_pos)
+                            remaining = f.read()
+                            if remaining:
+                                emit(("out", remaining))
+                    except:
+                        pass
+                
+                return proc.returncode == 0
+            
+            time.sleep(0.1)  # Poll more frequently
+        
+    except Exception as e:
+        emit(("err", f"Simplification error: {e}\n"))
+        import traceback
+        emit(("err", traceback.format_exc() + "\n"))
+        return False
+
+
+def optimize_output(model_path, passes, emit):
+    """Run glb_optimize passes on one GLB output. Returns success."""
+    try:
+        import glb_optimize
+    except ImportError:
+        emit(("err", "GLB optimisation unavailable: NumPy is not installed\n"))
+        return False
+    try:
+        stats = glb_optimize.optimize_glb(model_path, **passes)
+        emit(("out", f"Optimised {os.path.basename(model_path)}: {glb_optimize.format_stats(stats)}\n"))
+        return True
+    except Exception as e:
+        emit(("err", f"Optimisation error for {model_path}: {e}\n"))
+        return False
+
+
+def thumbnail_output(model_path, emit):
+    """Render (or reuse) the thumbnail of one output. Returns the PNG path or None."""
+    try:
+        import thumbnail
+    except ImportError:
+        emit(("err", "Thumbnails unavailable: NumPy is not installed\n"))
+        return None
+    try:
+        start = time.time()
+        png = thumbnail.thumbnail_path(model_path)
+        if thumbnail.needs_thumbnail(model_path):
+            thumbnail.render_thumbnail(model_path, png)
+            emit(("out", f"Thumbnail: {png} ({time.time() - start:.2f}s)\n"))
+        return png
+    except Exception as e:
+        emit(("err", f"Thumbnail error for {model_path}: {e}\n"))
+        return None
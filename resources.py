@@ -0,0 +1,244 @@
+"""
+CPU and memory governor for the external mayo-conv and Blender processes.
+
+Each stage asks for a lease before starting its process. A lease reserves a
+set of cores (applied as CPU affinity, and as Blender's thread count) and an
+estimated amount of memory. New leases are only granted while the estimate
+fits into the memory currently available, so jobs that would push the
+machine into swapping or the OOM killer wait in line instead.
+
+psutil is used when installed; otherwise Linux /proc and the Windows
+GlobalMemoryStatusEx call cover memory, and os.sched_setaffinity /
+os.setpriority cover affinity and priority where the platform has them.
+"""
+
+import os
+import signal
+import sys
+import threading
+import time
+
+try:
+    import psutil
+    HAS_PSUTIL = True
+except ImportError:
+    HAS_PSUTIL = False
+
+
+MB = 1024 * 1024
+# Memory model per stage: base + factor * input size (STEP file for convert, GLB for simplify)
+MEMORY_MODEL = {
+    "convert": (300 * MB, 12.0),
+    "simplify": (500 * MB, 25.0),
+    "optimize": (100 * MB, 8.0),
+    "thumbnail": (100 * MB, 6.0),
+}
+# Observed peaks are scaled by this margin before they replace the defaults
+LEARN_MARGIN = 1.25
+# Smaller inputs are dominated by the base cost and say little about the factor
+LEARN_MIN_SIZE = 8 * MB
+# Memory left free for the OS and the GUI
+MEMORY_RESERVE = 512 * MB
+# Niceness for child processes (POSIX); below-normal priority on Windows
+CHILD_NICE = 10
+MONITOR_INTERVAL = 0.5
+
+
+def cpu_count():
+    """Cores this process may run on."""
+    if hasattr(os, 'sched_getaffinity'):
+        return max(1, len(os.sched_getaffinity(0)))
+    return max(1, os.cpu_count() or 1)
+
+
+def usable_cpus():
+    """Ids of the cores this process may run on."""
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(cpu_count()))
+
+
+def available_memory():
+    """Bytes of memory available without swapping, or None if unknown."""
+    if HAS_PSUTIL:
+        return psutil.virtual_memory().available
+    if sys.platform.startswith('linux'):
+        try:
+            with open('/proc/meminfo') as f:
+                for line in f:
+                    if line.startswith('MemAvailable:'):
+                        return int(line.split()[1]) * 1024
+        except (OSError, ValueError):
+            return None
+    if sys.platform == 'win32':
+        import ctypes
+
+        class MemoryStatus(ctypes.Structure):
+            _fields_ = [("dwLength", ctypes.c_ulong), ("dwMemoryLoad", ctypes.c_ulong),
+                        ("ullTotalPhys", ctypes.c_ulonglong), ("ullAvailPhys", ctypes.c_ulonglong),
+                        ("ullTotalPageFile", ctypes.c_ulonglong), ("ullAvailPageFile", ctypes.c_ulonglong),
+                        ("ullTotalVirtual", ctypes.c_ulonglong), ("ullAvailVirtual", ctypes.c_ulonglong),
+                        ("ullAvailExtendedVirtual", ctypes.c_ulonglong)]
+
+        status = MemoryStatus()
+        status.dwLength = ctypes.sizeof(MemoryStatus)
+        if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+            return status.ullAvailPhys
+    return None
+
+
+def process_rss(pid):
+    """Resident memory of a process in bytes, or None if it cannot be read."""
+    if HAS_PSUTIL:
+        try:
+            return psutil.Process(pid).memory_info().rss
+        except psutil.Error:
+            return None
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def default_workers():
+    """Parallel jobs for a batch: one per four cores, the memory check limits the rest."""
+    return max(1, cpu_count() // 4)
+
+
+class Lease:
+    """Cores and memory granted to one stage; attach the stage's process to apply them."""
+
+    def __init__(self, governor, stage, size, estimate, cpus):
+        self.governor = governor
+        self.stage = stage
+        self.size = size
+        self.estimate = estimate
+        self.cpus = cpus
+        self.rss = 0
+        self.peak = 0
+        self.proc = None
+
+    @property
+    def threads(self):
+        return len(self.cpus)
+
+    @property
+    def killed(self):
+        """True if the attached process was SIGKILLed, which is how the Linux OOM killer ends it."""
+        sigkill = getattr(signal, 'SIGKILL', None)
+        return sigkill is not None and self.proc is not None and self.proc.returncode == -sigkill
+
+    def attach(self, proc):
+        """Pin a started process to the leased cores, lower its priority and track its memory."""
+        self.proc = proc
+        try:
+            if HAS_PSUTIL:
+                p = psutil.Process(proc.pid)
+                if hasattr(p, 'cpu_affinity'):
+                    p.cpu_affinity(self.cpus)
+                p.nice(psutil.BELOW_NORMAL_PRIORITY_CLASS if sys.platform == 'win32' else CHILD_NICE)
+            else:
+                if hasattr(os, 'sched_setaffinity'):
+                    os.sched_setaffinity(proc.pid, self.cpus)
+                if hasattr(os, 'setpriority'):
+                    os.setpriority(os.PRIO_PROCESS, proc.pid, CHILD_NICE)
+        except Exception:
+            # Process already gone or not permitted; run it unrestricted
+            pass
+
+        monitor = threading.Thread(target=self._monitor, args=(proc,))
+        monitor.daemon = True
+        monitor.start()
+
+    def _monitor(self, proc):
+        while proc.poll() is None:
+            rss = process_rss(proc.pid)
+            if rss is not None:
+                self.rss = rss
+                self.peak = max(self.peak, rss)
+            time.sleep(MONITOR_INTERVAL)
+
+    def release(self):
+        self.governor.release(self)
+
+
+class ResourceGovernor:
+    """
+    Grants leases so concurrent stages share the machine without oversubscribing it.
+
+    A lease is granted when enough cores are free and its memory estimate,
+    plus what running leases may still grow into, fits in the available
+    memory. A lone lease is always granted so an oversized job still runs.
+    """
+
+    def __init__(self, emit=None, reserve=MEMORY_RESERVE):
+        self.emit = emit
+        self.reserve = reserve
+        self._free = usable_cpus()
+        self._leases = []
+        self._model = dict(MEMORY_MODEL)
+        self._cond = threading.Condition()
+
+    @property
+    def total_cores(self):
+        return len(self._free) + sum(lease.threads for lease in self._leases)
+
+    def cores_per_job(self, workers):
+        return max(1, self.total_cores // max(1, workers))
+
+    def estimate(self, stage, size):
+        base, factor = self._model.get(stage, (0, 0.0))
+        return int(base + factor * size)
+
+    def _fits(self, estimate, cores, exclusive):
+        if not self._leases:
+            return True
+        if exclusive:
+            return False
+        if len(self._free) < cores:
+            return False
+        available = available_memory()
+        if available is None:
+            return True
+        # Running leases may still grow up to their own estimate
+        growth = sum(max(0, lease.estimate - lease.rss) for lease in self._leases)
+        return estimate + growth + self.reserve <= available
+
+    def acquire(self, stage, size, cores, stop=None, exclusive=False):
+        """
+        Block until a lease fits. Returns the Lease, or None if `stop` was set while waiting.
+        An exclusive lease waits until no other lease is running.
+        """
+        cores = max(1, min(cores, self.total_cores))
+        estimate = self.estimate(stage, size)
+        queued = False
+        with self._cond:
+            while not self._fits(estimate, cores, exclusive):
+                if stop is not None and stop.is_set():
+                    return None
+                if not queued and self.emit:
+                    queued = True
+                    self.emit(("out", f"Queued {stage} (needs ~{estimate // MB} MB, {cores} core(s))\n"))
+                # Re-check periodically: memory frees up outside our control too
+                self._cond.wait(1.0)
+            cpus = self._free[:cores]
+            del self._free[:cores]
+            lease = Lease(self, stage, size, estimate, cpus)
+            self._leases.append(lease)
+            return lease
+
+    def release(self, lease):
+        """Return a lease's cores and learn from its measured peak memory."""
+        with self._cond:
+            if lease not in self._leases:
+                return
+            self._leases.remove(lease)
+            self._free = sorted(self._free + lease.cpus)
+            if lease.peak and lease.size >= LEARN_MIN_SIZE:
+                base, _factor = self._model[lease.stage]
+                self._model[lease.stage] = (base, max(0.0, (lease.peak - base) / lease.size) * LEARN_MARGIN)
+            self._cond.notify_all()
@@ -0,0 +1,140 @@
+"""
+End-to-end farm test on localhost: a Coordinator and a FarmWorker talk over
+127.0.0.1, with small Python scripts standing in for mayo-conv and Blender.
+"""
+
+import os
+import shutil
+import socket
+import stat
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import farm  # noqa: E402
+
+
+# Writes "converted:<input>" to every --export path
+FAKE_MAYO = """
+import sys
+args = sys.argv[1:]
+for i, arg in enumerate(args):
+    if arg == "--export":
+        with open(args[i + 1], "w") as f:
+            f.write("converted:" + args[0])
+"""
+
+# Appends a marker to the model and reports success through the log file, like blender_simplify.py
+FAKE_BLENDER = """
+import sys
+args = sys.argv[sys.argv.index("--") + 1:]
+model = args[0]
+with open(model, "a") as f:
+    f.write("|simplified:" + args[1])
+with open(model + ".simplify.log", "w") as f:
+    f.write("Export successful\\n")
+"""
+
+
+def write_script(folder, name, source):
+    path = os.path.join(folder, name)
+    with open(path, "w") as f:
+        f.write(f"#!{sys.executable}\n{source}")
+    os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC)
+    return path
+
+
+@unittest.skipIf(sys.platform == "win32", "stand-in tools are shebang scripts")
+class LocalFarmTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix="farm_test_")
+        self.out = os.path.join(self.tmp, "out")
+        self.mayo = write_script(self.tmp, "fake_mayo", FAKE_MAYO)
+        self.blender = write_script(self.tmp, "fake_blender", FAKE_BLENDER)
+        self.events = []
+        self.coordinator = farm.Coordinator(self.out, self.events.append)
+        self.worker = None
+
+    def tearDown(self):
+        if self.worker:
+            self.worker.stop()
+        self.coordinator.shutdown()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def start_worker(self, capacity=2):
+        _host, port = self.coordinator.serve(host="127.0.0.1", port=0)
+        self.worker = farm.FarmWorker(f"http://127.0.0.1:{port}", self.mayo, self.blender, capacity,
+                                      workdir=os.path.join(self.tmp, "work"))
+        thread = threading.Thread(target=self.worker.run)
+        thread.daemon = True
+        thread.start()
+
+    def read_output(self, name):
+        with open(os.path.join(self.out, name)) as f:
+            return f.read()
+
+    def test_convert_simplify_and_simplify_only_jobs(self):
+        step = os.path.join(self.tmp, "part.step")
+        with open(step, "w") as f:
+            f.write("ISO-10303-21;")
+        glb = os.path.join(self.tmp, "model.glb")
+        with open(glb, "w") as f:
+            f.write("mesh")
+        options = {"simplify": True, "ratio": 0.5}
+        convert_job = self.coordinator.submit(step, ["part.glb"], options)
+        simplify_job = self.coordinator.submit(glb, ["model_simplified.glb"], options)
+        self.assertEqual(self.coordinator.jobs[convert_job]["stages"], ["convert", "simplify"])
+        self.assertEqual(self.coordinator.jobs[simplify_job]["stages"], ["simplify"])
+
+        self.start_worker()
+        self.assertTrue(self.coordinator.wait(timeout=60), "farm did not finish")
+        self.assertEqual(self.coordinator.summary()["done"], 2)
+        self.assertEqual(self.read_output("part.glb"), "converted:" + os.path.join(
+            self.tmp, "work", f"job{convert_job}_{os.getpid()}", "part.step") + "|simplified:0.5")
+        self.assertEqual(self.read_output("model_simplified.glb"), "mesh|simplified:0.5")
+
+        statuses = [msg for tag, msg in self.events if tag == "job_status"]
+        self.assertIn((simplify_job, glb, "simplify", "done"), statuses)
+        self.assertNotIn((simplify_job, glb, "convert", "running"), statuses)
+        self.assertEqual(self.events[-1][0], "batch_done")
+
+    def test_lease_respects_reported_slots_and_reregistration(self):
+        for i in range(4):
+            self.coordinator.submit(os.path.join(self.tmp, f"p{i}.step"), [f"p{i}.glb"], {})
+        first = self.coordinator.register("host:1", 2)
+        self.assertEqual(len(self.coordinator.lease(first)), 2)
+        # Same worker after a 410: its two running jobs still fill its capacity
+        second = self.coordinator.register("host:1", 2)
+        self.assertNotIn(first, self.coordinator.workers)
+        self.assertEqual(self.coordinator.lease(second), [])
+        # Unknown (reaped) workers get nothing instead of an error
+        self.assertEqual(self.coordinator.lease(first), [])
+        other = self.coordinator.register("host:2", 2)
+        self.assertEqual(len(self.coordinator.lease(other, slots=1)), 1)
+
+    def test_unreachable_coordinator_and_invalid_numbers_fail_cleanly(self):
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        worker = farm.FarmWorker(f"http://127.0.0.1:{port}", self.mayo, self.blender,
+                                 workdir=os.path.join(self.tmp, "work"), emit=self.events.append)
+        self.assertFalse(worker.run())
+        self.assertTrue(self.events[-1][1].startswith("ERROR: Cannot register"))
+
+        argv = sys.argv
+        try:
+            for args in (["worker", "http://127.0.0.1:1", "--capacity", "two"],
+                         ["coordinator", "part.step", "--out", self.out, "--ratio", "half"],
+                         ["coordinator", "part.step", "--out", self.out, "--port", "x"]):
+                sys.argv = ["farm.py"] + args
+                self.assertFalse(farm.main())
+        finally:
+            sys.argv = argv
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+"""GLB optimisation passes on small generated models."""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+
+from glb_io import repack, save_glb  # noqa: E402
+from glb_optimize import optimize_glb  # noqa: E402
+
+
+def grid(size, offset=0.0):
+    """Vertices and shuffled triangles of a size x size quad grid."""
+    xs, ys = np.meshgrid(np.arange(size, dtype=np.float32), np.arange(size, dtype=np.float32))
+    positions = np.stack([xs.ravel() + offset, ys.ravel(), np.zeros(size * size, np.float32)], axis=1)
+    corner = (np.arange(size - 1)[:, None] * size + np.arange(size - 1)[None, :]).ravel()
+    tris = np.concatenate([np.stack([corner, corner + 1, corner + size], axis=1),
+                           np.stack([corner + 1, corner + size + 1, corner + size], axis=1)])
+    np.random.default_rng(0).shuffle(tris)
+    return positions, tris.astype(np.uint32)
+
+
+class OptimizeGlbTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix="glb_optimize_test_")
+        self.path = os.path.join(self.tmp, "model.glb")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def write_glb(self, primitives, arrays):
+        """Save primitives whose accessor indices refer to `arrays`; two equal materials are given."""
+        accessors = [{"componentType": 5126, "count": 0, "type": "VEC3" if a.ndim > 1 else "SCALAR"}
+                     for a in arrays]
+        gltf = {
+            "asset": {"version": "2.0"},
+            "materials": [{"pbrMetallicRoughness": {"baseColorFactor": [0.5, 0.5, 0.5, 1.0]}}] * 2,
+            "meshes": [{"primitives": primitives}],
+            "nodes": [{"mesh": 0}],
+            "scenes": [{"nodes": [0]}],
+            "accessors": accessors,
+        }
+        gltf, bin_data = repack(gltf, [], dict(enumerate(arrays)))
+        save_glb(self.path, gltf, bin_data)
+        return os.path.getsize(self.path)
+
+    def test_primitives_sharing_vertex_data_are_not_duplicated(self):
+        positions, tris = grid(60)
+        half = len(tris) // 2
+        arrays = [positions, positions.copy(), tris[:half].reshape(-1), tris[half:].reshape(-1)]
+        size = self.write_glb([
+            {"attributes": {"POSITION": 0, "NORMAL": 1}, "indices": 2, "material": 0},
+            {"attributes": {"POSITION": 0, "NORMAL": 1}, "indices": 3, "material": 1},
+        ], arrays)
+        stats = optimize_glb(self.path)
+        self.assertEqual((stats["primitives_before"], stats["primitives_after"]), (2, 1))
+        self.assertLessEqual(stats["bytes_after"], size)
+
+    def test_merged_primitives_get_vertex_cache_optimised(self):
+        first, first_tris = grid(40)
+        second, second_tris = grid(40, offset=50.0)
+        arrays = [first, second, first_tris.reshape(-1), second_tris.reshape(-1)]
+        self.write_glb([
+            {"attributes": {"POSITION": 0}, "indices": 2, "material": 0},
+            {"attributes": {"POSITION": 1}, "indices": 3, "material": 1},
+        ], arrays)
+        stats = optimize_glb(self.path, vertex_cache=True)
+        self.assertEqual(stats["primitives_after"], 1)
+        self.assertLess(stats["acmr_after"], stats["acmr_before"])
+
+
+if __name__ == "__main__":
+    unittest.main()
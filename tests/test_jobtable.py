@@ -0,0 +1,88 @@
+"""Tk-free tests of the job table model: sorting, filtering, scrolling and stage events."""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jobtable import JobModel  # noqa: E402
+
+
+class JobModelTest(unittest.TestCase):
+
+    def setUp(self):
+        self.model = JobModel()
+        for job_id, name in enumerate(["gear.step", "housing.step", "shaft.step", "bolt.step"], 1):
+            self.model.add_job(job_id, os.path.join("in", name), stages=3)
+
+    def test_sort_and_reverse_with_missing_values_last(self):
+        self.model.update_job(1, size=300)
+        self.model.update_job(2, size=100)
+        self.model.update_job(3, size=200)
+        self.model.sort_by("size")
+        self.assertEqual(self.model.window(10), [2, 3, 1, 4])
+        self.model.sort_by("size")
+        self.assertEqual(self.model.window(10), [1, 3, 2, 4])
+
+    def test_progress_column_sorts_by_completed_stages(self):
+        self.model.stage_event(3, "convert", "done", now=0.0)
+        self.model.stage_event(3, "simplify", "done", now=1.0)
+        self.model.stage_event(2, "convert", "done", now=0.0)
+        self.model.sort_by("progress")
+        self.assertEqual(self.model.sort_key, "completed")
+        self.assertEqual(self.model.window(10), [1, 4, 2, 3])
+
+    def test_filter_by_name_and_status(self):
+        self.model.stage_event(2, "convert", "running", now=0.0)
+        self.model.set_filter("  H", "All")
+        self.assertEqual(self.model.window(10), [2, 3])
+        self.model.set_filter("", "running")
+        self.assertEqual(self.model.window(10), [2])
+
+    def test_offset_is_clamped_to_the_visible_window(self):
+        for job_id in range(5, 21):
+            self.model.add_job(job_id, f"p{job_id}.step")
+        self.assertEqual(self.model.window(5), [1, 2, 3, 4, 5])
+        self.assertTrue(self.model.set_offset(100, 5))
+        self.assertEqual(self.model.offset, 15)
+        self.assertEqual(self.model.window(5), [16, 17, 18, 19, 20])
+        self.assertFalse(self.model.set_offset(15, 5))
+        self.model.set_filter("p2", "All")
+        self.assertEqual(self.model.window(5), [20])
+        self.assertEqual(self.model.offset, 0)
+
+    def test_job_is_done_only_when_finished(self):
+        self.model.stage_event(1, "convert", "running", now=10.0)
+        self.model.stage_event(1, "convert", "done", now=12.0)
+        job = self.model.jobs[1]
+        self.assertEqual((job["status"], job["completed"], job["duration"]), ("running", 1, 2.0))
+        self.model.finish_job(1, True, now=15.0)
+        self.assertEqual((job["status"], job["completed"], job["duration"]), ("done", 3, 5.0))
+        self.assertTrue(self.model.row_values(job)[2].startswith("█" * 10))
+
+    def test_resumed_job_finishes_without_replaying_stages(self):
+        self.model.add_job(9, "resumed.step", stages=3, completed=2)
+        self.model.stage_event(9, "thumbnail", "running", now=0.0)
+        self.model.stage_event(9, "thumbnail", "done", now=1.0)
+        self.model.finish_job(9, True, now=1.0)
+        self.assertEqual(self.model.jobs[9]["status"], "done")
+        # Nothing left running, so no live duration keeps ticking
+        self.model.tick([9], now=50.0)
+        self.assertEqual(self.model.jobs[9]["duration"], 1.0)
+
+    def test_failed_stage_and_failed_job(self):
+        self.model.stage_event(4, "convert", "failed", now=0.0)
+        self.assertEqual(self.model.jobs[4]["status"], "failed")
+        self.model.finish_job(2, False)
+        self.assertEqual(self.model.jobs[2]["status"], "failed")
+        self.assertEqual(self.model.summary(), "4 jobs: 2 pending, 0 running, 0 done, 2 failed")
+
+    def test_unknown_jobs_are_ignored(self):
+        self.assertFalse(self.model.update_job(99, size=1))
+        self.assertFalse(self.model.stage_event(99, "convert", "running"))
+        self.assertFalse(self.model.finish_job(99, True))
+
+
+if __name__ == "__main__":
+    unittest.main()
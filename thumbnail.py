@@ -0,0 +1,307 @@
+"""
+Lightweight GLB thumbnail renderer (NumPy software rasteriser).
+Usage: python thumbnail.py <model.glb|folder> [...] [--size N] [--force]
+Renders fixed isometric views with a z-buffer and flat shading into
+<model>.thumb.png next to each model. No Blender or GPU needed.
+"""
+
+import math
+import os
+import struct
+import sys
+import time
+import zlib
+
+import numpy as np
+
+from glb_io import load_scene
+
+
+THUMB_SUFFIX = ".thumb.png"
+DEFAULT_SIZE = 256
+SUPERSAMPLE = 2
+# (azimuth, elevation) in degrees; 35.264 is the true isometric elevation
+ISO_VIEWS = [(45.0, 35.264), (225.0, 35.264)]
+BACKGROUND = (0.96, 0.96, 0.96)
+LIGHT_DIR = np.array([-0.4, 0.6, 1.0]) / np.linalg.norm([-0.4, 0.6, 1.0])
+AMBIENT = 0.35
+# Upper bound on (triangle, pixel) candidate pairs processed per chunk
+MAX_CANDIDATES = 4_000_000
+# Above this many triangles, vertices are snapped to a pixel-sized grid first
+# (vertex clustering), which removes sub-pixel triangles and keeps large
+# models under a second
+CLUSTER_TRIANGLES = 100_000
+
+
+def thumbnail_path(model_path):
+    """Return the thumbnail path used for a model."""
+    return model_path + THUMB_SUFFIX
+
+
+def view_basis(azimuth, elevation):
+    """Return the camera right/up/back axes for a view direction (glTF is Y-up)."""
+    az = math.radians(azimuth)
+    el = math.radians(elevation)
+    back = np.array([math.cos(el) * math.sin(az), math.sin(el), math.cos(el) * math.cos(az)])
+    right = np.cross([0.0, 1.0, 0.0], back)
+    right /= np.linalg.norm(right)
+    up = np.cross(back, right)
+    return np.stack([right, up, back])
+
+
+def face_normals(positions, triangles):
+    """Unit face normals (zero for degenerate triangles)."""
+    v0 = positions[triangles[:, 0]]
+    normals = np.cross(positions[triangles[:, 1]] - v0, positions[triangles[:, 2]] - v0)
+    lengths = np.linalg.norm(normals, axis=1)
+    valid = lengths > 0
+    normals[valid] /= lengths[valid, None]
+    return normals
+
+
+def _min3(a):
+    return np.minimum(np.minimum(a[:, 0], a[:, 1]), a[:, 2])
+
+
+def _max3(a):
+    return np.maximum(np.maximum(a[:, 0], a[:, 1]), a[:, 2])
+
+
+def rasterize(positions, triangles, colors, basis, size, normals=None):
+    """
+    Render triangles with an orthographic camera into a (size, size, 3) float image.
+
+    The whole pipeline is vectorised: every triangle expands into the pixel
+    centres of its screen bounding box, coverage and depth are evaluated in
+    bulk, and the nearest fragment per pixel wins via a sort. Pass world-space
+    face `normals` to reuse them across views.
+    """
+    image = np.empty((size * size, 3))
+    image[:] = BACKGROUND
+    if len(triangles) == 0:
+        return image.reshape(size, size, 3)
+
+    # Fit the bounding sphere of the model into the frame
+    lo = positions.min(axis=0)
+    hi = positions.max(axis=0)
+    center = (lo + hi) / 2.0
+    radius = max(np.linalg.norm(hi - lo) / 2.0, 1e-12)
+    scale = size * 0.47 / radius
+
+    view = (positions - center) @ basis.T
+    sx = view[:, 0] * scale + size / 2.0
+    sy = size / 2.0 - view[:, 1] * scale
+    depth = -view[:, 2]
+
+    x = sx[triangles]
+    y = sy[triangles]
+
+    x0 = np.clip(np.ceil(_min3(x) - 0.5), 0, size).astype(np.int64)
+    x1 = np.clip(np.floor(_max3(x) - 0.5), -1, size - 1).astype(np.int64)
+    y0 = np.clip(np.ceil(_min3(y) - 0.5), 0, size).astype(np.int64)
+    y1 = np.clip(np.floor(_max3(y) - 0.5), -1, size - 1).astype(np.int64)
+    w = x1 - x0 + 1
+    h = y1 - y0 + 1
+    area = (x[:, 1] - x[:, 0]) * (y[:, 2] - y[:, 0]) - (x[:, 2] - x[:, 0]) * (y[:, 1] - y[:, 0])
+    # Most triangles of a dense mesh cover no pixel centre; drop them before any per-triangle work
+    keep = np.nonzero((w > 0) & (h > 0) & (area != 0))[0]
+    if len(keep) == 0:
+        return image.reshape(size, size, 3)
+    triangles = triangles[keep]
+    x = x[keep]
+    y = y[keep]
+    x0, y0, w, h, area = x0[keep], y0[keep], w[keep], h[keep], area[keep]
+    z = depth[triangles]
+
+    # Flat shading from face normals; abs() tolerates inconsistent CAD winding
+    if normals is None:
+        normals = face_normals(view, triangles)
+        light = LIGHT_DIR
+    else:
+        normals = normals[keep]
+        # Light is fixed in view space, so bring it into world space instead of every normal into view space
+        light = basis.T @ LIGHT_DIR
+    shade = AMBIENT + (1.0 - AMBIENT) * np.abs(normals @ light)
+    tri_colors = np.clip(colors[keep] * shade[:, None], 0.0, 1.0)
+    keep = np.arange(len(triangles))
+
+    zbuf = np.full(size * size, np.inf)
+    counts = w[keep] * h[keep]
+    bounds = np.cumsum(counts)
+    start = 0
+    while start < len(keep):
+        limit = (bounds[start - 1] if start else 0) + MAX_CANDIDATES
+        stop = max(start + 1, int(np.searchsorted(bounds, limit, side='right')))
+        tri = keep[start:stop]
+        n = counts[start:stop]
+        start = stop
+
+        # Expand each triangle into the pixels of its bounding box
+        owner = np.repeat(np.arange(len(tri)), n)
+        local = np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n)
+        t = tri[owner]
+        px = x0[t] + local % w[t]
+        py = y0[t] + local // w[t]
+        cx = px + 0.5
+        cy = py + 0.5
+
+        tx = x[t]
+        ty = y[t]
+        inv_area = 1.0 / area[t]
+        b0 = ((tx[:, 1] - cx) * (ty[:, 2] - cy) - (tx[:, 2] - cx) * (ty[:, 1] - cy)) * inv_area
+        b1 = ((tx[:, 2] - cx) * (ty[:, 0] - cy) - (tx[:, 0] - cx) * (ty[:, 2] - cy)) * inv_area
+        b2 = 1.0 - b0 - b1
+        inside = (b0 >= 0) & (b1 >= 0) & (b2 >= 0)
+        if not inside.any():
+            continue
+
+        t = t[inside]
+        pix = (py[inside] * size + px[inside])
+        frag_depth = (b0[inside] * z[t, 0] + b1[inside] * z[t, 1] + b2[inside] * z[t, 2])
+
+        # Nearest fragment per pixel within the chunk, then test against the z-buffer
+        order = np.lexsort((frag_depth, pix))
+        pix = pix[order]
+        first = np.ones(len(pix), dtype=bool)
+        first[1:] = pix[1:] != pix[:-1]
+        pix = pix[first]
+        sel = order[first]
+        frag_depth = frag_depth[sel]
+        closer = frag_depth < zbuf[pix]
+        pix = pix[closer]
+        zbuf[pix] = frag_depth[closer]
+        image[pix] = tri_colors[t[sel[closer]]]
+
+    return image.reshape(size, size, 3)
+
+
+def cluster_vertices(positions, triangles, cell):
+    """
+    Snap vertices to a grid of `cell` size, merging each cell's vertices into
+    their mean. Returns (positions, triangles, kept), where `kept` indexes the
+    triangles that did not collapse.
+    """
+    lo = positions.min(axis=0)
+    q = np.floor((positions - lo) / cell).astype(np.int64)
+    dims = q.max(axis=0) + 1
+    keys = q[:, 0] + dims[0] * (q[:, 1] + dims[1] * q[:, 2])
+    _unique, remap, counts = np.unique(keys, return_inverse=True, return_counts=True)
+    remap = remap.reshape(-1)
+    merged = np.stack([np.bincount(remap, weights=positions[:, k], minlength=len(counts))
+                       for k in range(3)], axis=1) / counts[:, None]
+    tris = remap[triangles]
+    kept = np.nonzero((tris[:, 0] != tris[:, 1]) & (tris[:, 1] != tris[:, 2]) & (tris[:, 0] != tris[:, 2]))[0]
+    return merged, tris[kept], kept
+
+
+def render_scene(scene, size=DEFAULT_SIZE, views=ISO_VIEWS, supersample=SUPERSAMPLE):
+    """Render a loaded scene into an (size, size * len(views), 3) uint8 image."""
+    full = size * supersample
+    positions = scene["positions"]
+    triangles = scene["triangles"]
+    colors = scene["colors"]
+    if len(triangles) > CLUSTER_TRIANGLES:
+        # One output pixel (supersample raster pixels), in scene units, as rasterize() frames the model
+        radius = max(np.linalg.norm(positions.max(axis=0) - positions.min(axis=0)) / 2.0, 1e-12)
+        positions, triangles, kept = cluster_vertices(positions, triangles, radius / (size * 0.47))
+        colors = colors[kept]
+    normals = face_normals(positions, triangles)
+    tiles = []
+    for azimuth, elevation in views:
+        img = rasterize(positions, triangles, colors, view_basis(azimuth, elevation), full, normals)
+        if supersample > 1:
+            img = img.reshape(size, supersample, size, supersample, 3).mean(axis=(1, 3))
+        tiles.append(img)
+    return (np.concatenate(tiles, axis=1) * 255.0 + 0.5).astype(np.uint8)
+
+
+def write_png(path, image):
+    """Write an (h, w, 3) uint8 array as an RGB PNG using only the standard library."""
+    height, width, _ = image.shape
+    raw = np.zeros((height, width * 3 + 1), dtype=np.uint8)
+    raw[:, 1:] = image.reshape(height, width * 3)
+
+    def chunk(tag, payload):
+        body = tag + payload
+        return struct.pack('>I', len(payload)) + body + struct.pack('>I', zlib.crc32(body) & 0xFFFFFFFF)
+
+    header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    tmp = path + ".tmp"
+    with open(tmp, 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\n')
+        f.write(chunk(b'IHDR', header))
+        f.write(chunk(b'IDAT', zlib.compress(raw.tobytes(), 6)))
+        f.write(chunk(b'IEND', b''))
+    os.replace(tmp, path)
+
+
+def render_thumbnail(model_path, out_path=None, size=DEFAULT_SIZE, views=ISO_VIEWS):
+    """Render a thumbnail PNG for a GLB/GLTF file and return its path."""
+    out_path = out_path or thumbnail_path(model_path)
+    scene = load_scene(model_path)
+    write_png(out_path, render_scene(scene, size=size, views=views))
+    return out_path
+
+
+def needs_thumbnail(model_path):
+    """True when the thumbnail is missing or older than the model."""
+    thumb = thumbnail_path(model_path)
+    return not os.path.exists(thumb) or os.path.getmtime(thumb) < os.path.getmtime(model_path)
+
+
+def find_models(paths):
+    """Expand files and folders into a sorted list of GLB/GLTF files."""
+    models = []
+    for p in paths:
+        if os.path.isdir(p):
+            for root, _dirs, files in os.walk(p):
+                for name in files:
+                    if name.lower().endswith(('.glb', '.gltf')):
+                        models.append(os.path.join(root, name))
+        elif p.lower().endswith(('.glb', '.gltf')):
+            models.append(p)
+    return sorted(models)
+
+
+def main():
+    """Main entry point for the script."""
+    args = sys.argv[1:]
+    size = DEFAULT_SIZE
+    force = False
+    paths = []
+    i = 0
+    while i < len(args):
+        if args[i] == "--size" and i + 1 < len(args):
+            try:
+                size = int(args[i + 1])
+            except ValueError:
+                print(f"ERROR: Invalid size: {args[i + 1]}")
+                return False
+            i += 1
+        elif args[i] == "--force":
+            force = True
+        else:
+            paths.append(args[i])
+        i += 1
+
+    if not paths:
+        print("ERROR: No input. Usage: python thumbnail.py <model.glb|folder> [...] [--size N] [--force]")
+        return False
+
+    ok = True
+    for model in find_models(paths):
+        if not force and not needs_thumbnail(model):
+            continue
+        start = time.time()
+        try:
+            out = render_thumbnail(model, size=size)
+            print(f"{out} ({time.time() - start:.2f}s)")
+        except Exception as e:
+            print(f"ERROR: {model}: {e}")
+            ok = False
+    return ok
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
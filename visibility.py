@@ -0,0 +1,279 @@
+"""
+Exterior visibility of parts by vectorised ray casting (NumPy only).
+Used by blender_simplify.py to cull internal parts of CAD assemblies.
+Works inside Blender's bundled Python as well as standalone.
+"""
+
+import numpy as np
+
+
+DEFAULT_VIEWS = 42
+DEFAULT_RESOLUTION = 160
+# Larger models get a coarser ray grid, so the pass stays around 20 s up to a few million triangles
+FULL_RESOLUTION_TRIANGLES = 100_000
+MIN_RESOLUTION = 64
+LEAF_SIZE = 8
+# Rays traced together; bounds the (ray, node) and (ray, triangle) pair arrays
+RAY_CHUNK = 8192
+# Screen size, in pixels of this reference viewport, used for small-part culling
+REFERENCE_PIXELS = 1024
+
+
+def fibonacci_directions(count):
+    """Roughly uniform unit vectors on the sphere."""
+    i = np.arange(count) + 0.5
+    z = 1.0 - 2.0 * i / count
+    r = np.sqrt(np.maximum(0.0, 1.0 - z * z))
+    phi = np.pi * (1.0 + 5 ** 0.5) * i
+    return np.stack([r * np.cos(phi), r * np.sin(phi), z], axis=1)
+
+
+def _morton_codes(points, lo, hi):
+    """30-bit Morton codes of points normalised to the box [lo, hi]."""
+    scale = np.where(hi > lo, hi - lo, 1.0)
+    q = np.clip(((points - lo) / scale * 1023.0).astype(np.int64), 0, 1023)
+
+    def spread(v):
+        v = (v | (v << 16)) & 0x030000FF
+        v = (v | (v << 8)) & 0x0300F00F
+        v = (v | (v << 4)) & 0x030C30C3
+        v = (v | (v << 2)) & 0x09249249
+        return v
+
+    return (spread(q[:, 0]) << 2) | (spread(q[:, 1]) << 1) | spread(q[:, 2])
+
+
+class TriangleBVH:
+    """
+    Bounding volume hierarchy over triangles for closest-hit ray queries.
+
+    Triangles are sorted along a Morton curve and cut into leaves of
+    LEAF_SIZE; the tree is a complete binary tree in heap layout over those
+    leaves, so building it is a handful of vectorised reductions. Traversal
+    keeps a small node stack per ray and advances all rays of a packet one
+    node per step, nearest child first, so occluded subtrees are skipped.
+    """
+
+    def __init__(self, vertices, triangles):
+        vertices = np.asarray(vertices, dtype=np.float64)
+        triangles = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+        corners = vertices[triangles]
+        centroids = corners.mean(axis=1) if len(triangles) else np.zeros((0, 3))
+        if len(triangles):
+            order = np.argsort(_morton_codes(centroids, centroids.min(axis=0), centroids.max(axis=0)), kind='stable')
+        else:
+            order = np.zeros(0, dtype=np.int64)
+        self.order = order
+        self.v0 = corners[order, 0]
+        self.e1 = corners[order, 1] - self.v0
+        self.e2 = corners[order, 2] - self.v0
+        self.count = len(order)
+
+        leaves = max(1, -(-self.count // LEAF_SIZE))
+        self.leaf_count = 1 << int(np.ceil(np.log2(leaves)))
+        self.first_leaf = self.leaf_count - 1
+        lo = np.full((2 * self.leaf_count - 1, 3), np.inf)
+        hi = np.full((2 * self.leaf_count - 1, 3), -np.inf)
+        if self.count:
+            tri_lo = corners[order].min(axis=1)
+            tri_hi = corners[order].max(axis=1)
+            starts = np.arange(0, self.count, LEAF_SIZE)
+            lo[self.first_leaf:self.first_leaf + len(starts)] = np.minimum.reduceat(tri_lo, starts, axis=0)
+            hi[self.first_leaf:self.first_leaf + len(starts)] = np.maximum.reduceat(tri_hi, starts, axis=0)
+        # Internal nodes bottom-up, one level at a time
+        level = self.first_leaf
+        while level > 0:
+            parents = np.arange((level - 1) // 2, level)
+            lo[parents] = np.minimum(lo[2 * parents + 1], lo[2 * parents + 2])
+            hi[parents] = np.maximum(hi[2 * parents + 1], hi[2 * parents + 2])
+            level = (level - 1) // 2
+        self.lo = lo
+        self.hi = hi
+
+    def intersect(self, origins, directions):
+        """
+        Closest hit along each ray. Returns (t, triangle) arrays; triangle is the
+        index into the input triangles, -1 for a miss (t is inf).
+        """
+        origins = np.asarray(origins, dtype=np.float64)
+        directions = np.asarray(directions, dtype=np.float64)
+        best_t = np.full(len(origins), np.inf)
+        best_tri = np.full(len(origins), -1, dtype=np.int64)
+        for start in range(0, len(origins), RAY_CHUNK):
+            stop = min(start + RAY_CHUNK, len(origins))
+            t, tri = self._intersect_chunk(origins[start:stop], directions[start:stop])
+            best_t[start:stop] = t
+            best_tri[start:stop] = tri
+        return best_t, best_tri
+
+    def _slab(self, origins, inv_dir, rays, nodes):
+        """Entry distance of each ray into its node's box; inf where it misses."""
+        with np.errstate(invalid='ignore'):
+            t0 = (self.lo[nodes] - origins[rays]) * inv_dir[rays]
+            t1 = (self.hi[nodes] - origins[rays]) * inv_dir[rays]
+        t_near = np.nan_to_num(np.minimum(t0, t1), nan=-np.inf).max(axis=1)
+        t_far = np.nan_to_num(np.maximum(t0, t1), nan=np.inf).min(axis=1)
+        # Padding subtrees have inverted (inf, -inf) bounds and must never pass
+        hit = (t_near <= t_far) & (t_far >= 0.0) & (self.lo[nodes, 0] <= self.hi[nodes, 0])
+        return np.where(hit, np.maximum(t_near, 0.0), np.inf)
+
+    def _intersect_chunk(self, origins, directions):
+        n = len(origins)
+        best_t = np.full(n, np.inf)
+        best_tri = np.full(n, -1, dtype=np.int64)
+        if self.count == 0 or n == 0:
+            return best_t, best_tri
+        with np.errstate(divide='ignore', invalid='ignore'):
+            inv_dir = 1.0 / directions
+        # One node stack per ray; every iteration pops one node for each active ray
+        depth = int(np.log2(self.leaf_count)) + 2
+        stack = np.zeros((n, depth), dtype=np.int64)
+        stack_t = np.zeros((n, depth))
+        top = np.ones(n, dtype=np.int64)
+        stack_t[:, 0] = self._slab(origins, inv_dir, np.arange(n), np.zeros(n, dtype=np.int64))
+        while True:
+            rays = np.flatnonzero(top)
+            if not len(rays):
+                break
+            top[rays] -= 1
+            nodes = stack[rays, top[rays]]
+            # Skip nodes entered behind the closest hit found since they were pushed
+            keep = stack_t[rays, top[rays]] < best_t[rays]
+            rays = rays[keep]
+            nodes = nodes[keep]
+
+            leaf = nodes >= self.first_leaf
+            if leaf.any():
+                self._test_leaves(origins, directions, rays[leaf], nodes[leaf] - self.first_leaf, best_t, best_tri)
+            rays = rays[~leaf]
+            nodes = nodes[~leaf]
+            if not len(rays):
+                continue
+            # Push the children that are hit, far child first so the near one is popped next
+            left = 2 * nodes + 1
+            t_left = self._slab(origins, inv_dir, rays, left)
+            t_right = self._slab(origins, inv_dir, rays, left + 1)
+            left_first = t_left <= t_right
+            near = np.where(left_first, left, left + 1)
+            far = np.where(left_first, left + 1, left)
+            t_near = np.minimum(t_left, t_right)
+            t_far = np.maximum(t_left, t_right)
+            for child, t_child in ((far, t_far), (near, t_near)):
+                push = t_child < best_t[rays]
+                r = rays[push]
+                stack[r, top[r]] = child[push]
+                stack_t[r, top[r]] = t_child[push]
+                top[r] += 1
+        return best_t, best_tri
+
+    def _test_leaves(self, origins, directions, rays, leaves, best_t, best_tri):
+        """Moller-Trumbore against every triangle of each (ray, leaf) pair."""
+        rays = np.repeat(rays, LEAF_SIZE)
+        tris = (np.repeat(leaves * LEAF_SIZE, LEAF_SIZE)
+                + np.tile(np.arange(LEAF_SIZE), len(leaves)))
+        valid = tris < self.count
+        rays = rays[valid]
+        tris = tris[valid]
+
+        d = directions[rays]
+        e1 = self.e1[tris]
+        e2 = self.e2[tris]
+        p = np.cross(d, e2)
+        det = np.einsum('ij,ij->i', e1, p)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            inv_det = 1.0 / det
+            s = origins[rays] - self.v0[tris]
+            u = np.einsum('ij,ij->i', s, p) * inv_det
+            q = np.cross(s, e1)
+            v = np.einsum('ij,ij->i', d, q) * inv_det
+            t = np.einsum('ij,ij->i', e2, q) * inv_det
+            ok = ((np.abs(det) > 1e-18) & (u >= 0.0) & (v >= 0.0) & (u + v <= 1.0)
+                  & (t > 0.0) & (t < best_t[rays]))
+        rays = rays[ok]
+        tris = tris[ok]
+        t = t[ok]
+        if len(rays) == 0:
+            return
+        np.minimum.at(best_t, rays, t)
+        closest = t == best_t[rays]
+        best_tri[rays[closest]] = self.order[tris[closest]]
+
+
+def view_rays(center, radius, direction, resolution, rng):
+    """Orthographic, jittered grid of rays looking along `direction` at the bounding sphere."""
+    direction = direction / np.linalg.norm(direction)
+    helper = np.array([0.0, 0.0, 1.0]) if abs(direction[2]) < 0.9 else np.array([1.0, 0.0, 0.0])
+    right = np.cross(direction, helper)
+    right /= np.linalg.norm(right)
+    up = np.cross(right, direction)
+    spacing = 2.0 * radius / resolution
+    grid = (np.arange(resolution) + 0.5) * spacing - radius
+    gx, gy = np.meshgrid(grid, grid)
+    gx = gx.reshape(-1) + (rng.random(gx.size) - 0.5) * spacing
+    gy = gy.reshape(-1) + (rng.random(gy.size) - 0.5) * spacing
+    inside = gx * gx + gy * gy <= radius * radius
+    gx = gx[inside]
+    gy = gy[inside]
+    origins = center - direction * (radius * 1.01) + gx[:, None] * right + gy[:, None] * up
+    return origins, np.tile(direction, (len(origins), 1))
+
+
+def scaled_resolution(triangles, resolution=DEFAULT_RESOLUTION):
+    """
+    Ray grid resolution for a model of `triangles`: the ray count falls
+    inversely with the triangle count above FULL_RESOLUTION_TRIANGLES, down to
+    MIN_RESOLUTION. A coarser grid only spares more small parts from culling.
+    """
+    if triangles <= FULL_RESOLUTION_TRIANGLES:
+        return resolution
+    return max(MIN_RESOLUTION, int(resolution * (FULL_RESOLUTION_TRIANGLES / triangles) ** 0.5))
+
+
+def part_visibility(parts, views=DEFAULT_VIEWS, resolution=DEFAULT_RESOLUTION, seed=0):
+    """
+    Cast rays at an assembly from `views` directions around its bounding sphere.
+
+    `parts` is a list of (vertices, triangles) in one shared (world) space.
+    Returns (hits, spacing): the number of rays whose first hit is on each
+    part, and the ray spacing in scene units (parts smaller than that may be
+    missed by chance rather than hidden).
+    """
+    verts = []
+    tris = []
+    owners = []
+    base = 0
+    for i, (v, t) in enumerate(parts):
+        v = np.asarray(v, dtype=np.float64).reshape(-1, 3)
+        t = np.asarray(t, dtype=np.int64).reshape(-1, 3)
+        verts.append(v)
+        tris.append(t + base)
+        owners.append(np.full(len(t), i, dtype=np.int64))
+        base += len(v)
+    hits = np.zeros(len(parts), dtype=np.int64)
+    if not parts or base == 0:
+        return hits, 0.0
+    verts = np.concatenate(verts)
+    tris = np.concatenate(tris)
+    owners = np.concatenate(owners)
+    if len(tris) == 0:
+        return hits, 0.0
+
+    lo = verts.min(axis=0)
+    hi = verts.max(axis=0)
+    center = (lo + hi) / 2.0
+    radius = max(np.linalg.norm(hi - lo) / 2.0, 1e-12)
+    bvh = TriangleBVH(verts, tris)
+    rng = np.random.default_rng(seed)
+    for direction in fibonacci_directions(views):
+        origins, dirs = view_rays(center, radius, direction, resolution, rng)
+        _t, tri = bvh.intersect(origins, dirs)
+        seen = tri[tri >= 0]
+        hits += np.bincount(owners[seen], minlength=len(parts))
+    return hits, 2.0 * radius / resolution
+
+
+def screen_size(part_diagonal, scene_diagonal, pixels=REFERENCE_PIXELS):
+    """Largest on-screen extent of a part, in pixels, when the whole scene fills `pixels`."""
+    if scene_diagonal <= 0:
+        return float(pixels)
+    return part_diagonal / scene_diagonal * pixels